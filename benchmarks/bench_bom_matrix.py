@@ -0,0 +1,115 @@
+# Запросы по составу продукции: матрица BomMatrix (CSR) против запросов SQLite
+#
+#   python benchmarks/bench_bom_matrix.py
+#
+# Сборка - чтение связей и построение матрицы (один раз). Далее для плана из PLAN_PRODUCTS позиций:
+# потребность материалов (A^T x), продукция, заблокированная нехваткой, и стоимость материалов
+# всей продукции (A p) - матрицей и запросом GROUP BY. Время расчетов MrpEngine включает чтение
+# остатков материалов, которое каждый расчет делает заново. Правка - сохранение одной связи через
+# Repository с поправкой строки матрицы и удаление материала; после правок матрица сверяется
+# с собранной заново. Связь новой продукции сохраняется с id строкой, как его передает таблица GUI.
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import build_database
+from bench_mrp import sql_gross, N_MATERIALS, N_PRODUCTS, N_LINKS, PLAN_PRODUCTS
+from bom import BomMatrix
+from planning import MrpEngine
+from repository import Product
+
+PATCHES = 200
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def sql_costs(repo):
+    with repo.cursor() as cursor:
+        cursor.execute("""
+                       SELECT pm.product_id,
+                              SUM(pm.required_quantity * (1 + pm.loss_percentage / 100.0) * m.unit_price *
+                                  COALESCE(pt.coefficient, 1.0))
+                       FROM product_materials pm
+                                JOIN materials m ON pm.material_id = m.material_id
+                                JOIN products p ON pm.product_id = p.product_id
+                                LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                       GROUP BY pm.product_id
+                       """)
+        return dict(cursor.fetchall())
+
+
+def same(matrix, other, plan):
+    """Матрицы дают одинаковую потребность по плану для всех материалов"""
+    ids = np.union1d(matrix.material_ids, other.material_ids)
+    left = dict(zip(matrix.material_ids, matrix.demand(plan)))
+    right = dict(zip(other.material_ids, other.demand(plan)))
+    return np.allclose([left.get(i, 0.0) for i in ids], [right.get(i, 0.0) for i in ids])
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_bom_matrix.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    rnd = random.Random(0)
+    plan = {product_id: rnd.randint(1, 100) for product_id in rnd.sample(range(1, N_PRODUCTS + 1), PLAN_PRODUCTS)}
+    engine = MrpEngine(repo)
+
+    build, bom = timed(repo.bom)
+    print(f"Связей: {bom.nnz}, матрица {bom.shape[0]} x {bom.shape[1]}, позиций плана: {PLAN_PRODUCTS}")
+    print(f"{'запрос':>30} {'матрица, с':>11} {'SQLite, с':>10}")
+    print(f"{'сборка матрицы':>30} {build:>11.3f} {'-':>10}")
+
+    matrix_time, demand = timed(lambda: engine.gross_requirements(plan))
+    sql_time, expected = timed(lambda: sql_gross(repo, plan))
+    print(f"{'потребность по плану':>30} {matrix_time:>11.4f} {sql_time:>10.3f}")
+    failures = 0
+    if not np.allclose(demand.to_numpy(), [expected.get(i, 0.0) for i in demand.index]):
+        print("Потребность расходится с GROUP BY")
+        failures += 1
+
+    blocked_time, blocked = timed(lambda: engine.blocked_products(plan))
+    print(f"{'заблокированная продукция':>30} {blocked_time:>11.4f} {'-':>10}   ({len(blocked)} позиций)")
+
+    matrix_time, costs = timed(engine.product_costs)
+    sql_time, expected = timed(lambda: sql_costs(repo))
+    print(f"{'стоимость всей продукции':>30} {matrix_time:>11.4f} {sql_time:>10.3f}")
+    if not np.allclose(costs.to_numpy(), [expected.get(i, 0.0) for i in costs.index]):
+        print("Стоимость расходится с GROUP BY")
+        failures += 1
+
+    # Правки: связь с новым или существующим материалом, затем удаление материала
+    start = time.perf_counter()
+    for _ in range(PATCHES):
+        repo.save_product_material(rnd.randint(1, N_PRODUCTS), rnd.randint(1, N_MATERIALS),
+                                   round(rnd.uniform(0.1, 10), 2), round(rnd.uniform(0, 15), 1))
+    patch = (time.perf_counter() - start) / PATCHES
+    drop, _ = timed(lambda: repo.delete_material(rnd.randint(1, N_MATERIALS)))
+    print(f"{'сохранение связи с поправкой':>30} {patch:>11.4f} {'-':>10}   (среднее по {PATCHES})")
+    print(f"{'удаление материала':>30} {drop:>11.4f} {'-':>10}")
+
+    # Новой продукции еще нет в матрице, GUI передает id строки Treeview
+    new_id = repo.save_product(Product("Новая продукция", 1, ""))
+    repo.save_product_material(str(new_id), 1, 2.0, 5.0)
+    if repo.bom().rows_of([new_id])[0] < 0:
+        print("Новая продукция не попала в матрицу")
+        failures += 1
+
+    rebuilt = BomMatrix.from_links(repo.bom_links())
+    if not same(repo.bom(), rebuilt, {product_id: 1 for product_id in range(1, N_PRODUCTS + 1)}):
+        print("Матрица после правок расходится с собранной заново")
+        failures += 1
+
+    repo.close()
+    os.remove(path)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# Массовые изменения на 10k строк: один запрос в одной транзакции против правки по одной записи
+#
+#   python benchmarks/bench_bulk_edit.py
+#
+# Для каждой операции меряется прежний путь (правка каждой записи методом Repository со своей
+# транзакцией, как из формы) и массовый метод: цена +5% у 10k материалов, остаток у материалов
+# по фильтру, потери у 10k связей одной продукции и копирование состава из 50 материалов
+# в 200 единиц продукции (10k связей). После замеров сводные таблицы сверяются с пересчетом.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from repository import MaterialFilter
+
+N_MATERIALS = 20_000
+N_PRODUCTS = 5_000
+N_LINKS = 100_000
+ROWS = 10_000
+BOM_SIZE = 50
+TARGETS = ROWS // BOM_SIZE
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def prepare(repo):
+    """Продукция 1 с ROWS материалами и продукция 2 с BOM_SIZE материалами"""
+    with repo.transaction() as cursor:
+        cursor.execute("DELETE FROM product_materials WHERE product_id IN (1, 2)")
+        cursor.executemany(
+            """INSERT INTO product_materials (product_id, material_id, required_quantity, loss_percentage)
+               VALUES (?, ?, 1.0, 5.0)""",
+            [(1, material_id) for material_id in range(1, ROWS + 1)] +
+            [(2, material_id) for material_id in range(1, BOM_SIZE + 1)]
+        )
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_bulk_edit.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    prepare(repo)
+    material_ids = list(range(1, ROWS + 1))
+    targets = list(range(3, 3 + TARGETS))
+
+    def prices_one_by_one():
+        for material_id in material_ids:
+            material = repo.get_material(material_id)
+            repo.save_material(material._replace(unit_price=round(material.unit_price * 1.05, 2)), material_id)
+
+    def losses_one_by_one():
+        for material_id in material_ids:
+            repo.save_product_material(1, material_id, 1.0, 7.0)
+
+    def copy_one_by_one():
+        bom = repo.product_materials(2)
+        for product_id in targets:
+            for material_id, _, quantity, loss, _, _ in bom:
+                repo.save_product_material(product_id, material_id, quantity, loss)
+
+    stock_filter = MaterialFilter(material_type_id=3)
+    cases = [
+        ("цена +5% (по одной)", prices_one_by_one),
+        ("цена +5% (adjust_materials)", lambda: repo.adjust_materials('unit_price', 'percent', 5, material_ids)),
+        ("остаток по фильтру (adjust_materials)",
+         lambda: repo.adjust_materials('stock_quantity', 'set', 100, filters=stock_filter)),
+        ("потери связей (по одной)", losses_one_by_one),
+        ("потери связей (set_loss_percentage)", lambda: repo.set_loss_percentage(1, 9.0)),
+        ("копирование состава (по одной)", copy_one_by_one),
+        ("копирование состава (copy_bom)", lambda: repo.copy_bom(2, targets, replace=True)),
+    ]
+    print(f"Строк в каждой операции: {ROWS}, материалов: {N_MATERIALS}, связей: {N_LINKS}")
+    print(f"{'операция':>40} {'время, мс':>10}")
+    for title, func in cases:
+        print(f"{title:>40} {timed(func) * 1000:>10.0f}")
+
+    mismatches = repo.check_product_cost() + repo.check_material_demand() + repo.check_material_alerts()
+    repo.close()
+    os.remove(path)
+    if mismatches:
+        print(f"Сводные таблицы расходятся с пересчетом: {len(mismatches)} строк")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# Правка записи и чтение во время правок: настройки SQLite по умолчанию против CONNECTION_PROFILE
+#
+#   python benchmarks/bench_connection_profile.py
+#
+# Задержка правки - время Repository.save_material для одной записи, включая COMMIT.
+# Параллельное чтение: пока поток записи без пауз сохраняет материалы, READERS потоков читают
+# окна вкладки материалов, как PagedGrid при прокрутке; считается число прочитанных окон в секунду
+# и число чтений и правок, которые не дождались блокировки (sqlite3.OperationalError: database is locked).
+# Без профиля база в режиме журнала отката: чтение ждет, пока запись держит блокировку,
+# а каждый COMMIT ждет fsync. Профиль включает WAL и synchronous = NORMAL.
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from synthetic import build_database
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+from database import CONNECTION_PROFILE
+
+N_MATERIALS = 50_000
+N_PRODUCTS = 10_000
+N_LINKS = 100_000
+N_EDITS = 300
+READERS = 3
+DURATION = 5.0  # секунд параллельной работы
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+PROFILES = [
+    ("по умолчанию", {}),
+    ("профиль", CONNECTION_PROFILE),
+]
+
+
+def edit(repo, rnd):
+    material_id = rnd.randint(1, N_MATERIALS)
+    material = repo.get_material(material_id)
+    repo.save_material(material._replace(stock_quantity=round(rnd.uniform(0, 500), 2)), material_id)
+
+
+def edit_latency(repo):
+    rnd = random.Random(1)
+    timings = []
+    for _ in range(N_EDITS):
+        start = time.perf_counter()
+        edit(repo, rnd)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def concurrent_reads(repo):
+    """Окон в секунду у читателей, правок в секунду у записи и число отказов чтения и правки
+    за DURATION секунд. Отказавшие запросы в скорость не входят, поток продолжает работу"""
+    stop = threading.Event()
+    counts = [0] * (READERS + 1)
+    locked = [0] * (READERS + 1)  # [0] - поток записи
+
+    def writer():
+        rnd = random.Random(2)
+        while not stop.is_set():
+            try:
+                edit(repo, rnd)
+            except sqlite3.OperationalError:
+                locked[0] += 1
+            else:
+                counts[0] += 1
+
+    def reader(index):
+        rnd = random.Random(index)
+        while not stop.is_set():
+            try:
+                repo.fetch_materials(rnd.randint(0, N_MATERIALS - WINDOW), WINDOW)
+            except sqlite3.OperationalError:
+                locked[index] += 1
+            else:
+                counts[index] += 1
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(1, READERS + 1)]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts[1:]) / DURATION, counts[0] / DURATION, sum(locked[1:]), locked[0]
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_connection_profile.db")
+    print(f"Материалов: {N_MATERIALS}, правок: {N_EDITS}, читателей: {READERS}, окно: {WINDOW} строк")
+    print(f"{'соединение':>14} {'правка, медиана мс':>19} {'правка, p95 мс':>15} "
+          f"{'чтений окна/с':>14} {'отказов чтения':>15} {'правок/с при чтении':>20} {'отказов правки':>15}")
+
+    for title, profile in PROFILES:
+        repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS, profile=profile)
+        median, p95 = edit_latency(repo)
+        reads, writes, locked_reads, locked_writes = concurrent_reads(repo)
+        # Если ни один запрос не дождался блокировки, скорости нет
+        reads = f"{reads:.1f}" if reads else "-"
+        writes = f"{writes:.1f}" if writes else "-"
+        print(f"{title:>14} {median * 1000:>19.2f} {p95 * 1000:>15.2f} {reads:>14} {locked_reads:>15} "
+              f"{writes:>20} {locked_writes:>15}")
+
+        mismatches = repo.check_material_demand()
+        repo.close()
+        if mismatches:
+            print(f"material_demand расходится с пересчетом: {len(mismatches)} материалов")
+            return 1
+
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# Фильтры вкладки материалов на 100k материалов: фоновый запрос, прерывание и отзывчивость окна
+#
+#   python benchmarks/bench_filter_worker.py
+#
+# Для каждого фильтра меряется запрос, который FilterBar отправляет в FilterWorker: число строк
+# и первое окно таблицы. Затем тяжелый фильтр (поиск по общему для всех наименований слову,
+# сортировка по наименованию) выполняется в потоке FilterWorker, а основной поток изображает цикл
+# событий окна: засыпает на TICK и замеряет наибольшую задержку пробуждения. Для сравнения тот же
+# запрос выполняется в основном потоке, как до FilterWorker. Последний замер - через сколько после
+# нового фильтра FilterWorker прерывает тяжелый запрос и возвращает результат нового.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from gui import FilterWorker, GRID_BUFFER, GRID_DEFAULT_ROWS
+from repository import MaterialFilter, ALERT_BELOW_MINIMUM, ALERT_BELOW_DEMAND, search_query
+
+N_MATERIALS = 100_000
+N_PRODUCTS = 20_000
+N_LINKS = 200_000
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+TICK = 0.005  # период цикла событий, с
+SORT = ("Название", False)
+
+FILTERS = [
+    ("тип", MaterialFilter(material_type_id=3)),
+    ("тип и единица", MaterialFilter(material_type_id=3, unit_id=2)),
+    ("нехватка", MaterialFilter(shortage=ALERT_BELOW_MINIMUM | ALERT_BELOW_DEMAND)),
+    ("поиск '12345'", MaterialFilter(search=search_query("12345"))),
+    ("поиск 'мат 7' и тип", MaterialFilter(search=search_query("мат 7"), material_type_id=3)),
+    ("поиск 'материал'", MaterialFilter(search=search_query("материал"))),
+]
+HEAVY = FILTERS[-1][1]
+
+
+def query(repo, filters):
+    return lambda: (repo.count_materials(filters), repo.fetch_materials(0, WINDOW, SORT, filters=filters))
+
+
+def max_tick_delay(busy):
+    """Наибольшая задержка пробуждения основного потока, пока busy() возвращает True"""
+    worst = 0.0
+    while busy():
+        start = time.perf_counter()
+        time.sleep(TICK)
+        worst = max(worst, time.perf_counter() - start - TICK)
+    return worst
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_filter_worker.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    worker = FilterWorker(repo.pool)
+
+    print(f"Материалов: {N_MATERIALS}, окно: {WINDOW} строк")
+    print(f"{'фильтр':>22} {'строк':>8} {'запрос, мс':>11}")
+    totals = []
+    for title, filters in FILTERS:
+        run = query(repo, filters)
+        start = time.perf_counter()
+        total, _ = run()
+        totals.append(total)
+        print(f"{title:>22} {total:>8} {(time.perf_counter() - start) * 1000:>11.1f}")
+
+    # Тяжелый запрос в основном потоке: окно не обрабатывает события, пока он не завершится
+    start = time.perf_counter()
+    query(repo, HEAVY)()
+    blocked = time.perf_counter() - start
+
+    # Тот же запрос в FilterWorker: основной поток продолжает просыпаться каждые TICK
+    shown = []
+    worker.submit(query(repo, HEAVY), shown.append)
+    start = time.perf_counter()
+    delay = max_tick_delay(worker.deliver)
+    in_worker = time.perf_counter() - start
+
+    # Новый фильтр во время тяжелого запроса: прежний прерывается обработчиком прогресса
+    worker.submit(query(repo, HEAVY), shown.append)
+    time.sleep(0.05)
+    start = time.perf_counter()
+    worker.cancel()
+    worker.submit(query(repo, FILTERS[0][1]), shown.append)
+    while worker.deliver():
+        time.sleep(0.001)
+    switch = time.perf_counter() - start
+
+    print(f"Тяжелый фильтр в основном потоке: окно не отвечает {blocked * 1000:.0f} мс")
+    print(f"Тяжелый фильтр в FilterWorker: {in_worker * 1000:.0f} мс, "
+          f"наибольшая задержка цикла событий {delay * 1000:.1f} мс")
+    print(f"Новый фильтр во время тяжелого: результат через {switch * 1000:.1f} мс")
+
+    repo.close()
+    os.remove(path)
+    # Показаны результаты тяжелого фильтра и нового, прерванный запрос не показан
+    if [total for total, _ in shown] != [totals[-1], totals[0]]:
+        print(f"Показаны не те результаты: {[total for total, _ in shown]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
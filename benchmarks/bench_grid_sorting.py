@@ -0,0 +1,85 @@
+# Сортировка таблиц вкладок запросом с ORDER BY
+#
+#   python benchmarks/bench_grid_sorting.py
+#
+# Для каждого сортируемого столбца замеряется чтение окна PagedGrid в начале, середине
+# и конце таблицы по возрастанию и убыванию (в таблицу выводится худшее из шести): по номеру
+# строки (OFFSET) и следующей страницы от последней строки окна (seek_row). Порядок полной
+# выборки сверяется с сортировкой в Python: числа как числа, текст по ru_key,
+# а чтение страниц от строки - с полной выборкой.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from database import ru_key
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+from repository import MATERIAL_SORT, PRODUCT_SORT, LINK_SORT
+
+N_MATERIALS = 100_000
+N_PRODUCTS = 30_000
+N_LINKS = 100_000
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def sort_key(value):
+    return ru_key(value) if isinstance(value, str) else value
+
+
+def check_order(rows, position, reverse):
+    """Значения столбца position идут по неубыванию (по невозрастанию при reverse)"""
+    keys = [sort_key(row[position]) for row in rows]
+    return keys == sorted(keys, reverse=reverse)
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_grid_sorting.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    # Материалы и продукция выводятся со всеми столбцами, у связей первый столбец - скрытый ID
+    grids = [
+        ("материалы", repo.fetch_materials, repo.count_materials, MATERIAL_SORT, list(MATERIAL_SORT)),
+        ("продукция", repo.fetch_products, repo.count_products, PRODUCT_SORT, list(PRODUCT_SORT)),
+        ("связи", repo.fetch_links, repo.count_links, LINK_SORT, ["ID"] + list(LINK_SORT)),
+    ]
+
+    print(f"Окно: {WINDOW} строк")
+    print(f"{'таблица':>10} {'столбец':>18} {'OFFSET, с':>10} {'страница, с':>12}")
+    failures = 0
+    for title, fetch, count, columns, headings in grids:
+        total = count()
+        offsets = (0, total // 2, max(0, total - 2 * WINDOW))
+        for column in columns:
+            worst = max(measure(lambda: fetch(offset, WINDOW, (column, reverse)))
+                        for reverse in (False, True)
+                        for offset in offsets)
+            fulls = {reverse: fetch(0, -1, (column, reverse)) for reverse in (False, True)}
+            worst_seek = max(measure(lambda: fetch(0, WINDOW, (column, reverse), seek_row=fulls[reverse][offset]))
+                             for reverse in (False, True)
+                             for offset in offsets)
+            ordered = all(check_order(fulls[reverse], headings.index(column), reverse)
+                          and fetch(0, WINDOW, (column, reverse), seek_row=fulls[reverse][offset])
+                          == fulls[reverse][offset + 1:offset + 1 + WINDOW]
+                          for reverse in (False, True)
+                          for offset in offsets)
+            print(f"{title:>10} {column:>18} {worst:>10.4f} {worst_seek:>12.4f} "
+                  f"{'' if ordered else 'НЕВЕРНЫЙ ПОРЯДОК'}")
+            failures += not ordered
+
+    repo.close()
+    os.remove(path)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Импорт связей из синтетических листов на 10k, 100k и 1M строк
+#
+#   python benchmarks/bench_import.py
+#
+# Лист передается в Importer готовым DataFrame, то есть замеряется только запись в БД
+# без чтения Excel. Построчный импорт через df.iterrows() (как было раньше) меряется
+# до LEGACY_LIMIT строк, дальше он занимает минуты.
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import build_database
+from importer import Importer, BATCH_SIZE
+
+N_MATERIALS = 40_000
+N_PRODUCTS = 30_000
+ROW_COUNTS = (10_000, 100_000, 1_000_000)
+LEGACY_LIMIT = 100_000
+BATCH_SIZES = (1_000, 5_000, 20_000, 100_000)
+
+
+def links_sheet(n_rows, seed=0):
+    """Лист связей в формате файла импорта, пары (продукция, материал) уникальны"""
+    rnd = random.Random(seed)
+    pairs = set()
+    while len(pairs) < n_rows:
+        pairs.add((rnd.randint(1, N_PRODUCTS), rnd.randint(1, N_MATERIALS)))
+    products, materials = zip(*pairs)
+    return pd.DataFrame({
+        'Наименование материала': [f"Материал {m}" for m in materials],
+        'Продукция': [f"Продукция {p}" for p in products],
+        'Необходимое количество материала': [round(rnd.uniform(0.1, 10), 2) for _ in range(n_rows)],
+    })
+
+
+def legacy_import(conn, df):
+    """Прежний построчный импорт связей"""
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM product_materials")
+    materials_map = {name: mid for mid, name in cursor.execute("SELECT material_id, name FROM materials")}
+    products_map = {name: pid for pid, name in cursor.execute("SELECT product_id, name FROM products")}
+    for index, row in df.iterrows():
+        material_id = materials_map.get(row['Наименование материала'])
+        product_id = products_map.get(row['Продукция'])
+        if material_id is None or product_id is None:
+            continue
+        cursor.execute(
+            """INSERT INTO product_materials (product_id, material_id, required_quantity, loss_percentage)
+               VALUES (?, ?, ?, 0)""",
+            (product_id, material_id, row['Необходимое количество материала'])
+        )
+    conn.commit()
+
+
+def timed(conn, func):
+    # Очистка предыдущего прогона не входит в замер
+    conn.execute("DELETE FROM product_materials")
+    conn.commit()
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_import.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, 0)
+    with repo.pool.connection() as conn:
+        importer = Importer(conn, log=lambda message: None)
+
+        print(f"{'строк':>10} {f'Importer (пачка {BATCH_SIZE}), с':>28} {'построчно, с':>14}")
+        for n_rows in ROW_COUNTS:
+            df = links_sheet(n_rows)
+            bulk = timed(conn, lambda: importer.import_product_materials(df))
+            legacy = f"{timed(conn, lambda: legacy_import(conn, df)):.2f}" if n_rows <= LEGACY_LIMIT else "-"
+            print(f"{n_rows:>10} {bulk:>28.2f} {legacy:>14}")
+
+        print()
+        print("Размер пачки на 100k строк")
+        df = links_sheet(100_000)
+        for batch_size in BATCH_SIZES:
+            importer.batch_size = batch_size
+            print(f"{batch_size:>10} {timed(conn, lambda: importer.import_product_materials(df)):>8.2f} с")
+
+    repo.close()
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
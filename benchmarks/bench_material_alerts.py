@@ -0,0 +1,86 @@
+# Нехватка материалов: стоимость пересчета после каждой правки на базе со 100k материалов
+#
+#   python benchmarks/bench_material_alerts.py
+#
+# Меряется сохранение материала и изменение связи в базе с триггерами material_alerts и в той же
+# базе без них (разница - цена пересчета одного материала), а также полный пересчет нехватки
+# и первое окно списка нехватки. После правок material_alerts сверяется с пересчетом.
+import os
+import random
+import sys
+import tempfile
+
+from synthetic import build_database
+from bench_product_cost import best_of
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+from repository import MaterialFilter, ALERT_BELOW_MINIMUM, ALERT_BELOW_DEMAND
+
+N_MATERIALS = 100_000
+N_PRODUCTS = 20_000
+N_LINKS = 400_000
+EDITS = 200
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+SHORTAGE = MaterialFilter(shortage=ALERT_BELOW_MINIMUM | ALERT_BELOW_DEMAND)
+
+
+def edits(repo, seed):
+    """EDITS правок остатка материала и количества в связи"""
+    rnd = random.Random(seed)
+    with repo.cursor() as cursor:
+        cursor.execute("SELECT product_id, material_id FROM product_materials LIMIT ?", (EDITS,))
+        links = cursor.fetchall()
+    materials = [(material_id, repo.get_material(material_id)) for _, material_id in links]
+
+    def save_materials():
+        for material_id, material in materials:
+            repo.save_material(material._replace(stock_quantity=round(rnd.uniform(0, 500), 2)), material_id)
+
+    def save_links():
+        for product_id, material_id in links:
+            repo.save_product_material(product_id, material_id, round(rnd.uniform(1, 50), 2), 5.0)
+
+    return save_materials, save_links
+
+
+def drop_alert_triggers(repo):
+    with repo.transaction() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'material_alerts_%'")
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP TRIGGER {name}")
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_material_alerts.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    save_materials, save_links = edits(repo, seed=1)
+
+    print(f"Материалов: {N_MATERIALS}, связей: {N_LINKS}, с нехваткой: {repo.count_materials(SHORTAGE)}")
+    print(f"{'операция':>36} {'время, мс':>10}")
+    timings = [
+        ("сохранение материала", best_of(save_materials) / EDITS),
+        ("изменение связи", best_of(save_links) / EDITS),
+        ("окно списка нехватки", best_of(lambda: repo.fetch_materials(0, WINDOW, ("Название", False),
+                                                                       filters=SHORTAGE))),
+        ("полный пересчет нехватки", best_of(repo.compute_material_alerts)),
+    ]
+    mismatches = repo.check_material_alerts()
+
+    drop_alert_triggers(repo)
+    save_materials, save_links = edits(repo, seed=1)
+    timings += [
+        ("сохранение материала без триггеров", best_of(save_materials) / EDITS),
+        ("изменение связи без триггеров", best_of(save_links) / EDITS),
+    ]
+    for title, elapsed in timings:
+        print(f"{title:>36} {elapsed * 1000:>10.3f}")
+
+    repo.close()
+    os.remove(path)
+    if mismatches:
+        print(f"material_alerts расходится с пересчетом: {len(mismatches)} материалов")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# Выбор материалов для состава продукции на 100k материалов
+#
+#   python benchmarks/bench_material_picker.py
+#
+# Прежний диалог читал наименования всех материалов и связи продукции и отбрасывал связанные
+# в Python. MaterialPicker читает страницу PICKER_PAGE_SIZE материалов по началу наименования
+# из индекса name_key, а связанные исключает в запросе. Меряются первая и сотая страница
+# для нескольких начал наименования и добавление выбранных материалов одной транзакцией.
+import os
+import sys
+import tempfile
+
+from synthetic import build_database
+from bench_product_cost import best_of
+from gui import PICKER_PAGE_SIZE
+
+N_MATERIALS = 100_000
+N_PRODUCTS = 20_000
+N_LINKS = 200_000
+PRODUCT_ID = 1
+PREFIXES = ["", "мат", "материал 12", "материал 12345"]
+BULK = 50
+
+
+def read_all(repo, product_id):
+    """Чтение до MaterialPicker: все наименования без уже связанных материалов"""
+    with repo.cursor() as cursor:
+        cursor.execute("SELECT material_id, name FROM materials")
+        materials = dict(cursor.fetchall())
+    linked_ids = repo.linked_material_ids(product_id)
+    return {k: v for k, v in materials.items() if k not in linked_ids}
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_material_picker.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+
+    print(f"Материалов: {N_MATERIALS}, страница: {PICKER_PAGE_SIZE}")
+    print(f"{'начало наименования':>22} {'первая, мс':>11} {'сотая, мс':>10}")
+    print(f"{'(все материалы, прежде)':>22} {best_of(lambda: read_all(repo, PRODUCT_ID)) * 1000:>11.2f}")
+    for prefix in PREFIXES:
+        first = best_of(lambda: repo.available_materials(PRODUCT_ID, prefix, 0, PICKER_PAGE_SIZE))
+        last = best_of(lambda: repo.available_materials(PRODUCT_ID, prefix, 99 * PICKER_PAGE_SIZE, PICKER_PAGE_SIZE))
+        print(f"{repr(prefix):>22} {first * 1000:>11.2f} {last * 1000:>10.2f}")
+
+    material_ids = [material_id for material_id, _ in repo.available_materials(PRODUCT_ID, "", 0, BULK)]
+    linked_before = len(repo.linked_material_ids(PRODUCT_ID))
+    elapsed = best_of(lambda: repo.add_product_materials(PRODUCT_ID, material_ids, 1.0, 5.0), repeat=1)
+    print(f"Добавление {BULK} материалов одной транзакцией: {elapsed * 1000:.2f} мс")
+
+    # Добавленные материалы больше не предлагаются
+    linked = repo.linked_material_ids(PRODUCT_ID)
+    offered = {material_id for material_id, _ in repo.available_materials(PRODUCT_ID)}
+    matches = len(linked) == linked_before + BULK and not linked & offered and len(linked | offered) == N_MATERIALS
+    mismatches = repo.check_product_cost()
+    repo.close()
+    os.remove(path)
+    if not matches or mismatches:
+        print("Список материалов или стоимость продукции расходятся со связями")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Окно "Продукция, использующая материал" и предупреждение при удалении материала
+#
+#   python benchmarks/bench_material_usage.py
+#
+# Один материал добавляется в состав HOT_PRODUCTS единиц продукции. Сравнивается прежнее чтение
+# (соединение четырех таблиц по всем связям материала) с обратным индексом Repository.usage():
+# число продукции для предупреждения и первое окно таблицы. После правок связей индекс
+# сверяется с product_materials.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from bench_product_cost import add_hot_material, best_of, HOT_PRODUCTS
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+
+N_MATERIALS = 20_000
+N_PRODUCTS = 60_000
+N_LINKS = 600_000
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+
+def join_products(repo, material_id):
+    """Чтение окна до обратного индекса: все связи материала одним соединением"""
+    with repo.cursor() as cursor:
+        cursor.execute("""
+                       SELECT p.name, pm.required_quantity, u.abbreviation
+                       FROM products p
+                                JOIN product_materials pm ON p.product_id = pm.product_id
+                                JOIN materials m ON pm.material_id = m.material_id
+                                JOIN units u ON m.unit_id = u.unit_id
+                       WHERE pm.material_id = ?
+                       """, (material_id,))
+        return cursor.fetchall()
+
+
+def count_links(repo, material_id):
+    with repo.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM product_materials WHERE material_id = ?", (material_id,))
+        return cursor.fetchone()[0]
+
+
+def index_matches(repo):
+    links = {}
+    for material_id, product_id, quantity in repo.usage_links():
+        links.setdefault(material_id, {})[product_id] = quantity
+    indexed = {material_id: dict(zip(product_ids.tolist(), quantities.tolist()))
+               for material_id, (product_ids, quantities) in repo.usage().columns.items() if len(product_ids)}
+    return links == indexed
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_material_usage.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    hot_id = add_hot_material(repo)
+
+    start = time.perf_counter()
+    repo.usage()
+    build = time.perf_counter() - start
+
+    print(f"Продукции: {N_PRODUCTS}, связей: {N_LINKS + HOT_PRODUCTS}, с материалом: {HOT_PRODUCTS}")
+    print(f"Построение обратного индекса: {build:.3f} с")
+    cases = [
+        ("все связи материала (JOIN)", lambda: join_products(repo, hot_id)),
+        ("окно из индекса", lambda: repo.products_using_material(hot_id, 0, WINDOW)),
+        ("число продукции (COUNT)", lambda: count_links(repo, hot_id)),
+        ("число продукции из индекса", lambda: repo.count_products_using_material(hot_id)),
+        ("изменение связи с индексом", lambda: repo.save_product_material(HOT_PRODUCTS // 2, hot_id, 3.0, 5.0)),
+    ]
+    print(f"{'операция':>30} {'время, мс':>10}")
+    for title, func in cases:
+        print(f"{title:>30} {best_of(func) * 1000:>10.2f}")
+
+    repo.delete_product_material(1, hot_id)
+    repo.delete_product(2)
+    repo.delete_material(1)
+    matches = index_matches(repo) and repo.count_products_using_material(hot_id) == count_links(repo, hot_id)
+    repo.close()
+    os.remove(path)
+    if not matches:
+        print("Обратный индекс расходится с product_materials")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+# Время загрузки вкладки материалов в зависимости от количества связей
+#
+#   python benchmarks/bench_materials_tab.py
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+
+N_MATERIALS = 40_000
+N_PRODUCTS = 5_000
+LINK_COUNTS = (10_000, 50_000, 100_000, 200_000)
+
+# Построчный расчет (запрос на каждый материал) меряем только на части каталога,
+# на полном каталоге он выполняется десятки секунд
+PER_ROW_SAMPLE = 500
+
+
+def per_row(repo):
+    with repo.cursor() as cursor:
+        cursor.execute("SELECT material_id FROM materials LIMIT ?", (PER_ROW_SAMPLE,))
+        for (material_id,) in cursor.fetchall():
+            cursor.execute("SELECT SUM(required_quantity) FROM product_materials WHERE material_id = ?",
+                           (material_id,))
+            cursor.fetchone()
+
+
+def group_by(repo):
+    with repo.cursor() as cursor:
+        cursor.execute("SELECT material_id, SUM(required_quantity) FROM product_materials GROUP BY material_id")
+        cursor.fetchall()
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_materials_tab.db")
+    print(f"Материалов: {N_MATERIALS}")
+    print(f"{'связей':>10} {'вкладка (material_demand), с':>30} {'GROUP BY по связям, с':>24} "
+          f"{f'построчно ({PER_ROW_SAMPLE} шт.), с':>28}")
+
+    for n_links in LINK_COUNTS:
+        repo = build_database(path, N_MATERIALS, N_PRODUCTS, n_links)
+        tab = measure(repo.fetch_materials)
+        aggregate = measure(lambda: group_by(repo))
+        legacy = measure(lambda: per_row(repo), repeat=1)
+        print(f"{n_links:>10} {tab:>30.3f} {aggregate:>24.3f} {legacy:>28.3f}")
+
+        mismatches = repo.check_material_demand()
+        if mismatches:
+            print(f"material_demand расходится с пересчетом: {len(mismatches)} материалов")
+            return 1
+        repo.close()
+
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
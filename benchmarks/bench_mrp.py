@@ -0,0 +1,94 @@
+# Расчет закупок по плану производства: MrpEngine (NumPy) против запроса GROUP BY
+#
+#   python benchmarks/bench_mrp.py
+#
+# Загрузка - сборка матрицы связей и чтение остатков (первый вызов load()).
+# Расчет плана - MrpEngine.requirements() для плана из PLAN_PRODUCTS позиций над N_LINKS связями;
+# каждый расчет заново читает остатки, и это время входит в результат.
+# Для сравнения та же валовая потребность считается в SQLite: план во временной таблице
+# и GROUP BY по связям. Результаты сверяются между собой, а план "вся продукция по одной
+# штуке" - с required_with_losses из material_demand.
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import build_database
+from planning import MrpEngine
+
+N_MATERIALS = 50_000
+N_PRODUCTS = 50_000
+N_LINKS = 1_000_000
+PLAN_PRODUCTS = 10_000
+
+
+def measure(func, repeat=5):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def sql_gross(repo, plan):
+    with repo.transaction() as cursor:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS plan (product_id INTEGER PRIMARY KEY, quantity REAL)")
+        cursor.execute("DELETE FROM temp.plan")
+        cursor.executemany("INSERT INTO temp.plan VALUES (?, ?)", plan.items())
+        cursor.execute("""
+                       SELECT pm.material_id,
+                              SUM(pl.quantity * pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                  COALESCE(pt.coefficient, 1.0))
+                       FROM temp.plan pl
+                                JOIN product_materials pm ON pm.product_id = pl.product_id
+                                JOIN products p ON pm.product_id = p.product_id
+                                LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                       GROUP BY pm.material_id
+                       """)
+        return dict(cursor.fetchall())
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_mrp.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    rnd = random.Random(0)
+    plan = {product_id: rnd.randint(1, 100) for product_id in rnd.sample(range(1, N_PRODUCTS + 1), PLAN_PRODUCTS)}
+
+    engine = MrpEngine(repo)
+    load, _ = measure(engine.load, repeat=1)
+    compute, requirements = measure(lambda: engine.requirements(plan))
+    gross_only, _ = measure(lambda: engine.gross_requirements(plan))
+    in_sql, expected = measure(lambda: sql_gross(repo, plan), repeat=1)
+
+    print(f"Связей: {N_LINKS}, материалов: {N_MATERIALS}, позиций плана: {PLAN_PRODUCTS}")
+    print(f"{'загрузка связей, с':>28} {load:>8.3f}")
+    print(f"{'валовая потребность, с':>28} {gross_only:>8.3f}")
+    print(f"{'расчет закупок, с':>28} {compute:>8.3f}")
+    print(f"{'GROUP BY в SQLite, с':>28} {in_sql:>8.3f}")
+    print(f"Материалов в расчете: {len(requirements)}, к закупке: {int((requirements['purchase'] > 0).sum())}")
+
+    failures = 0
+    gross = engine.gross_requirements(plan)
+    wanted = np.array([expected.get(material_id, 0.0) for material_id in gross.index])
+    if not np.allclose(gross.to_numpy(), wanted):
+        print("Потребность расходится с GROUP BY")
+        failures += 1
+    whole_catalog = engine.gross_requirements({product_id: 1 for product_id in range(1, N_PRODUCTS + 1)})
+    with repo.cursor() as cursor:
+        demand = dict(cursor.execute("SELECT material_id, required_with_losses FROM material_demand"))
+    if not np.allclose(whole_catalog.to_numpy(), [demand.get(material_id, 0.0) for material_id in whole_catalog.index]):
+        print("Потребность по одной штуке расходится с material_demand")
+        failures += 1
+
+    repo.close()
+    os.remove(path)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
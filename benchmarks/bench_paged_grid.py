@@ -0,0 +1,85 @@
+# Чтение таблиц вкладок целиком и окнами PagedGrid
+#
+#   python benchmarks/bench_paged_grid.py
+#
+# Раньше вкладка при каждом обновлении читала и вставляла в Treeview все строки. PagedGrid
+# читает только окно (видимые строки и GRID_BUFFER строк запаса с каждой стороны); замеряется
+# общее число строк для полосы прокрутки и чтение окна в начале, середине и конце таблицы:
+#   - OFFSET от начала таблицы (так PagedGrid читал окна прежде, время растет с номером строки);
+#   - прокрутка страницей: дочитывание от крайней строки окна по ключу сортировки (seek_row);
+#   - переход полосой прокрутки: OFFSET от ближнего конца таблицы, дороже всего середина.
+# Вставка элементов Treeview здесь не меряется: для нее нужен дисплей, а число элементов
+# у PagedGrid ограничено высотой окна.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+
+N_MATERIALS = 100_000
+N_PRODUCTS = 30_000
+N_LINKS = 200_000
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+
+def measure(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def jump(fetch, total, offset):
+    """Окно по номеру строки, как PagedGrid.read(): OFFSET от ближнего конца"""
+    from_end = total - offset - WINDOW
+    if from_end < offset:
+        return fetch(max(0, from_end), WINDOW, backward=True)
+    return fetch(offset, WINDOW)
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_paged_grid.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    grids = [
+        ("материалы", repo.fetch_materials, repo.count_materials),
+        ("продукция", repo.fetch_products, repo.count_products),
+        ("связи", repo.fetch_links, repo.count_links),
+    ]
+
+    print(f"Окно: {WINDOW} строк, время в мс")
+    print(f"{'таблица':>10} {'строк':>9} {'целиком':>8} {'число строк':>12} {'способ':>10} "
+          f"{'начало':>7} {'середина':>9} {'конец':>7}")
+    for title, fetch, count in grids:
+        total = count()
+        full = fetch()
+        elapsed = measure(fetch, repeat=1)
+        counted = measure(count)
+        offsets = (0, total // 2, max(0, total - 2 * WINDOW))
+        # Строка над следующей страницей - последняя строка окна, от нее PagedGrid читает дальше
+        methods = [
+            ("OFFSET", lambda offset: fetch(offset + WINDOW, WINDOW)),
+            ("страница", lambda offset: fetch(0, WINDOW, seek_row=full[offset + WINDOW - 1])),
+            ("переход", lambda offset: jump(fetch, total, offset + WINDOW)),
+        ]
+        for number, (method, read) in enumerate(methods):
+            windows = [measure(lambda: read(offset)) for offset in offsets]
+            lead = f"{title:>10} {total:>9} {elapsed * 1000:>8.0f} {counted * 1000:>12.2f}" if not number else " " * 42
+            print(f"{lead} {method:>10} {windows[0] * 1000:>7.2f} {windows[1] * 1000:>9.2f} {windows[2] * 1000:>7.2f}")
+
+            expected = [full[offset + WINDOW:offset + 2 * WINDOW] for offset in offsets]
+            if [read(offset) for offset in offsets] != expected:
+                print("Окно не совпадает с соответствующей частью полной выборки")
+                return 1
+
+    repo.close()
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Стоимость продукции: изменение цены материала, который входит в большую часть продукции
+#
+#   python benchmarks/bench_product_cost.py
+#
+# Один материал добавляется в состав HOT_PRODUCTS единиц продукции. Новая цена этого материала
+# меняет product_cost триггером только в строках этой продукции; для сравнения меряется полный
+# пересчет стоимости по всем связям. После замеров product_cost сверяется с пересчетом.
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+from repository import Material
+
+N_MATERIALS = 20_000
+N_PRODUCTS = 60_000
+N_LINKS = 600_000
+HOT_PRODUCTS = 50_000
+REPEAT = 5
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+
+def best_of(func, repeat=REPEAT):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def add_hot_material(repo):
+    """Материал в составе первых HOT_PRODUCTS единиц продукции; возвращает его material_id"""
+    material = Material("Материал в составе всей продукции", 1, 1, 10.0, 0.0, 0.0, 1)
+    material_id = repo.save_material(material)
+    with repo.transaction() as cursor:
+        cursor.executemany(
+            """INSERT INTO product_materials (product_id, material_id, required_quantity, loss_percentage)
+               VALUES (?, ?, 2.0, 5.0)""",
+            ((product_id, material_id) for product_id in range(1, HOT_PRODUCTS + 1))
+        )
+    return material_id
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_product_cost.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+    hot_id = add_hot_material(repo)
+    hot = repo.get_material(hot_id)
+    prices = iter(range(11, 11 + 2 * REPEAT))
+
+    def change_price():
+        repo.save_material(hot._replace(unit_price=float(next(prices))), hot_id)
+
+    print(f"Продукции: {N_PRODUCTS}, связей: {N_LINKS + HOT_PRODUCTS}, с материалом: {HOT_PRODUCTS}")
+    cases = [
+        ("новая цена материала (триггер)", change_price),
+        ("полный пересчет стоимости", repo.compute_product_cost),
+        ("изменение связи", lambda: repo.save_product_material(1, hot_id, 3.0, 5.0)),
+        ("окно вкладки продукции", lambda: repo.fetch_products(0, WINDOW)),
+        ("окно по стоимости", lambda: repo.fetch_products(0, WINDOW, ("Стоимость", True))),
+    ]
+    print(f"{'операция':>32} {'время, мс':>10}")
+    for title, func in cases:
+        print(f"{title:>32} {best_of(func) * 1000:>10.2f}")
+
+    mismatches = repo.check_product_cost()
+    repo.close()
+    os.remove(path)
+    if mismatches:
+        print(f"product_cost расходится с пересчетом: {len(mismatches)} единиц продукции")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# Поиск в таблицах вкладок: индекс FTS5 против LIKE по наименованию
+#
+#   python benchmarks/bench_search.py
+#
+# Для каждой строки поиска меряется первое окно таблицы (лучшее из REPEAT) и число найденных
+# строк для полосы прокрутки. Для сравнения - тот же поиск через LIKE '%...%' по связям, который
+# читает все строки. Запрос, под который подходит каждая строка таблицы (общее слово всех
+# наименований), сортирует все совпадения и в замер не входит.
+import os
+import sys
+import tempfile
+
+from synthetic import build_database
+from bench_product_cost import best_of
+from gui import GRID_BUFFER, GRID_DEFAULT_ROWS
+from repository import MaterialFilter, ProductFilter, search_query
+
+N_MATERIALS = 200_000
+N_PRODUCTS = 50_000
+N_LINKS = 1_000_000
+WINDOW = GRID_DEFAULT_ROWS + 2 * GRID_BUFFER
+
+SEARCHES = ["материал 12345", "мат 777", "продукция 4242", "прод 99"]
+
+
+def like_links(repo, text):
+    with repo.cursor() as cursor:
+        cursor.execute("""
+                       SELECT COUNT(*)
+                       FROM product_materials pm
+                                JOIN products p ON pm.product_id = p.product_id
+                                JOIN materials m ON pm.material_id = m.material_id
+                       WHERE p.name LIKE ? OR m.name LIKE ?
+                       """, (f"%{text}%", f"%{text}%"))
+        return cursor.fetchone()[0]
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "bench_search.db")
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, N_LINKS)
+
+    # Таблица -> параметр поиска для fetch и count
+    tables = [
+        ("материалы", repo.fetch_materials, repo.count_materials, ("Название", False),
+         lambda text: {'filters': MaterialFilter(search=search_query(text))}),
+        ("продукция", repo.fetch_products, repo.count_products, ("Название", False),
+         lambda text: {'filters': ProductFilter(search=search_query(text))}),
+        ("связи", repo.fetch_links, repo.count_links, ("Продукция", False),
+         lambda text: {'search': search_query(text, ("name",))}),
+    ]
+    print(f"Материалов: {N_MATERIALS}, продукции: {N_PRODUCTS}, связей: {N_LINKS}")
+    print(f"{'таблица':>10} {'поиск':>16} {'найдено':>8} {'окно, мс':>9} {'число, мс':>10}")
+    for title, fetch, count, sort, search in tables:
+        for text in SEARCHES:
+            window = best_of(lambda: fetch(0, WINDOW, sort, **search(text)))
+            counted = best_of(lambda: count(**search(text)))
+            print(f"{title:>10} {text:>16} {count(**search(text)):>8} {window * 1000:>9.2f} {counted * 1000:>10.2f}")
+
+    text = SEARCHES[0]
+    print(f"LIKE по связям '{text}': {best_of(lambda: like_links(repo, text), repeat=1) * 1000:.0f} мс")
+    repo.close()
+    os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
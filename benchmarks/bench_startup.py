@@ -0,0 +1,121 @@
+# Время запуска: окно до первой отрисовки и командная строка
+#
+#   python benchmarks/bench_startup.py
+#
+# Каждый замер - новый процесс Python (время от запуска интерпретатора), лучший из REPEAT.
+# Окно: импорт gui, создание MaterialApp над синтетической базой и root.update() - первая отрисовка.
+# Для сравнения меряется тот же запуск с загрузкой pandas и PIL, как было до отложенного импорта.
+# Скрипт завершается с кодом 1, если при запуске загружены модули из FORBIDDEN или окно
+# отрисовывается дольше FIRST_PAINT_LIMIT. Без дисплея замер окна пропускается, проверяется импорт gui.
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from database import DB_PATH
+from gui import LOGO_CACHE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEAT = 5
+FIRST_PAINT_LIMIT = 1.5  # с
+
+# Модули, которых не должно быть после запуска
+FORBIDDEN = {
+    'окно': {'pandas', 'PIL'},
+    'импорт gui': {'pandas', 'PIL'},
+    'командная строка': {'tkinter', 'PIL', 'pandas'},
+}
+
+FIRST_PAINT = """
+import sys
+sys.path.insert(0, {root!r})
+{preload}
+import gui
+try:
+    root = gui.tk.Tk()
+except gui.tk.TclError:
+    print("nodisplay")
+    sys.exit(0)
+app = gui.MaterialApp(root)
+root.update()
+print(" ".join(sys.modules))
+root.destroy()
+app.repository.close()
+"""
+
+IMPORT_GUI = """
+import sys
+sys.path.insert(0, {root!r})
+{preload}
+import gui
+print(" ".join(sys.modules))
+"""
+
+CLI = """
+import sys
+sys.path.insert(0, {root!r})
+import main
+main.main(["--db", {db!r}, "demand-report", "--output", {output!r}])
+print(" ".join(sys.modules))
+"""
+
+EAGER_PRELOAD = "import pandas, PIL.Image, PIL.ImageTk"
+
+
+def run(script, cwd):
+    """(лучшее время, модули процесса) или (None, None), если нет дисплея"""
+    best, modules = None, None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", script], cwd=cwd, check=True,
+                                capture_output=True, text=True).stdout
+        elapsed = time.perf_counter() - start
+        if output.strip() == "nodisplay":
+            return None, None
+        best = elapsed if best is None else min(best, elapsed)
+        modules = set(output.split())
+    return best, modules
+
+
+def main():
+    # Окно открывает furniture_company.db в текущем каталоге: запуск идет во временном каталоге
+    # с синтетической базой и готовым логотипом
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    db_path = os.path.join(workdir, DB_PATH)
+    build_database(db_path, 10_000, 2_000, 20_000).close()
+    if os.path.exists(os.path.join(ROOT, LOGO_CACHE)):
+        shutil.copy(os.path.join(ROOT, LOGO_CACHE), workdir)
+
+    fields = {'root': ROOT, 'db': db_path, 'output': os.path.join(workdir, "report.csv")}
+    cases = [
+        ('окно', FIRST_PAINT.format(preload="", **fields)),
+        ('окно с pandas и PIL', FIRST_PAINT.format(preload=EAGER_PRELOAD, **fields)),
+        ('импорт gui', IMPORT_GUI.format(preload="", **fields)),
+        ('импорт gui с pandas и PIL', IMPORT_GUI.format(preload=EAGER_PRELOAD, **fields)),
+        ('командная строка', CLI.format(**fields)),
+    ]
+
+    failures = 0
+    print(f"{'запуск':>28} {'время, с':>9}  загруженные лишние модули")
+    for title, script in cases:
+        elapsed, modules = run(script, workdir)
+        if elapsed is None:
+            print(f"{title:>28} {'-':>9}  нет дисплея, замер пропущен")
+            continue
+        loaded = sorted(FORBIDDEN.get(title, set()) & modules)
+        print(f"{title:>28} {elapsed:>9.3f}  {', '.join(loaded) or '-'}")
+        if loaded:
+            failures += 1
+        if title == 'окно' and elapsed > FIRST_PAINT_LIMIT:
+            print(f"Первая отрисовка дольше {FIRST_PAINT_LIMIT} с")
+            failures += 1
+
+    shutil.rmtree(workdir)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
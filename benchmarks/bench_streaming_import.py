@@ -0,0 +1,72 @@
+# Пиковая память при импорте связей целиком и в потоковом режиме
+#
+#   python benchmarks/bench_streaming_import.py
+#
+# Память меряется через tracemalloc (numpy и pandas сообщают ему о своих массивах),
+# время под tracemalloc заметно выше обычного. В потоковом режиме пик определяется
+# размером части (CHUNK_SIZE), а не файла. Для xlsx к нему добавляется таблица общих
+# строк книги, которую openpyxl держит в памяти: она растет с числом разных наименований,
+# но не с числом строк.
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from openpyxl import Workbook
+
+from bench_import import N_MATERIALS, N_PRODUCTS, links_sheet
+from synthetic import build_database
+from importer import Importer, read_sheet, iter_sheet
+
+CSV_ROWS = (100_000, 300_000, 1_000_000)
+XLSX_ROWS = (20_000, 100_000)
+
+
+def write_xlsx(df, path):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def measure(importer, load):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = importer.import_product_materials(load())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20, result.inserted
+
+
+def main():
+    tmp = tempfile.gettempdir()
+    db_path = os.path.join(tmp, "bench_streaming_import.db")
+    repo = build_database(db_path, N_MATERIALS, N_PRODUCTS, 0)
+    with repo.pool.connection() as conn:
+        importer = Importer(conn, log=lambda message: None)
+
+        print(f"{'файл':>6} {'строк':>10} {'целиком: с / МБ':>20} {'потоково: с / МБ':>20}")
+        for extension, counts, writer in (("csv", CSV_ROWS, lambda df, path: df.to_csv(path, index=False)),
+                                          ("xlsx", XLSX_ROWS, write_xlsx)):
+            for n_rows in counts:
+                path = os.path.join(tmp, f"bench_streaming_import.{extension}")
+                writer(links_sheet(n_rows), path)
+
+                full_time, full_peak, _ = measure(importer, lambda: read_sheet(path))
+                stream_time, stream_peak, inserted = measure(importer, lambda: iter_sheet(path))
+                assert inserted == n_rows
+                print(f"{extension:>6} {n_rows:>10} {full_time:>11.1f} / {full_peak:>6.0f} "
+                      f"{stream_time:>11.1f} / {stream_peak:>6.0f}")
+                os.remove(path)
+
+    repo.close()
+    os.remove(db_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# Повторный импорт почти неизменного листа: режим замены против режима обновления
+#
+#   python benchmarks/bench_upsert_import.py
+#
+# В базу импортируется лист связей, затем в нем меняется CHANGED_SHARE строк (новые
+# количества, новые пары и удаленные пары) и он импортируется снова. Для каждого режима
+# выводятся время и число измененных строк product_materials (удаленных, добавленных и
+# обновленных). Итоговое содержимое product_materials, material_demand и product_cost сверяется.
+import os
+import random
+import sys
+import tempfile
+import time
+
+from synthetic import build_database
+from bench_import import links_sheet, N_MATERIALS, N_PRODUCTS
+from importer import Importer
+
+N_ROWS = 100_000
+CHANGED_SHARE = 0.01
+
+
+def changed_sheet(df, share, seed=1):
+    """Копия листа, в которой share строк изменены: треть количеств, треть новых пар, треть удалена"""
+    rnd = random.Random(seed)
+    df = df.copy()
+    n = max(3, int(len(df) * share)) // 3
+    rows = rnd.sample(range(len(df)), 3 * n)
+    quantity = df.columns[2]
+    for i in rows[:n]:
+        df.loc[i, quantity] = df.loc[i, quantity] + 1
+    for i in rows[n:2 * n]:
+        # Пара с гарантированно отсутствующим в листе материалом
+        df.loc[i, df.columns[0]] = f"Материал {N_MATERIALS - rnd.randrange(10)}"
+    df = df.drop(index=rows[2 * n:]).drop_duplicates(subset=list(df.columns[:2]))
+    return df.reset_index(drop=True)
+
+
+def run(path, first, second, upsert):
+    repo = build_database(path, N_MATERIALS, N_PRODUCTS, 0)
+    with repo.pool.connection() as conn:
+        Importer(conn, log=lambda message: None).import_product_materials(first)
+        rows_before = conn.execute("SELECT COUNT(*) FROM product_materials").fetchone()[0]
+        start = time.perf_counter()
+        result = Importer(conn, log=lambda message: None, upsert=upsert).import_product_materials(second)
+        elapsed = time.perf_counter() - start
+        # В режиме замены таблица удаляется целиком и записывается заново
+        written = result.written + (result.deleted if upsert else rows_before)
+        state = (sorted(conn.execute(
+                     "SELECT product_id, material_id, required_quantity, loss_percentage FROM product_materials")),
+                 repo.compute_material_demand())
+    assert not repo.check_material_demand()
+    assert not repo.check_product_cost()
+    repo.close()
+    return elapsed, written, result, state
+
+
+def main():
+    first = links_sheet(N_ROWS)
+    # Пары с последними материалами в исходный лист не входят, их добавляет changed_sheet
+    first = first[~first[first.columns[0]].isin(
+        [f"Материал {N_MATERIALS - i}" for i in range(10)])].reset_index(drop=True)
+    second = changed_sheet(first, CHANGED_SHARE)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f"Строк в листе: {len(second)}, изменено: {CHANGED_SHARE:.0%}")
+        print(f"{'режим':>10} {'время, с':>10} {'изменено строк':>16}")
+        replace_time, replace_written, _, replace_state = run(path, first, second, upsert=False)
+        print(f"{'замена':>10} {replace_time:10.2f} {replace_written:16}")
+        upsert_time, upsert_written, result, upsert_state = run(path, first, second, upsert=True)
+        print(f"{'обновление':>10} {upsert_time:10.2f} {upsert_written:16}")
+        print(f"Добавлено: {result.inserted}, обновлено: {result.updated}, "
+              f"без изменений: {result.unchanged}, удалено: {result.deleted}")
+        if replace_state[0] != upsert_state[0]:
+            print("Содержимое product_materials различается")
+            sys.exit(1)
+        mismatched = [key for key in replace_state[1]
+                      if any(abs(a - b) > 1e-6 for a, b in zip(replace_state[1][key], upsert_state[1][key]))]
+        if mismatched or replace_state[1].keys() != upsert_state[1].keys():
+            print("Потребность материалов различается")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
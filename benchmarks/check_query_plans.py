@@ -0,0 +1,353 @@
+# Проверка планов запросов приложения через EXPLAIN QUERY PLAN
+#
+#   python benchmarks/check_query_plans.py
+#
+# Проверяются те запросы, которые выполняют Repository и Importer: сценарии ниже вызывают их методы
+# на синтетической базе, а соединения пула (RecordingConnection) перед выполнением каждого SELECT,
+# INSERT, UPDATE и DELETE строят его план с теми же параметрами. Поэтому новые условия фильтров,
+# seek() и order_by() попадают в проверку без правок этого файла. Запросы триггеров берутся
+# из sqlite_master: ссылки NEW. и OLD. заменяются параметрами.
+#
+# Для каждого сценария задан набор таблиц (псевдонимов), которые его запросы могут читать полным
+# проходом (SCAN). Любой другой SCAN означает, что нужный индекс не используется.
+# Окна таблиц на вкладках (PagedGrid) читают по порядку первичного ключа или индекса таблицу,
+# с которой начинается соединение, поэтому для них разрешен проход только по ней. Страница от строки
+# окна (seek_row) ищет начало в индексе и проходов не делает, кроме сортировок по вычисляемым
+# и неиндексированным столбцам: окно выбирается сортировкой всех строк соединения.
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+
+from synthetic import build_database
+from importer import Importer, FULL_IMPORT_ORDER, IMPORT_STAGES
+from planning import MrpEngine
+from repository import (ConnectionPool, Repository, EXPORT_QUERIES, MATERIAL_SORT, PRODUCT_SORT, LINK_SORT,
+                        ALERT_BELOW_DEMAND, ALERT_BELOW_MINIMUM, Material, Product, MaterialFilter, ProductFilter,
+                        search_query)
+
+WINDOW = 430
+# Строка, от которой читаются окна и страницы сценариев вкладок
+OFFSET = 100
+
+# Запросы, план которых проверяется; остальное (PRAGMA, BEGIN, CREATE, DROP) плана не имеет
+PLANNED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def full_scans(cursor, sql, params):
+    """Таблицы, которые план читает полным проходом"""
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    scans = set()
+    for row in cursor.fetchall():
+        detail = row[-1]
+        if detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT ROW"):
+            scans.add(detail.split()[1])
+    return scans
+
+
+class RecordingCursor(sqlite3.Cursor):
+    """Курсор, который перед выполнением запроса передает его соединению для плана"""
+
+    def execute(self, sql, parameters=()):
+        self.connection.record(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        rows = list(seq_of_parameters)
+        if rows:
+            self.connection.record(sql, rows[0])
+        return super().executemany(sql, rows)
+
+
+class RecordingConnection(sqlite3.Connection):
+    """Соединение, которое записывает планы запросов текущего сценария в plans"""
+    plans = None  # [(запрос, таблицы полного прохода)]; None - планы не записываются
+
+    def cursor(self, factory=RecordingCursor):
+        return super().cursor(factory)
+
+    def record(self, sql, parameters):
+        plans = RecordingConnection.plans
+        if plans is not None and sql.lstrip().upper().startswith(PLANNED):
+            plans.append((sql, full_scans(super().cursor(), sql, parameters)))
+
+
+@contextmanager
+def unrecorded():
+    """Запросы блока не проверяются: подготовка данных для вызовов сценария"""
+    plans, RecordingConnection.plans = RecordingConnection.plans, None
+    try:
+        yield
+    finally:
+        RecordingConnection.plans = plans
+
+
+def first_expression_table(columns, column, main):
+    """Псевдоним таблицы первого выражения сортировки, для вычисляемого выражения - main"""
+    alias = columns[column][0][0].split('.')[0]
+    return alias if alias.isidentifier() else main
+
+
+def grid_scenarios(tab, fetch, columns, main, filters=(), unindexed=None):
+    """Окна вкладки по каждому столбцу: OFFSET с начала и с конца таблицы, страницы от строки окна
+    вниз и вверх в обоих направлениях сортировки. filters - [(название, аргументы fetch, проходы)],
+    unindexed - {столбец без индекса сортировки: проходы}"""
+    unindexed = unindexed or {}
+    scenarios = []
+    for column in columns:
+        def windows(repo, column=column):
+            for reverse in (False, True):
+                getattr(repo, fetch)(OFFSET, WINDOW, (column, reverse))
+                getattr(repo, fetch)(0, WINDOW, (column, reverse), backward=True)
+
+        def pages(repo, column=column):
+            for reverse in (False, True):
+                with unrecorded():
+                    row = getattr(repo, fetch)(OFFSET, 1, (column, reverse))[0]
+                getattr(repo, fetch)(0, WINDOW, (column, reverse), seek_row=row)
+                getattr(repo, fetch)(0, WINDOW, (column, reverse), seek_row=row, backward=True)
+
+        scenarios.append((f"Вкладка {tab} по столбцу {column}", windows,
+                          unindexed.get(column, {first_expression_table(columns, column, main)})))
+        scenarios.append((f"Вкладка {tab} по столбцу {column}: страница от строки", pages,
+                          unindexed.get(column, set())))
+
+    for title, kwargs, allowed in filters:
+        def filtered(repo, kwargs=kwargs):
+            for column in list(columns)[:2]:
+                sort = (column, False)
+                with unrecorded():
+                    rows = getattr(repo, fetch)(0, 2, sort, **kwargs)
+                getattr(repo, fetch)(0, WINDOW, sort, **kwargs)
+                if rows:
+                    getattr(repo, fetch)(0, WINDOW, sort, seek_row=rows[-1], **kwargs)
+
+        scenarios.append((f"Вкладка {tab}: {title}", filtered, allowed))
+    return scenarios
+
+
+def material_forms(repo):
+    repo.material_types()
+    repo.units()
+    material = repo.get_material(1)
+    repo.save_material(material, 1)
+    material_id = repo.save_material(Material("Материал проверки", 1, 1, 10.0, 5.0, 1.0, 1))
+    repo.delete_material(material_id)
+
+
+def product_forms(repo):
+    repo.product_types()
+    product = repo.get_product(1)
+    repo.save_product(product, 1)
+    product_id = repo.save_product(Product("Продукция проверки", 1, ""))
+    repo.delete_product(product_id)
+
+
+def product_materials(repo):
+    repo.product_materials(1)
+    repo.product_cost(1)
+    repo.available_materials(1, "материал 1", 0, 100)
+    repo.available_materials(1, "", 0, 100)
+    linked = repo.linked_material_ids(1)
+    free = [material_id for material_id, _ in repo.available_materials(1, "", 0, 3)]
+    repo.get_product_material(1, free[0])
+    repo.save_product_material(1, free[0], 2.0, 1.0)
+    repo.save_product_material(1, free[0], 3.0, 1.0)
+    repo.delete_product_material(1, free[0])
+    repo.add_product_materials(1, free[1:], 1.0, 0.0)
+    if linked:
+        repo.get_product_material(1, next(iter(linked)))
+
+
+def bulk_edits(repo):
+    repo.adjust_materials('unit_price', 'percent', 5, material_ids=[1, 2, 3])
+    repo.adjust_materials('stock_quantity', 'set', 100, filters=MaterialFilter(material_type_id=1))
+    repo.adjust_materials('stock_quantity', 'add', 1, filters=MaterialFilter(search=search_query("материал 12")))
+    repo.set_loss_percentage(1, 7.0)
+    repo.set_loss_percentage(1, 5.0, material_ids=[1, 2, 3])
+    repo.copy_bom(2, [3, 4, 5])
+    repo.copy_bom(2, filters=ProductFilter(product_type_id=1), replace=True)
+
+
+def material_view(repo):
+    repo.material_demand(1)
+    repo.products_using_material(1, 0, 100)
+    repo.count_products_using_material(1)
+    repo.required_quantity(1)
+    repo.fetch_materials(material_ids=[1, 2, 3])
+
+
+def planning(repo):
+    plan = repo.product_ids(["Продукция 1", "Продукция 2", "Продукция 3"])
+    engine = MrpEngine(repo)
+    engine.requirements({product_id: 10 for product_id in plan.values()})
+    engine.blocked_products({product_id: 10 for product_id in plan.values()})
+
+
+def export(table):
+    def run(repo):
+        with repo.export(table) as (_, rows):
+            rows.fetchall()
+    return run
+
+
+def demand_report(repo):
+    for shortage_only in (False, True):
+        with repo.demand_report(shortage_only) as (_, rows):
+            rows.fetchall()
+
+
+def import_stages(tables, upsert):
+    """Повторный импорт выгруженных таблиц одной транзакцией, как полный импорт в окне"""
+    def run(repo):
+        sheets = {}
+        with unrecorded():
+            for table in tables:
+                with repo.export(table) as (headers, rows):
+                    sheets[table] = pd.DataFrame(rows.fetchall(), columns=headers)
+        with repo.pool.connection() as conn:
+            importer = Importer(conn, log=lambda message: None, upsert=upsert, lookups=repo.lookups)
+            with importer.transaction():
+                for table in tables:
+                    getattr(importer, IMPORT_STAGES[table][2])(sheets[table])
+        repo.invalidate_bom()
+    return run
+
+
+# Проходы разрешены по таблице, с которой начинается окно; у вычисляемых сортировок - по основной таблице
+MATERIAL_FILTERS = [
+    ("поиск", {"filters": MaterialFilter(search=search_query("материал 12"))}, {"materials_fts"}),
+    ("тип и единица", {"filters": MaterialFilter(material_type_id=1, unit_id=1)}, set()),
+    # Окно с нехваткой сортируется среди материалов из material_alerts
+    ("нехватка", {"filters": MaterialFilter(shortage=ALERT_BELOW_DEMAND)}, {"a"}),
+    ("ниже минимума", {"filters": MaterialFilter(shortage=ALERT_BELOW_MINIMUM)}, {"a"}),
+]
+PRODUCT_FILTERS = [
+    ("поиск", {"filters": ProductFilter(search=search_query("продукция 12"))}, {"products_fts"}),
+    # Тип продукции выбирает десятую часть строк: окно по наименованию читает индекс наименования
+    # с проверкой типа, пока не наберет строки
+    ("тип", {"filters": ProductFilter(product_type_id=1)}, {"p"}),
+]
+LINK_FILTERS = [
+    ("поиск", {"search": search_query("12", ("name",))}, {"materials_fts", "products_fts"}),
+]
+
+
+def counts(repo):
+    for filters in [MaterialFilter()] + [kwargs["filters"] for _, kwargs, _ in MATERIAL_FILTERS]:
+        repo.count_materials(filters)
+    for filters in [ProductFilter()] + [kwargs["filters"] for _, kwargs, _ in PRODUCT_FILTERS]:
+        repo.count_products(filters)
+    repo.count_links()
+    repo.count_links(LINK_FILTERS[0][1]["search"])
+
+
+# Выгрузка и отчет читают основную таблицу целиком, справочники - по первичному ключу
+EXPORT_SCANS = {
+    'material_types': {"material_types"},
+    'product_types': {"product_types"},
+    'materials': {"m"},
+    'products': {"p"},
+    'product_materials': {"pm"},
+}
+
+# Импорт читает карты наименований справочников и связанных таблиц, считает строки таблицы,
+# а в режиме обновления удаляет строки, которых нет в файле (проход по таблице с поиском в import_keys)
+IMPORT_SCANS = {
+    'material_types': {"material_types"},
+    'product_types': {"product_types"},
+    'materials': {"materials", "material_types", "units"},
+    'products': {"products", "product_types"},
+    'product_materials': {"product_materials", "materials", "products"},
+}
+FULL_IMPORT_SCANS = set().union(*IMPORT_SCANS.values())
+
+SCENARIOS = (
+    grid_scenarios("материалов", "fetch_materials", MATERIAL_SORT, "m", MATERIAL_FILTERS,
+                   unindexed={"Требуется": {"m", "mt", "u"}})
+    # Коэффициент - столбец небольшого справочника типов, соединение начинается с него
+    + grid_scenarios("продукции", "fetch_products", PRODUCT_SORT, "p", PRODUCT_FILTERS,
+                     unindexed={"Стоимость": {"p", "pt"}, "Коэффициент": {"pt"}})
+    + grid_scenarios("связей", "fetch_links", LINK_SORT, "pm", LINK_FILTERS,
+                     unindexed={"Требуемое кол-во": {"pm", "p", "m"}, "Потери (%)": {"pm", "p", "m"}})
+    + [
+        # Число строк считается по самому узкому индексу таблицы
+        ("Число строк вкладок", counts,
+         {"materials", "products", "product_materials", "a", "materials_fts", "products_fts"}),
+        ("Карточка материала", material_forms, {"material_types", "units"}),
+        ("Карточка продукции", product_forms, {"product_types"}),
+        ("Состав продукции", product_materials, set()),
+        ("Массовые изменения", bulk_edits, {"json_each", "materials_fts"}),
+        # Обратный индекс usage() строится по всем связям, списки id читаются из json_each
+        ("Материал и его продукция", material_view, {"j", "json_each", "product_materials"}),
+        # Расчет по плану читает все связи и остатки материалов
+        ("Расчет по плану", planning, {"n", "pm", "m"}),
+        ("Отчет о потребности", demand_report, {"m"}),
+    ]
+    + [(f"Выгрузка {table}", export(table), EXPORT_SCANS[table]) for table in EXPORT_QUERIES]
+    # Отдельная таблица импортируется в режиме обновления: замена справочника без связанных таблиц
+    # оставила бы ссылки на удаленные записи
+    + [(f"Импорт {table} (обновление)", import_stages([table], True), IMPORT_SCANS[table])
+       for table in FULL_IMPORT_ORDER]
+    + [("Полный импорт (замена)", import_stages(FULL_IMPORT_ORDER, False), FULL_IMPORT_SCANS)]
+)
+
+
+def trigger_statements(cursor):
+    """{триггер: [запросы тела]}; NEW.x и OLD.x в запросах заменены параметрами"""
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name")
+    triggers = {}
+    for name, sql in cursor.fetchall():
+        body = re.search(r"\bBEGIN\b(.*)\bEND\s*$", sql, re.IGNORECASE | re.DOTALL).group(1)
+        triggers[name] = [re.sub(r"\b(?:NEW|OLD)\.\w+", "?", statement)
+                          for statement in body.split(";") if statement.strip()]
+    return triggers
+
+
+def main():
+    path = os.path.join(tempfile.gettempdir(), "check_query_plans.db")
+    repo = build_database(path, 2_000, 500, 10_000)
+    with repo.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    repo.close()
+
+    repo = Repository(ConnectionPool(path, factory=RecordingConnection))
+    failures = checked = 0
+    for title, run, allowed in SCENARIOS:
+        RecordingConnection.plans = plans = []
+        try:
+            run(repo)
+        finally:
+            RecordingConnection.plans = None
+        unexpected = {" ".join(sql.split()): scans - allowed for sql, scans in plans if scans - allowed}
+        checked += len(plans)
+        if unexpected:
+            failures += 1
+            print(f"FAIL {title}:")
+            for sql, scans in unexpected.items():
+                print(f"       полный проход по {', '.join(sorted(scans))}: {sql[:200]}")
+        else:
+            print(f"ok   {title} ({len(plans)})")
+
+    with repo.cursor() as cursor:
+        for name, statements in trigger_statements(cursor).items():
+            unexpected = set().union(*(full_scans(cursor, sql, [1] * sql.count("?")) for sql in statements))
+            checked += len(statements)
+            if unexpected:
+                failures += 1
+                print(f"FAIL триггер {name}: полный проход по {', '.join(sorted(unexpected))}")
+            else:
+                print(f"ok   триггер {name} ({len(statements)})")
+
+    repo.close()
+    os.remove(path)
+    print(f"Сценариев: {len(SCENARIOS)}, запросов: {checked}, ошибок: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
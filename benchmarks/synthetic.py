@@ -0,0 +1,57 @@
+# Генерация синтетической базы для бенчмарков
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repository import ConnectionPool, Repository
+
+
+def build_database(path, n_materials, n_products, n_links, seed=0, profile=None):
+    """Создает базу path, заполняет ее случайными материалами, продукцией и связями
+    и возвращает Repository этой базы (profile - PRAGMA соединений, см. database.connect)"""
+    # Вместе с базой удаляются журналы WAL прошлого прогона
+    for stale in (path, path + '-wal', path + '-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    repo = Repository(ConnectionPool(path, profile=profile))
+    repo.create_schema()
+    with repo.transaction() as cursor:
+        fill(cursor, random.Random(seed), n_materials, n_products, n_links)
+    return repo
+
+
+def fill(cursor, rnd, n_materials, n_products, n_links):
+    """Справочники, материалы, продукция и n_links уникальных связей между ними"""
+    cursor.executemany("INSERT INTO material_types (name) VALUES (?)",
+                       [(f"Тип материала {i}",) for i in range(1, 11)])
+    cursor.executemany("INSERT INTO units (name, abbreviation) VALUES (?, ?)",
+                       [(f"Единица {i}", f"ед{i}") for i in range(1, 6)])
+    cursor.executemany("INSERT INTO product_types (name, coefficient) VALUES (?, ?)",
+                       [(f"Тип продукции {i}", round(rnd.uniform(0.5, 2.0), 2)) for i in range(1, 6)])
+
+    cursor.executemany(
+        """INSERT INTO materials (name, material_type_id, unit_id,
+                                  unit_price, stock_quantity, min_quantity, package_quantity)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        ((f"Материал {i}", rnd.randint(1, 10), rnd.randint(1, 5), round(rnd.uniform(1, 1000), 2),
+          round(rnd.uniform(0, 500), 2), round(rnd.uniform(0, 100), 2), rnd.randint(1, 50))
+         for i in range(1, n_materials + 1))
+    )
+    cursor.executemany(
+        "INSERT INTO products (name, description, product_type_id) VALUES (?, ?, ?)",
+        ((f"Продукция {i}", f"Описание {i}", rnd.randint(1, 5)) for i in range(1, n_products + 1))
+    )
+
+    # Уникальные пары (продукция, материал)
+    n_links = min(n_links, n_materials * n_products)
+    pairs = set()
+    while len(pairs) < n_links:
+        pairs.add((rnd.randint(1, n_products), rnd.randint(1, n_materials)))
+    cursor.executemany(
+        """INSERT INTO product_materials (product_id, material_id, required_quantity, loss_percentage)
+           VALUES (?, ?, ?, ?)""",
+        ((p, m, round(rnd.uniform(0.1, 10), 2), round(rnd.uniform(0, 15), 1)) for p, m in pairs)
+    )
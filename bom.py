@@ -0,0 +1,231 @@
+# Состав продукции как разреженная матрица продукция × материалы (CSR)
+#
+# Строка - продукция, столбец - материал, значение - расход материала на единицу продукции
+# с потерями и коэффициентом типа (как required_with_losses в material_demand). Матрица хранится
+# тремя массивами NumPy: indptr (начало строки в indices/data), indices (столбцы) и data.
+# Запросы по всей таблице связей становятся одним проходом по массивам:
+#   потребность по плану   - A^T x (x - количество продукции по строкам);
+#   стоимость продукции    - A p (p - цена материала по столбцам);
+#   блокирующая нехватка   - строки плана, у которых есть столбец с нехваткой.
+# scipy.sparse здесь не нужен: умножения делаются через np.bincount, а правка строки - это
+# склейка срезов массивов.
+#
+# MaterialUsage - обратный индекс по материалам (продукция с материалом и количество по связи)
+# для окна "Продукция, использующая материал" и предупреждения при удалении материала.
+import numpy as np
+
+
+class BomMatrix:
+    """Матрица состава продукции в формате CSR с картами id -> строка/столбец.
+
+    product_ids[строка] и material_ids[столбец] - идентификаторы в базе. Новая продукция или материал
+    получают строку или столбец в конце; удаленные остаются пустыми до следующей полной сборки.
+    """
+
+    def __init__(self, product_ids, material_ids, indptr, indices, data):
+        self.product_ids = product_ids
+        self.material_ids = material_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        # Плотные карты id -> индекс (-1 - нет): идентификаторы AUTOINCREMENT, поэтому массивы небольшие
+        self._rows = self._index_map(product_ids)
+        self._columns = self._index_map(material_ids)
+        self._entry_rows = None
+
+    @classmethod
+    def from_links(cls, links):
+        """Матрица из строк [(product_id, material_id, расход)] (Repository.bom_links())"""
+        links = np.array(links, dtype=np.float64).reshape(-1, 3)
+        product_ids, rows = np.unique(links[:, 0].astype(np.int64), return_inverse=True)
+        material_ids, columns = np.unique(links[:, 1].astype(np.int64), return_inverse=True)
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(len(product_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(product_ids)), out=indptr[1:])
+        return cls(product_ids, material_ids, indptr, columns[order].astype(np.int64), links[order, 2])
+
+    @staticmethod
+    def _index_map(ids):
+        index = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int64)
+        index[ids] = np.arange(len(ids))
+        return index
+
+    @property
+    def shape(self):
+        return len(self.product_ids), len(self.material_ids)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def entry_rows(self):
+        """Строка каждого элемента data (обратное к indptr), пересчитывается после правок"""
+        if self._entry_rows is None:
+            self._entry_rows = np.repeat(np.arange(len(self.product_ids)), np.diff(self.indptr))
+        return self._entry_rows
+
+    def rows_of(self, product_ids):
+        """Строки для массива product_ids, -1 для продукции, которой нет в матрице"""
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        inside = (product_ids >= 0) & (product_ids < len(self._rows))
+        rows = np.full(len(product_ids), -1, dtype=np.int64)
+        rows[inside] = self._rows[product_ids[inside]]
+        return rows
+
+    def columns_of(self, material_ids):
+        """Столбцы для массива material_ids, -1 для материалов, которых нет в матрице"""
+        material_ids = np.asarray(material_ids, dtype=np.int64)
+        inside = (material_ids >= 0) & (material_ids < len(self._columns))
+        columns = np.full(len(material_ids), -1, dtype=np.int64)
+        columns[inside] = self._columns[material_ids[inside]]
+        return columns
+
+    def plan_vector(self, plan):
+        """План {product_id: количество} как вектор по строкам; продукции без связей в нем нет"""
+        product_ids = np.fromiter(plan.keys(), dtype=np.int64, count=len(plan))
+        quantities = np.fromiter(plan.values(), dtype=np.float64, count=len(plan))
+        rows = self.rows_of(product_ids)
+        vector = np.zeros(len(self.product_ids))
+        np.add.at(vector, rows[rows >= 0], quantities[rows >= 0])
+        return vector
+
+    # Запросы
+
+    def demand(self, plan):
+        """Потребность по плану: A^T x, массив по столбцам (material_ids)"""
+        x = self.plan_vector(plan)
+        return np.bincount(self.indices, weights=self.data * x[self.entry_rows], minlength=len(self.material_ids))
+
+    def product_costs(self, prices):
+        """Стоимость материалов единицы продукции: A p, массив по строкам (product_ids).
+
+        prices - цена единицы материала по столбцам (material_ids).
+        """
+        return np.bincount(self.entry_rows, weights=self.data * prices[self.indices],
+                           minlength=len(self.product_ids))
+
+    def blocked_products(self, plan, available):
+        """product_id продукции плана, которой нужен хотя бы один материал с нехваткой.
+
+        available - доступное количество материала по столбцам (material_ids); нехватка -
+        потребность всего плана больше доступного.
+        """
+        x = self.plan_vector(plan)
+        short = self.demand(plan) > available
+        uses_short = np.bincount(self.entry_rows, weights=short[self.indices], minlength=len(self.product_ids))
+        return self.product_ids[(uses_short > 0) & (x > 0)]
+
+    # Правка без полной сборки
+
+    def set_product(self, product_id, links):
+        """Заменяет строку продукции связями [(material_id, расход)]; пустой список очищает строку"""
+        row = self._ensure_row(product_id)
+        links = sorted((self._ensure_column(material_id), usage) for material_id, usage in links)
+        columns = np.array([column for column, _ in links], dtype=np.int64)
+        usages = np.array([usage for _, usage in links], dtype=np.float64)
+
+        start, end = self.indptr[row], self.indptr[row + 1]
+        self.indices = np.concatenate([self.indices[:start], columns, self.indices[end:]])
+        self.data = np.concatenate([self.data[:start], usages, self.data[end:]])
+        self.indptr[row + 1:] += len(links) - (end - start)
+        self._entry_rows = None
+
+    def drop_material(self, material_id):
+        """Удаляет столбец материала из всех строк"""
+        column = self.columns_of([material_id])[0]
+        if column < 0:
+            return
+        keep = self.indices != column
+        counts = np.bincount(self.entry_rows[keep], minlength=len(self.product_ids))
+        self.indices = self.indices[keep]
+        self.data = self.data[keep]
+        np.cumsum(counts, out=self.indptr[1:])
+        self._entry_rows = None
+
+    def _ensure_row(self, product_id):
+        row = self.rows_of([product_id])[0]
+        if row >= 0:
+            return row
+        row = len(self.product_ids)
+        self.product_ids = np.append(self.product_ids, product_id)
+        self.indptr = np.append(self.indptr, self.indptr[-1])
+        self._rows = self._grow(self._rows, product_id, row)
+        self._entry_rows = None
+        return row
+
+    def _ensure_column(self, material_id):
+        column = self.columns_of([material_id])[0]
+        if column >= 0:
+            return column
+        column = len(self.material_ids)
+        self.material_ids = np.append(self.material_ids, material_id)
+        self._columns = self._grow(self._columns, material_id, column)
+        return column
+
+    @staticmethod
+    def _grow(index, item_id, position):
+        if item_id >= len(index):
+            index = np.concatenate([index, np.full(item_id + 1 - len(index), -1, dtype=np.int64)])
+        index[item_id] = position
+        return index
+
+
+class MaterialUsage:
+    """Обратный индекс состава: material_id -> продукция с этим материалом и количество по связи.
+
+    Для каждого материала хранятся два массива одинаковой длины, упорядоченные по product_id:
+    product_ids и required_quantity связи (без потерь и коэффициента, как в product_materials).
+    Число продукции с материалом - длина массива, правка связи - вставка или удаление в одном массиве.
+    """
+
+    EMPTY = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_links(cls, links):
+        """Индекс из строк [(material_id, product_id, количество)] (Repository.usage_links())"""
+        links = np.array(links, dtype=np.float64).reshape(-1, 3)
+        material_ids = links[:, 0].astype(np.int64)
+        product_ids = links[:, 1].astype(np.int64)
+        order = np.lexsort((product_ids, material_ids))
+        material_ids, product_ids, quantities = material_ids[order], product_ids[order], links[order, 2]
+        starts = np.flatnonzero(np.diff(material_ids, prepend=-1))
+        ends = np.append(starts[1:], len(material_ids))
+        return cls({int(material_ids[start]): (product_ids[start:end], quantities[start:end])
+                    for start, end in zip(starts, ends)})
+
+    def products(self, material_id):
+        """(product_ids, количества) продукции с материалом, по возрастанию product_id"""
+        return self.columns.get(int(material_id), self.EMPTY)
+
+    def count(self, material_id):
+        return len(self.products(material_id)[0])
+
+    def set_link(self, material_id, product_id, quantity):
+        """Добавляет связь или меняет ее количество"""
+        product_ids, quantities = self.products(material_id)
+        position = np.searchsorted(product_ids, product_id)
+        if position < len(product_ids) and product_ids[position] == product_id:
+            quantities = quantities.copy()
+            quantities[position] = quantity
+        else:
+            product_ids = np.insert(product_ids, position, product_id)
+            quantities = np.insert(quantities, position, quantity)
+        self.columns[int(material_id)] = (product_ids, quantities)
+
+    def drop_link(self, material_id, product_id):
+        product_ids, quantities = self.products(material_id)
+        position = np.searchsorted(product_ids, product_id)
+        if position < len(product_ids) and product_ids[position] == product_id:
+            self.columns[int(material_id)] = (np.delete(product_ids, position), np.delete(quantities, position))
+
+    def drop_product(self, product_id, material_ids):
+        """Удаляет связи продукции с материалами material_ids (ее состав до удаления)"""
+        for material_id in material_ids:
+            self.drop_link(material_id, product_id)
+
+    def drop_material(self, material_id):
+        self.columns.pop(int(material_id), None)
@@ -0,0 +1,215 @@
+# Командная строка: импорт, выгрузка и отчет без окна (для ночных заданий на серверах)
+#
+#   python main.py import --materials materials.xlsx --product-materials links.csv [--upsert] [--streaming]
+#   python main.py export --materials materials.csv --products products.xlsx
+#   python main.py demand-report [--output report.csv] [--shortage-only]
+#   python main.py plan plan.xlsx [--output purchases.csv] [--all-materials]
+#
+# Модуль не импортирует tkinter и PIL; pandas загружается только командами import и plan.
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+
+from database import DB_PATH
+from repository import ConnectionPool, Repository
+
+# Коды завершения
+EXIT_OK = 0
+EXIT_ERROR = 1  # ошибка импорта или выгрузки, изменения откатаны
+EXIT_USAGE = 2  # неверные аргументы (argparse)
+EXIT_REJECTED = 3  # импорт выполнен, но с --strict в файлах были отклоненные строки
+EXIT_CANCELLED = 130  # прервано Ctrl+C
+
+# Колонки файла плана производства для команды plan
+PLAN_FILE_COLUMNS = ('Наименование продукции', 'Количество')
+
+# Таблицы команд import и export в порядке полного импорта: параметр -> этап
+TABLE_OPTIONS = {
+    '--material-types': 'material_types',
+    '--product-types': 'product_types',
+    '--materials': 'materials',
+    '--products': 'products',
+    '--product-materials': 'product_materials',
+}
+
+
+def log(message):
+    """Ход работы - в stderr, чтобы stdout оставался для данных отчета"""
+    print(message, file=sys.stderr)
+
+
+def write_table(path, columns, rows):
+    """Пишет строки в CSV или Excel (по расширению path); path '-' - CSV в stdout. Возвращает число строк"""
+    if path == '-':
+        return write_csv(sys.stdout, columns, rows)
+    if path.lower().endswith('.xlsx'):
+        return write_xlsx(path, columns, rows)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        return write_csv(file, columns, rows)
+
+
+def write_csv(file, columns, rows):
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_xlsx(path, columns, rows):
+    from openpyxl import Workbook
+
+    # write_only пишет строки в файл по мере поступления, а не держит лист в памяти
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def run_import(repo, args):
+    from importer import Importer, IMPORT_STAGES, CHUNK_SIZE, read_sheet, iter_sheet, sheet_size
+
+    rejected = 0
+    with repo.pool.connection() as conn:
+        importer = Importer(conn, log=log, upsert=args.upsert, lookups=repo.lookups)
+        # Все этапы - одна транзакция, как полный импорт в окне
+        with importer.transaction():
+            for stage, file_path in args.files:
+                what, _, method, _ = IMPORT_STAGES[stage]
+                log(f"Импорт {what} из: {file_path}")
+                if args.streaming:
+                    log(f"Потоковое чтение частями по {CHUNK_SIZE} строк")
+                    result = getattr(importer, method)(iter_sheet(file_path), sheet_size(file_path))
+                else:
+                    result = getattr(importer, method)(read_sheet(file_path))
+                rejected += result.rejected_total
+    log("Импорт успешно завершен")
+    if rejected and args.strict:
+        log(f"Отклонено строк: {rejected}")
+        return EXIT_REJECTED
+    return EXIT_OK
+
+
+def run_export(repo, args):
+    for stage, file_path in args.files:
+        with repo.export(stage) as (columns, rows):
+            count = write_table(file_path, columns, rows)
+        log(f"Выгружено строк: {count} в {file_path}")
+    return EXIT_OK
+
+
+def run_demand_report(repo, args):
+    with repo.demand_report(args.shortage_only) as (columns, rows):
+        count = write_table(args.output, columns, rows)
+    log(f"Материалов в отчете: {count}")
+    return EXIT_OK
+
+
+def run_plan(repo, args):
+    from importer import read_sheet
+    from planning import MrpEngine, PLAN_COLUMNS
+
+    sheet = read_sheet(args.plan)
+    missing = [column for column in PLAN_FILE_COLUMNS if column not in sheet.columns]
+    if missing:
+        raise ValueError(f"В файле плана нет колонок: {', '.join(missing)}")
+    name_column, quantity_column = PLAN_FILE_COLUMNS
+    quantities = sheet.groupby(name_column)[quantity_column].sum()
+
+    ids = repo.product_ids(quantities.index)
+    unknown = [name for name in quantities.index if name not in ids]
+    if unknown:
+        raise ValueError(f"Продукция не найдена: {', '.join(map(str, unknown[:5]))}")
+    plan = {ids[name]: quantity for name, quantity in quantities.items()}
+
+    engine = MrpEngine(repo)
+    requirements = engine.requirements(plan, all_materials=args.all_materials)
+    count = write_table(args.output, list(PLAN_COLUMNS.values()),
+                        requirements.round(6).itertuples(index=False, name=None))
+    log(f"Материалов в расчете: {count}, к закупке: {int((requirements['purchase'] > 0).sum())}")
+    log(f"Позиций плана, которым не хватит остатков материалов: {len(engine.blocked_products(plan))}")
+    return EXIT_OK
+
+
+COMMANDS = {
+    'import': run_import,
+    'export': run_export,
+    'demand-report': run_demand_report,
+    'plan': run_plan,
+}
+
+
+def add_table_options(parser, action):
+    for option, stage in TABLE_OPTIONS.items():
+        parser.add_argument(option, dest=stage, metavar='FILE', help=f"{action} ({stage})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description="Учет материалов мебельного производства без окна")
+    parser.add_argument('--db', default=DB_PATH, help=f"файл базы (по умолчанию {DB_PATH})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help="импорт таблиц из Excel или CSV одной транзакцией")
+    add_table_options(import_parser, "файл импорта")
+    import_parser.add_argument('--upsert', action='store_true',
+                               help="обновлять существующие записи по наименованию вместо замены таблицы")
+    import_parser.add_argument('--streaming', action='store_true', help="читать файлы частями")
+    import_parser.add_argument('--strict', action='store_true',
+                               help=f"код {EXIT_REJECTED}, если часть строк отклонена")
+
+    export_parser = commands.add_parser('export', help="выгрузка таблиц в формате файлов импорта")
+    add_table_options(export_parser, "файл выгрузки .csv или .xlsx")
+
+    report_parser = commands.add_parser('demand-report', help="потребность материалов и нехватка на складе")
+    report_parser.add_argument('--output', default='-', help="файл .csv или .xlsx (по умолчанию stdout)")
+    report_parser.add_argument('--shortage-only', action='store_true', help="только материалы с нехваткой")
+
+    plan_parser = commands.add_parser('plan', help="закупки материалов по плану производства")
+    plan_parser.add_argument('plan', metavar='PLAN',
+                             help=f"файл плана .csv или .xlsx с колонками {', '.join(PLAN_FILE_COLUMNS)}")
+    plan_parser.add_argument('--output', default='-', help="файл .csv или .xlsx (по умолчанию stdout)")
+    plan_parser.add_argument('--all-materials', action='store_true',
+                             help="все материалы, а не только нужные по плану")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command in ('import', 'export'):
+        args.files = [(stage, getattr(args, stage)) for stage in TABLE_OPTIONS.values()
+                      if getattr(args, stage)]
+        if not args.files:
+            parser.error(f"{args.command}: укажите хотя бы одну таблицу ({', '.join(TABLE_OPTIONS)})")
+        if args.command == 'import':
+            missing = [path for _, path in args.files if not os.path.exists(path)]
+            if missing:
+                log(f"Файл не найден: {', '.join(missing)}")
+                return EXIT_ERROR
+    if args.command == 'plan' and not os.path.exists(args.plan):
+        log(f"Файл не найден: {args.plan}")
+        return EXIT_ERROR
+
+    repo = Repository(ConnectionPool(args.db))
+    try:
+        repo.create_schema()
+        return COMMANDS[args.command](repo, args)
+    except KeyboardInterrupt:
+        log("Прервано, изменения откатаны")
+        return EXIT_CANCELLED
+    except (ValueError, OSError, sqlite3.Error) as e:
+        log(f"Ошибка: {e}")
+        if args.command == 'import':
+            log("Изменения откатаны, прежние данные сохранены")
+        return EXIT_ERROR
+    finally:
+        repo.close()
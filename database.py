@@ -0,0 +1,73 @@
+# Подключение к базе данных: общие настройки соединения для окна, фонового импорта и скриптов
+import sqlite3
+
+DB_PATH = 'furniture_company.db'
+
+# Профиль соединения: PRAGMA, которые connect() выполняет для каждого нового соединения.
+# В режиме WAL чтение не ждет записи (окно работает во время импорта), а при synchronous = NORMAL
+# COMMIT не ждет fsync: журнал сбрасывается на диск при контрольной точке. После сбоя питания
+# может пропасть последняя транзакция, но база остается целой.
+CONNECTION_PROFILE = {
+    'journal_mode': 'WAL',  # сохраняется в файле базы
+    'synchronous': 'NORMAL',
+    'cache_size': -64_000,  # в КиБ, около 64 МБ на соединение
+    'mmap_size': 256 * 1024 * 1024,  # чтение страниц через отображение файла в память
+    'temp_store': 'MEMORY',  # временные таблицы и сортировки без временных файлов
+    'foreign_keys': 'ON',  # без этого SQLite не проверяет ссылки и не выполняет ON DELETE CASCADE
+}
+
+
+# Ключ сортировки текста для колонок *_key (шаг 4 миграции схемы): латиница и кириллица
+# строчными буквами, Ё как Е. Колонки заполняют триггеры встроенными функциями SQLite (ru_key_sql),
+# поэтому файл базы не зависит от функций Python и его может менять и проверять любой клиент SQLite
+RU_UPPER = "АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+RU_FOLD = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ" + RU_UPPER + "Ёё",
+                        "abcdefghijklmnopqrstuvwxyz" + RU_UPPER.lower() + "ее")
+
+
+def ru_key(text):
+    """Ключ сортировки наименования: то же значение, что ru_key_sql() вычисляет в SQLite"""
+    return text.translate(RU_FOLD)
+
+
+# Замен replace() в одном выражении ru_key_sql(): глубину вложенности выражения ограничивает стек парсера SQLite
+RU_KEY_STEP = 12
+
+
+def ru_key_sql(expression, key_column):
+    """SQL-выражения ключа ru_key() для текста expression, по шагам: первое считает ключ от expression,
+    следующие - от уже записанного key_column. lower() в SQLite меняет регистр только латиницы,
+    поэтому заглавные буквы кириллицы заменяются по одной"""
+    replacements = [('Ё', 'е'), ('ё', 'е')] + [(letter, letter.lower()) for letter in RU_UPPER]
+    steps = []
+    for start in range(0, len(replacements), RU_KEY_STEP):
+        step = expression if not steps else key_column
+        for old, new in replacements[start:start + RU_KEY_STEP]:
+            step = f"replace({step}, '{old}', '{new}')"
+        steps.append(step)
+    steps[-1] = f"lower({steps[-1]})"
+    return steps
+
+
+def ru_prefix_range(prefix):
+    """Границы поиска по началу наименования: name_key >= нижняя AND name_key < верхняя - диапазон
+    индекса по name_key, без учета регистра и Ё"""
+    key = ru_key(prefix)
+    return key, key + chr(0x10FFFF)
+
+
+def apply_profile(conn, profile):
+    """Выполняет PRAGMA профиля; вызывается вне транзакции, иначе journal_mode и foreign_keys не меняются"""
+    for pragma, value in profile.items():
+        # PRAGMA не принимает параметры, значения - константы профиля
+        conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+
+def connect(path=DB_PATH, profile=None, **kwargs):
+    """Соединение с базой и PRAGMA профиля (kwargs - для sqlite3.connect).
+
+    profile=None - CONNECTION_PROFILE, пустой словарь - настройки SQLite по умолчанию.
+    """
+    conn = sqlite3.connect(path, **kwargs)
+    apply_profile(conn, CONNECTION_PROFILE if profile is None else profile)
+    return conn
@@ -0,0 +1,1880 @@
+# Окно приложения (tkinter). Запуск: python main.py без аргументов
+#
+# Импорт библиотек
+import functools
+import sqlite3
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from tkinter.simpledialog import Dialog
+import os
+
+# importer (вместе с pandas) загружается при первом импорте, а не при запуске окна
+from repository import (Repository, Material, Product, MaterialFilter, ProductFilter, MATERIAL_SORT, PRODUCT_SORT,
+                        LINK_SORT, ALERT_BELOW_MINIMUM, ALERT_BELOW_DEMAND, search_query)
+
+# Логотип в заголовке: уменьшенная копия хранится готовым PNG, который tk.PhotoImage читает без PIL.
+# PIL нужен, только если копии нет (после замены логотипа копию достаточно удалить)
+LOGO_SOURCE = "Образ плюс.png"
+LOGO_SIZE = 100
+LOGO_CACHE = f"Образ плюс {LOGO_SIZE}x{LOGO_SIZE}.png"
+
+# Период опроса очереди сообщений фонового импорта, мс
+IMPORT_POLL_MS = 100
+
+# Таблицы вкладок создают элементы Treeview только для видимых строк (PagedGrid)
+GRID_BUFFER = 200  # строк, которые читаются из БД про запас выше и ниже видимых
+GRID_DEFAULT_ROWS = 30  # видимых строк, пока таблица не показана на экране
+GRID_WHEEL_ROWS = 3  # строк на один шаг колеса мыши
+
+# Фильтры таблиц вкладок (FilterBar, FilterWorker)
+FILTER_DEBOUNCE_MS = 300  # пауза после ввода или выбора, после которой выполняется запрос
+FILTER_POLL_MS = 20  # период опроса очереди результатов фонового запроса
+FILTER_PROGRESS_OPS = 10_000  # инструкций SQLite между проверками, не устарел ли запрос
+
+# Фильтр "Остаток" таблицы материалов: флаги нехватки -> подпись
+SHORTAGE_FILTERS = {
+    ALERT_BELOW_MINIMUM | ALERT_BELOW_DEMAND: "С нехваткой",
+    ALERT_BELOW_DEMAND: "Ниже потребности",
+    ALERT_BELOW_MINIMUM: "Ниже минимума",
+}
+
+# Выбор материалов для состава продукции (MaterialPicker)
+PICKER_PAGE_SIZE = 100  # материалов, которые список дочитывает при прокрутке до конца
+
+# Массовое изменение материалов: подписи формы -> колонка и способ Repository.adjust_materials
+BULK_COLUMNS = {"Цена": 'unit_price', "На складе": 'stock_quantity'}
+BULK_MODES = {"Установить": 'set', "Прибавить": 'add', "Изменить на %": 'percent'}
+
+# Подсветка материалов с нехваткой (material_alerts): остаток ниже потребности или ниже минимума
+SHORTAGE_COLORS = {
+    "below_demand": "#F6C6C6",
+    "below_minimum": "#FBE8B0",
+}
+
+
+def writes_data(method):
+    """Метод MaterialApp, который изменяет данные. Пока фоновый импорт держит транзакцию записи,
+    изменение не начинается: в WAL пишет только одно соединение, и сохранение ждало бы до таймаута
+    занятой базы. Если базу занял другой процесс, ошибка SQLite показывается сообщением"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.import_running():
+            messagebox.showwarning("Идет импорт", "Изменить данные можно после завершения импорта")
+            return None
+        try:
+            return method(self, *args, **kwargs)
+        except sqlite3.OperationalError as e:
+            messagebox.showerror("Ошибка", f"Изменения не сохранены: {e}")
+            return None
+
+    return wrapper
+
+
+class MaterialApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Управление материалами и продукцией - Мебельная компания")
+        self.root.geometry("1200x700")
+
+        # Установка иконки приложения
+        try:
+            if os.path.exists("Образ плюс.ico"):
+                self.root.iconbitmap("Образ плюс.ico")
+        except:
+            pass
+
+        # Подключение к БД: запросы выполняет Repository через пул соединений
+        self.repository = Repository()
+        self.repository.create_schema()
+        # Запросы фильтров таблиц вкладок выполняются в фоновом потоке
+        self.filter_worker = FilterWorker(self.repository.pool)
+
+        # Загрузка логотипа
+        self.logo_image = None
+        try:
+            self.logo_image = load_logo()
+        except Exception as e:
+            print(f"Ошибка загрузки логотипа: {e}")
+
+        # Применение стилей
+        self.apply_styles()
+
+        # GUI
+        self.create_widgets()
+        self.load_materials()
+        self.load_products()
+
+    def apply_styles(self):
+        # Основные цвета
+        self.primary_bg = "#FFFFFF"  # Белый
+        self.secondary_bg = "#BFD6F6"  # Светло-голубой
+        self.accent_color = "#405C73"  # Темно-синий
+
+        # Настройка шрифта
+        self.font_name = "Calibri"
+        self.normal_font = (self.font_name, 10)
+        self.bold_font = (self.font_name, 10, "bold")
+        self.title_font = (self.font_name, 12, "bold")
+
+        # Общие настройки
+        self.style = ttk.Style()
+        self.style.configure(".", background=self.primary_bg, font=self.normal_font)
+        self.root.configure(background=self.primary_bg)
+
+        # Стиль для фреймов
+        self.style.configure("TFrame", background=self.primary_bg)
+        self.style.configure("Secondary.TFrame", background=self.secondary_bg)
+
+        # Стиль для кнопок
+        self.style.configure("TButton",
+                             background=self.accent_color,
+                             foreground="black",
+                             font=self.bold_font,
+                             padding=5)
+        self.style.map("TButton",
+                       background=[('active', self.accent_color), ('pressed', '#0F2C4B')])
+
+        # Стиль для вкладок
+        self.style.configure("TNotebook", background=self.secondary_bg)
+        self.style.configure("TNotebook.Tab",
+                             background=self.secondary_bg,
+                             foreground="black",
+                             font=self.bold_font,
+                             padding=[10, 5])
+        self.style.map("TNotebook.Tab",
+                       background=[('selected', self.primary_bg)],
+                       foreground=[('selected', 'black')])
+
+        # Стиль для таблиц
+        self.style.configure("Treeview",
+                             background=self.primary_bg,
+                             foreground="black",
+                             fieldbackground=self.primary_bg,
+                             font=self.normal_font)
+        self.style.configure("Treeview.Heading",
+                             background=self.accent_color,
+                             foreground="black",
+                             font=self.bold_font,
+                             padding=5)
+        self.style.map("Treeview",
+                       background=[('selected', self.secondary_bg)])
+
+        # Стиль для меток
+        self.style.configure("TLabel",
+                             background=self.primary_bg,
+                             foreground="black",
+                             font=self.normal_font)
+        self.style.configure("Title.TLabel",
+                             background=self.primary_bg,
+                             foreground=self.accent_color,
+                             font=self.title_font)
+
+        # Стиль для полей ввода
+        self.style.configure("TEntry",
+                             fieldbackground="black",
+                             foreground="black",
+                             font=self.normal_font)
+
+        # Стиль для выпадающих списков
+        self.style.configure("TCombobox",
+                             fieldbackground="black",
+                             foreground="black",
+                             font=self.normal_font)
+
+    def create_widgets(self):
+        # Главный контейнер
+        main_container = ttk.Frame(self.root)
+        main_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # Заголовок с логотипом
+        header_frame = ttk.Frame(main_container, style="Secondary.TFrame")
+        header_frame.pack(fill=tk.X, pady=(0, 10))
+
+        if self.logo_image:
+            logo_label = ttk.Label(header_frame, image=self.logo_image, background=self.secondary_bg)
+            logo_label.pack(side=tk.LEFT, padx=10, pady=5)
+
+        title_label = ttk.Label(header_frame,
+                                text="Система управления материалами и продукцией",
+                                style="Title.TLabel")
+        title_label.pack(side=tk.LEFT, padx=10, pady=10)
+
+        # Создаем Notebook (вкладки)
+        self.notebook = ttk.Notebook(main_container)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+
+        # Кнопки изменения данных на вкладках (на время фонового импорта отключаются)
+        self.edit_buttons = []
+
+        # Вкладка материалов
+        materials_frame = ttk.Frame(self.notebook)
+        self.notebook.add(materials_frame, text="Управление материалами")
+        self.create_materials_tab(materials_frame)
+
+        # Вкладка продукции
+        products_frame = ttk.Frame(self.notebook)
+        self.notebook.add(products_frame, text="Управление продукцией")
+        self.create_products_tab(products_frame)
+
+        # Вкладка связей
+        links_frame = ttk.Frame(self.notebook)
+        self.notebook.add(links_frame, text="Связи материалов и продукции")
+        self.create_links_tab(links_frame)
+
+        # Вкладка импорта
+        import_frame = ttk.Frame(self.notebook)
+        self.notebook.add(import_frame, text="Импорт данных")
+        self.create_import_tab(import_frame)
+
+    def create_import_tab(self, parent):
+        # Фрейм для кнопок импорта
+        import_buttons_frame = ttk.Frame(parent, style="Secondary.TFrame")
+        import_buttons_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        # Кнопки импорта (на время фонового импорта отключаются)
+        self.import_buttons = [
+            ttk.Button(import_buttons_frame, text="Импорт типов материалов",
+                       command=self.import_material_types, style="TButton"),
+            ttk.Button(import_buttons_frame, text="Импорт материалов",
+                       command=self.import_materials, style="TButton"),
+            ttk.Button(import_buttons_frame, text="Импорт типов продукции",
+                       command=self.import_product_types, style="TButton"),
+            ttk.Button(import_buttons_frame, text="Импорт продукции",
+                       command=self.import_products, style="TButton"),
+            ttk.Button(import_buttons_frame, text="Импорт связей",
+                       command=self.import_product_materials, style="TButton"),
+            # Кнопка полного импорта
+            ttk.Button(import_buttons_frame, text="Полный импорт",
+                       command=self.full_import, style="TButton"),
+        ]
+        for button in self.import_buttons:
+            button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Потоковый режим: файл читается и записывается частями, память не зависит от размера файла
+        self.streaming_import = tk.BooleanVar(value=False)
+        ttk.Checkbutton(import_buttons_frame, text="Потоковый режим (большие файлы)",
+                        variable=self.streaming_import).pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Режим обновления: строки сопоставляются по наименованию, отсутствующие в файле удаляются
+        self.upsert_import = tk.BooleanVar(value=False)
+        ttk.Checkbutton(import_buttons_frame, text="Обновлять существующие записи",
+                        variable=self.upsert_import).pack(side=tk.LEFT, padx=5, pady=5)
+
+        # Ход импорта
+        progress_frame = ttk.Frame(parent)
+        progress_frame.pack(fill=tk.X, padx=10)
+
+        self.import_status = ttk.Label(progress_frame, text="", style="TLabel")
+        self.import_status.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_import_button = ttk.Button(progress_frame, text="Отмена", command=self.cancel_import,
+                                               style="TButton", state=tk.DISABLED)
+        self.cancel_import_button.pack(side=tk.RIGHT, padx=5)
+
+        self.import_progress = ttk.Progressbar(progress_frame, mode="determinate", maximum=100)
+        self.import_progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        # Фоновый поток импорта и очередь его сообщений окну
+        self.import_thread = None
+        self.import_events = queue.Queue()
+        self.cancel_import_event = threading.Event()
+
+        # Область для логов
+        self.log_text = tk.Text(parent, height=15, state=tk.DISABLED)
+        self.log_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # Добавляем скроллбар
+        scrollbar = ttk.Scrollbar(parent, command=self.log_text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_text.config(yscrollcommand=scrollbar.set)
+
+    def add_log(self, message):
+        """Добавляет сообщение в лог-панель"""
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, message + "\n")
+        self.log_text.see(tk.END)  # Автоскролл к последнему сообщению
+        self.log_text.config(state=tk.DISABLED)
+
+    def full_import(self):
+        """Выполняет полный импорт всех данных в правильном порядке"""
+        from importer import FULL_IMPORT_ORDER
+        self.start_import(FULL_IMPORT_ORDER, full=True)
+
+    def import_material_types(self):
+        """Импорт типов материалов из Excel"""
+        self.start_import(['material_types'])
+
+    def import_product_types(self):
+        """Импорт типов продукции из Excel"""
+        self.start_import(['product_types'])
+
+    def import_materials(self):
+        """Импорт материалов из Excel"""
+        self.start_import(['materials'])
+
+    def import_products(self):
+        """Импорт продукции из Excel"""
+        self.start_import(['products'])
+
+    def import_product_materials(self):
+        """Импорт связей между материалами и продукцией из Excel"""
+        self.start_import(['product_materials'])
+
+    def start_import(self, stages, full=False):
+        """Запрашивает файлы для этапов stages и запускает импорт в фоновом потоке"""
+        if self.import_running():
+            return
+
+        from importer import IMPORT_STAGES
+        files = []
+        for stage in stages:
+            file_path = filedialog.askopenfilename(
+                title=IMPORT_STAGES[stage][1],
+                filetypes=(("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("All files", "*.*"))
+            )
+            if not file_path:
+                return
+            files.append((stage, file_path))
+
+        self.cancel_import_event.clear()
+        self.set_import_running(True)
+        self.import_thread = threading.Thread(target=self.run_import,
+                                              args=(files, self.streaming_import.get(), full, self.upsert_import.get()),
+                                              daemon=True)
+        self.import_thread.start()
+        self.root.after(IMPORT_POLL_MS, self.poll_import_events)
+
+    def run_import(self, files, streaming, full, upsert=False):
+        """Тело фонового потока: работает через свое соединение из пула, окну пишет только в очередь"""
+        from importer import Importer, ImportCancelled, IMPORT_STAGES, CHUNK_SIZE, read_sheet, iter_sheet, sheet_size
+
+        events = self.import_events
+        what = None
+        # Соединение из пула принадлежит потоку импорта до его завершения
+        with self.repository.pool.connection() as conn:
+            try:
+                importer = Importer(conn,
+                                    log=lambda message: events.put(('log', message)),
+                                    progress=lambda done, total: events.put(('progress', done, total)),
+                                    cancel_event=self.cancel_import_event,
+                                    upsert=upsert,
+                                    lookups=self.repository.lookups)
+                if full:
+                    events.put(('log', "=== НАЧАЛО ПОЛНОГО ИМПОРТА ==="))
+
+                # Все этапы - одна транзакция: при ошибке или отмене остаются прежние данные
+                with importer.transaction():
+                    for stage, file_path in files:
+                        what, _, method, success = IMPORT_STAGES[stage]
+                        events.put(('stage', f"Импорт {what}"))
+                        events.put(('log', f"Импорт {what} из: {file_path}"))
+                        # Пока файл читается, число строк неизвестно
+                        events.put(('progress', 0, None))
+
+                        if streaming:
+                            events.put(('log', f"Потоковое чтение частями по {CHUNK_SIZE} строк"))
+                            getattr(importer, method)(iter_sheet(file_path), sheet_size(file_path))
+                        else:
+                            df = read_sheet(file_path)
+                            events.put(('log', f"Найдено записей: {len(df)}"))
+                            getattr(importer, method)(df)
+                        events.put(('log', f"Импорт {what} успешно завершен"))
+
+                if full:
+                    events.put(('log', "=== ПОЛНЫЙ ИМПОРТ УСПЕШНО ЗАВЕРШЕН ==="))
+                    events.put(('done', "Полный импорт данных успешно завершен"))
+                else:
+                    events.put(('done', success))
+            except ImportCancelled as e:
+                events.put(('cancelled', f"{e}, изменения откатаны"))
+            except Exception as e:
+                events.put(('log', "Изменения откатаны, прежние данные сохранены"))
+                if full:
+                    events.put(('error', f"Ошибка при полном импорте: {str(e)}"))
+                else:
+                    events.put(('error', f"Ошибка импорта {what}: {str(e)}"))
+
+    def import_running(self):
+        return self.import_thread is not None and self.import_thread.is_alive()
+
+    def poll_import_events(self):
+        """Переносит сообщения фонового импорта в окно, вызывается через root.after"""
+        while True:
+            try:
+                event = self.import_events.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = event[0]
+            if kind == 'log':
+                self.add_log(event[1])
+            elif kind == 'stage':
+                self.import_status.config(text=event[1])
+            elif kind == 'progress':
+                self.show_import_progress(event[1], event[2])
+            else:
+                # Последнее сообщение потока: done, cancelled или error
+                self.finish_import(kind, event[1])
+                return
+
+        self.root.after(IMPORT_POLL_MS, self.poll_import_events)
+
+    def show_import_progress(self, done, total):
+        if total:
+            if str(self.import_progress.cget("mode")) != "determinate":
+                self.import_progress.stop()
+                self.import_progress.config(mode="determinate")
+            self.import_progress.config(value=min(done * 100 / total, 100))
+        elif str(self.import_progress.cget("mode")) != "indeterminate":
+            self.import_progress.config(mode="indeterminate")
+            self.import_progress.start(IMPORT_POLL_MS)
+
+    def set_import_running(self, running):
+        # Изменения данных ждали бы транзакцию импорта, их формы и кнопки недоступны до его завершения
+        for button in self.import_buttons + self.edit_buttons:
+            button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.cancel_import_button.config(state=tk.NORMAL if running else tk.DISABLED)
+        self.import_progress.stop()
+        self.import_progress.config(mode="determinate", value=0)
+        if not running:
+            self.import_status.config(text="")
+
+    def cancel_import(self):
+        self.cancel_import_event.set()
+        self.cancel_import_button.config(state=tk.DISABLED)
+        self.add_log("Отмена импорта...")
+
+    def finish_import(self, kind, message):
+        self.set_import_running(False)
+        if kind == 'done':
+            messagebox.showinfo("Успех", message)
+        elif kind == 'cancelled':
+            self.add_log(message)
+            messagebox.showwarning("Импорт отменен", message)
+        else:
+            self.add_log(message)
+            messagebox.showerror("Ошибка", message)
+
+        # Обновляем данные в интерфейсе
+        self.repository.invalidate_bom()
+        self.load_materials()
+        self.load_products()
+        self.load_links()
+
+    def create_materials_tab(self, parent):
+        # Панель инструментов для материалов
+        toolbar = ttk.Frame(parent, style="Secondary.TFrame")
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+
+        add_button = ttk.Button(toolbar, text="Добавить материал", command=self.add_material, style="TButton")
+        add_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Обновить", command=self.load_materials, style="TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Просмотр продукции", command=self.view_products, style="TButton").pack(side=tk.LEFT,
+                                                                                                         padx=5)
+        bulk_button = ttk.Button(toolbar, text="Цена и остаток", command=self.bulk_edit_materials, style="TButton")
+        bulk_button.pack(side=tk.LEFT, padx=5)
+        self.edit_buttons += [add_button, bulk_button]
+        self.material_filters = FilterBar(parent, self.filter_worker, MaterialFilter, [
+            ("Тип:", self.repository.material_types),
+            ("Ед.изм:", self.repository.units),
+            ("Остаток:", lambda: SHORTAGE_FILTERS),
+        ], self.filter_materials)
+
+        # Таблица материалов. Скрытый столбец "Нехватка" - флаги из material_alerts для подсветки строк
+        columns = ("ID", "Название", "Тип", "Ед.изм", "Цена", "На складе", "Мин.кол-во", "Упаковка", "Требуется",
+                   "Нехватка")
+        self.materials_grid = PagedGrid(parent, columns, self.fetch_materials, self.count_materials,
+                                        displaycolumns=columns[:-1], sort_columns=MATERIAL_SORT, sort=("ID", False),
+                                        row_tags=material_tags, seeking=True)
+        self.materials_tree = self.materials_grid.tree
+        self.materials_tree.tag_configure("below_demand", background=SHORTAGE_COLORS["below_demand"])
+        self.materials_tree.tag_configure("below_minimum", background=SHORTAGE_COLORS["below_minimum"])
+
+        self.materials_tree.column("ID", width=50, anchor=tk.CENTER)
+        self.materials_tree.column("Название", width=150)
+        self.materials_tree.column("Тип", width=100)
+        self.materials_tree.column("Ед.изм", width=70)
+        self.materials_tree.column("Цена", width=100, anchor=tk.E)
+        self.materials_tree.column("На складе", width=100, anchor=tk.E)
+        self.materials_tree.column("Мин.кол-во", width=100, anchor=tk.E)
+        self.materials_tree.column("Упаковка", width=80, anchor=tk.E)
+        self.materials_tree.column("Требуется", width=100, anchor=tk.E)
+
+        # Двойной клик для редактирования
+        self.materials_tree.bind("<Double-1>", self.edit_material)
+
+    def create_products_tab(self, parent):
+        # Панель инструментов для продукции
+        toolbar = ttk.Frame(parent, style="Secondary.TFrame")
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+
+        add_button = ttk.Button(toolbar, text="Добавить продукцию", command=self.add_product, style="TButton")
+        add_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Обновить", command=self.load_products, style="TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Управление материалами", command=self.link_materials_to_product,
+                   style="TButton").pack(side=tk.LEFT, padx=5)
+        copy_button = ttk.Button(toolbar, text="Копировать состав", command=self.copy_bom, style="TButton")
+        copy_button.pack(side=tk.LEFT, padx=5)
+        self.edit_buttons += [add_button, copy_button]
+        self.product_filters = FilterBar(parent, self.filter_worker, ProductFilter, [
+            ("Тип:", self.repository.product_types),
+        ], self.filter_products)
+
+        # Таблица продукции
+        columns = ("ID", "Название", "Тип", "Коэффициент", "Стоимость", "Описание")
+        self.products_grid = PagedGrid(parent, columns, self.fetch_products, self.count_products,
+                                       sort_columns=PRODUCT_SORT, sort=("ID", False), seeking=True)
+        self.products_tree = self.products_grid.tree
+
+        self.products_tree.column("ID", width=50, anchor=tk.CENTER)
+        self.products_tree.column("Название", width=200)
+        self.products_tree.column("Тип", width=150)
+        self.products_tree.column("Коэффициент", width=100, anchor=tk.E)
+        self.products_tree.column("Стоимость", width=100, anchor=tk.E)
+        self.products_tree.column("Описание", width=400)
+
+        # Двойной клик для редактирования
+        self.products_tree.bind("<Double-1>", self.edit_product)
+
+    def create_links_tab(self, parent):
+        # Панель инструментов для связей
+        toolbar = ttk.Frame(parent, style="Secondary.TFrame")
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Button(toolbar, text="Обновить", command=self.load_links, style="TButton").pack(side=tk.LEFT, padx=5)
+        self.link_search = self.create_search_box(toolbar, self.filter_links)
+
+        # Таблица связей. Скрытый столбец ID - ключ связи, по нему создаются элементы таблицы
+        columns = ("ID", "Продукция", "Материал", "Требуемое кол-во", "Потери (%)")
+        self.links_grid = PagedGrid(parent, columns, self.fetch_links, self.count_links,
+                                    displaycolumns=columns[1:], sort_columns=LINK_SORT, sort=("Продукция", False),
+                                    seeking=True)
+        self.links_tree = self.links_grid.tree
+
+        self.links_tree.column("Продукция", width=250)
+        self.links_tree.column("Материал", width=250)
+        self.links_tree.column("Требуемое кол-во", width=150, anchor=tk.E)
+        self.links_tree.column("Потери (%)", width=100, anchor=tk.E)
+
+        # Загрузка данных о связях
+        self.load_links()
+
+    def load_materials(self):
+        # Потребность берется из material_demand, без пересчета по связям
+        self.materials_grid.reload()
+
+    def create_search_box(self, toolbar, command):
+        """Строка поиска справа на панели инструментов; Enter или кнопка вызывают command"""
+        search = tk.StringVar()
+        ttk.Button(toolbar, text="Найти", command=command, style="TButton").pack(side=tk.RIGHT, padx=5)
+        entry = ttk.Entry(toolbar, textvariable=search, width=30, style="TEntry")
+        entry.pack(side=tk.RIGHT, padx=5)
+        entry.bind("<Return>", lambda event: command())
+        ttk.Label(toolbar, text="Поиск:", style="TLabel").pack(side=tk.RIGHT)
+        return search
+
+    # Окна таблиц вкладок с учетом поиска и фильтров. Материалы и продукция читаются с фильтрами,
+    # которые FilterBar применил после фонового запроса; строка поиска связей разбирается
+    # при каждом чтении окна (search_query). Сама выборка идет по индексам FTS5
+
+    def filter_materials(self, filters):
+        self.load_filtered(self.materials_grid, self.material_filters, filters,
+                           self.repository.fetch_materials, self.repository.count_materials)
+
+    def fetch_materials(self, offset, limit, sort, seek_row=None, backward=False):
+        return self.repository.fetch_materials(offset, limit, sort, filters=self.material_filters.applied,
+                                               seek_row=seek_row, backward=backward)
+
+    def count_materials(self):
+        return self.repository.count_materials(self.material_filters.applied)
+
+    def filter_products(self, filters):
+        self.load_filtered(self.products_grid, self.product_filters, filters,
+                           self.repository.fetch_products, self.repository.count_products)
+
+    def fetch_products(self, offset, limit, sort, seek_row=None, backward=False):
+        return self.repository.fetch_products(offset, limit, sort, filters=self.product_filters.applied,
+                                              seek_row=seek_row, backward=backward)
+
+    def count_products(self):
+        return self.repository.count_products(self.product_filters.applied)
+
+    def load_filtered(self, grid, bar, filters, fetch, count):
+        """Читает в фоновом потоке число строк и первое окно таблицы grid с фильтрами filters.
+
+        Пока запрос выполняется, таблица показывает прежний результат; новый фильтр прерывает запрос.
+        """
+        sort = grid.sort
+        limit = grid.visible_rows + 2 * GRID_BUFFER
+
+        def query():
+            return count(filters), fetch(0, limit, sort, filters=filters)
+
+        def show(result):
+            bar.applied = filters
+            if grid.sort == sort:
+                grid.load(*result)
+            else:
+                # Пока шел запрос, таблицу отсортировали по другому столбцу
+                grid.offset = 0
+                grid.reload()
+
+        polling = self.filter_worker.pending is not None
+        self.filter_worker.submit(query, show)
+        if not polling:
+            self.root.after(FILTER_POLL_MS, self.poll_filter_results)
+
+    def poll_filter_results(self):
+        """Показывает результат фонового запроса фильтра, вызывается через root.after"""
+        if self.filter_worker.deliver():
+            self.root.after(FILTER_POLL_MS, self.poll_filter_results)
+
+    def filter_links(self):
+        self.links_grid.offset = 0
+        self.links_grid.reload()
+
+    def fetch_links(self, offset, limit, sort, seek_row=None, backward=False):
+        """В связях ищется наименование продукции или материала, без описания продукции"""
+        return self.repository.fetch_links(offset, limit, sort, search=search_query(self.link_search.get(), ("name",)),
+                                           seek_row=seek_row, backward=backward)
+
+    def count_links(self):
+        return self.repository.count_links(search_query(self.link_search.get(), ("name",)))
+
+    def load_products(self):
+        self.products_grid.reload()
+
+    def load_links(self):
+        self.links_grid.reload()
+
+    def add_material(self):
+        MaterialForm(self.root, self, None)
+
+    def edit_material(self, event):
+        item = self.materials_tree.selection()[0]
+        material_id = self.materials_tree.item(item, "values")[0]
+        MaterialForm(self.root, self, material_id)
+
+    @writes_data
+    def save_material(self, data, material_id=None):
+        try:
+            unit_price = float(data['unit_price'])
+            stock_quantity = float(data['stock_quantity'])
+            min_quantity = float(data['min_quantity'])
+            package_quantity = int(data['package_quantity'])
+
+            if unit_price < 0 or min_quantity < 0:
+                raise ValueError("Цена и минимальное количество не могут быть отрицательными")
+
+        except ValueError as e:
+            messagebox.showerror("Ошибка ввода", f"Некорректные данные: {str(e)}")
+            return
+
+        material = Material(data['name'], data['material_type_id'], data['unit_id'],
+                            unit_price, stock_quantity, min_quantity, package_quantity)
+        try:
+            self.repository.save_material(material, material_id)
+        except sqlite3.IntegrityError:
+            # Наименование уникально (индекс из миграции схемы)
+            messagebox.showerror("Ошибка ввода", "Материал с таким наименованием уже существует")
+            return
+
+        # Перечитываются только видимые окна таблиц, меняются лишь затронутые строки
+        self.materials_grid.refresh()
+        if material_id:
+            self.links_grid.refresh()  # Наименование материала в связях
+            self.products_grid.refresh()  # Стоимость продукции с этим материалом
+        messagebox.showinfo("Успех", "Данные материала сохранены")
+
+    @writes_data
+    def delete_material(self, material_id):
+        # Связи материала удаляются вместе с ним: число затронутой продукции берется
+        # из обратного индекса, без запроса по связям
+        affected = self.repository.count_products_using_material(material_id)
+        question = "Вы уверены, что хотите удалить материал?"
+        if affected:
+            question = (f"Материал входит в состав продукции: {affected} шт. Его связи с этой продукцией "
+                        f"будут удалены, а потребность и стоимость пересчитаны.\n\n{question}")
+        if messagebox.askyesno("Подтверждение", question):
+            self.repository.delete_material(material_id)
+            self.materials_grid.refresh()
+            self.links_grid.refresh()
+            self.products_grid.refresh()
+
+    # Массовые изменения: один запрос в одной транзакции, затем каждая затронутая таблица
+    # перечитывает видимое окно один раз
+
+    def bulk_edit_materials(self):
+        MaterialsBulkForm(self.root, self, self.materials_tree.selection())
+
+    @writes_data
+    def adjust_materials(self, column, mode, value, material_ids=None):
+        """Цена или остаток выбранных материалов, а без material_ids - всех материалов по фильтру вкладки"""
+        try:
+            value = float(value)
+            if mode == 'set' and value < 0:
+                raise ValueError("Цена и остаток не могут быть отрицательными")
+        except ValueError as e:
+            messagebox.showerror("Ошибка ввода", f"Некорректные данные: {str(e)}")
+            return
+
+        changed = self.repository.adjust_materials(column, mode, value, material_ids, self.material_filters.applied)
+        self.materials_grid.refresh()
+        if column == 'unit_price':
+            self.products_grid.refresh()  # Стоимость продукции
+        messagebox.showinfo("Успех", f"Изменено материалов: {changed}")
+
+    def copy_bom(self):
+        """Состав продукции в фокусе копируется в остальную выбранную или во всю продукцию по фильтру"""
+        selection = self.products_tree.selection()
+        source = self.products_tree.focus() if self.products_tree.focus() in selection else ""
+        if not source:
+            messagebox.showwarning("Выбор продукции", "Выберите продукцию, состав которой нужно скопировать")
+            return
+        CopyBomForm(self.root, self, source, self.products_tree.item(source, "values")[1],
+                    [product_id for product_id in selection if product_id != source])
+
+    @writes_data
+    def save_bom_copy(self, source_id, product_ids=None, replace=False):
+        if replace:
+            if product_ids is not None:
+                what = f"выбранной продукции ({len(product_ids)} шт.)"
+            else:
+                what = f"всей продукции в таблице ({self.products_grid.total} шт.)"
+            if not messagebox.askyesno("Подтверждение", f"Состав {what} будет заменен копируемым. Продолжить?"):
+                return
+        copied = self.repository.copy_bom(source_id, product_ids, self.product_filters.applied, replace)
+        self.materials_grid.refresh()  # Потребность материалов
+        self.products_grid.refresh()
+        self.links_grid.refresh()
+        messagebox.showinfo("Успех", f"Добавлено и изменено связей: {copied}")
+
+    @writes_data
+    def set_loss_percentage(self, product_id, loss_percentage, material_ids=None):
+        self.repository.set_loss_percentage(product_id, loss_percentage, material_ids)
+        self.materials_grid.refresh()
+        self.products_grid.refresh()
+        self.links_grid.refresh()
+
+    def view_products(self):
+        try:
+            item = self.materials_tree.selection()[0]
+            material_id = self.materials_tree.item(item, "values")[0]
+            ProductsView(self.root, self, material_id)
+        except IndexError:
+            messagebox.showwarning("Выбор материала", "Пожалуйста, выберите материал из списка")
+
+    def add_product(self):
+        ProductForm(self.root, self, None)
+
+    def edit_product(self, event):
+        item = self.products_tree.selection()[0]
+        product_id = self.products_tree.item(item, "values")[0]
+        ProductForm(self.root, self, product_id)
+
+    @writes_data
+    def save_product(self, data, product_id=None):
+        try:
+            if not data['name']:
+                raise ValueError("Название продукции обязательно")
+        except ValueError as e:
+            messagebox.showerror("Ошибка ввода", str(e))
+            return
+
+        product = Product(data['name'], data['product_type_id'], data['description'])
+        try:
+            self.repository.save_product(product, product_id)
+        except sqlite3.IntegrityError:
+            # Наименование уникально (индекс из миграции схемы)
+            messagebox.showerror("Ошибка ввода", "Продукция с таким наименованием уже существует")
+            return
+
+        self.products_grid.refresh()
+        if product_id:
+            self.links_grid.refresh()  # Наименование продукции в связях
+        messagebox.showinfo("Успех", "Данные продукции сохранены")
+
+    @writes_data
+    def delete_product(self, product_id):
+        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить продукцию?"):
+            self.repository.delete_product(product_id)
+            self.products_grid.refresh()
+            # Вместе с продукцией удалены ее связи и изменилась потребность материалов
+            self.links_grid.refresh()
+            self.materials_grid.refresh()
+
+    def link_materials_to_product(self):
+        try:
+            item = self.products_tree.selection()[0]
+            product_id = self.products_tree.item(item, "values")[0]
+            product_name = self.products_tree.item(item, "values")[1]
+            ProductMaterialsForm(self.root, self, product_id, product_name)
+        except IndexError:
+            messagebox.showwarning("Выбор продукции", "Пожалуйста, выберите продукцию из списка")
+
+    @writes_data
+    def save_product_material(self, product_id, material_id, required_quantity, loss_percentage):
+        values = self.link_values(required_quantity, loss_percentage)
+        if values is None:
+            return
+
+        self.repository.save_product_material(product_id, material_id, *values)
+        self.refresh_after_link_change([material_id])
+        return True
+
+    @writes_data
+    def add_product_materials(self, product_id, material_ids, required_quantity, loss_percentage):
+        """Добавляет выбранные в MaterialPicker материалы одной транзакцией"""
+        values = self.link_values(required_quantity, loss_percentage)
+        if values is None:
+            return
+
+        try:
+            self.repository.add_product_materials(product_id, material_ids, *values)
+        except sqlite3.IntegrityError:
+            messagebox.showerror("Ошибка", "Часть материалов уже добавлена в продукцию или удалена, "
+                                           "ни один материал не добавлен")
+            return
+        self.refresh_after_link_change(material_ids)
+        return True
+
+    def link_values(self, required_quantity, loss_percentage):
+        """(количество, потери %) из полей ввода или None после сообщения об ошибке"""
+        try:
+            required_quantity = float(required_quantity)
+            loss_percentage = float(loss_percentage)
+
+            if required_quantity <= 0 or loss_percentage < 0:
+                raise ValueError("Количество должно быть положительным, а потери не могут быть отрицательными")
+
+        except ValueError as e:
+            messagebox.showerror("Ошибка ввода", f"Некорректные данные: {str(e)}")
+            return None
+        return required_quantity, loss_percentage
+
+    @writes_data
+    def delete_product_material(self, product_id, material_id):
+        self.repository.delete_product_material(product_id, material_id)
+        self.refresh_after_link_change([material_id])
+
+    def refresh_after_link_change(self, material_ids):
+        """Изменились связи материалов material_ids: в таблице материалов обновляются только их строки"""
+        if self.materials_grid.sort[0] == "Требуется" or self.material_filters.applied.shortage:
+            # Строка может переместиться или войти в список нехватки, перечитывается видимое окно
+            self.materials_grid.refresh()
+        else:
+            self.materials_grid.update_rows(self.repository.fetch_materials(material_ids=material_ids))
+        self.links_grid.refresh()
+        self.products_grid.refresh()  # Стоимость продукции
+
+
+class PagedGrid:
+    """Treeview для больших таблиц: элементы создаются только для видимых строк.
+
+    Строки читаются через fetch(offset, limit, sort) окнами с запасом GRID_BUFFER строк выше
+    и ниже видимых, count() возвращает общее число строк для полосы прокрутки. Первый столбец
+    выборки - первичный ключ, он же iid элемента. Память и время перерисовки зависят
+    от высоты таблицы на экране, а не от числа строк в БД.
+
+    Щелчок по заголовку столбца из sort_columns сортирует таблицу запросом с ORDER BY,
+    sort - текущая сортировка (заголовок, по убыванию). row_tags(строка) возвращает теги
+    элемента Treeview (подсветка строк через tag_configure).
+
+    С seeking=True fetch принимает еще seek_row и backward (Repository.fetch_materials): при прокрутке
+    строками и страницами окно дочитывается от крайней прочитанной строки по ключу сортировки,
+    и время не зависит от того, насколько далеко от начала таблицы окно. По номеру строки (OFFSET)
+    читается только переход в произвольное место - перетаскивание полосы прокрутки, - и номер
+    отсчитывается от ближнего конца таблицы, поэтому дороже всего середина таблицы.
+    """
+
+    def __init__(self, parent, columns, fetch, count, displaycolumns="#all", sort_columns=(), sort=None,
+                 row_tags=None, seeking=False):
+        self.fetch = fetch
+        self.count = count
+        self.row_tags = row_tags or (lambda row: ())
+        self.sort_columns = sort_columns
+        self.sort = sort
+        self.seeking = seeking
+        self.total = 0
+        self.offset = 0
+        self.visible_rows = GRID_DEFAULT_ROWS
+        # Прочитанные из БД строки: self.cache[i] - строка с номером self.cache_start + i.
+        # cache_ordered - строки в порядке БД, и от крайних можно читать дальше по ключу
+        self.cache_start = 0
+        self.cache = []
+        self.cache_ordered = True
+        # Показанные строки по iid: поиск элемента и сравнение значений без обхода Treeview
+        self.rows = {}
+
+        self.tree = ttk.Treeview(parent, columns=columns, show="headings", displaycolumns=displaycolumns)
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        for col in columns:
+            self.tree.heading(col, text=col)
+            if col in sort_columns:
+                self.tree.heading(col, command=lambda c=col: self.sort_by(c))
+        self.show_sort()
+
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Прокрутку выполняет сама таблица: сдвигает окно строк, а не элементы Treeview
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-GRID_WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(GRID_WHEEL_ROWS))
+        self.tree.bind("<Up>", lambda event: self.on_arrow(-1))
+        self.tree.bind("<Down>", lambda event: self.on_arrow(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible_rows))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible_rows))
+        self.tree.bind("<Control-Home>", lambda event: self.scroll(-self.total))
+        self.tree.bind("<Control-End>", lambda event: self.scroll(self.total))
+
+    def load(self, total, rows):
+        """Показывает с первой строки число строк и окно, прочитанные заранее (фоновый запрос фильтра)"""
+        self.total = total
+        self.cache_start = 0
+        self.cache = rows
+        self.cache_ordered = True
+        self.show(0)
+
+    def reload(self):
+        """Перечитывает число строк и окно с запасом (полное обновление)"""
+        self.total = self.count()
+        self.cache = []
+        self.show(self.offset)
+
+    def refresh(self):
+        """Точечное обновление после изменения данных: читается только видимое окно,
+        в Treeview добавляются, удаляются и изменяются лишь отличающиеся строки.
+
+        Окно читается после строки, которая была над ним, поэтому остается на месте, даже если
+        выше добавились или удалились строки."""
+        self.total = self.count()
+        offset = max(0, min(self.offset, self.total - self.visible_rows))
+        limit = min(self.visible_rows, self.total - offset)
+        above = offset - self.cache_start - 1
+        rows = None
+        if self.seeking and self.cache_ordered and 0 <= above < len(self.cache):
+            rows = self.fetch(0, limit, self.sort, seek_row=self.cache[above])
+        if rows is None or len(rows) < limit:
+            rows = self.read(offset, limit)
+        self.cache_start = offset
+        self.cache = rows
+        self.cache_ordered = True
+        self.show(offset)
+
+    def sort_by(self, column):
+        """Повторный щелчок по тому же столбцу меняет направление сортировки"""
+        reverse = self.sort == (column, False)
+        self.sort = (column, reverse)
+        self.show_sort()
+        self.offset = 0
+        self.reload()
+
+    def show_sort(self):
+        """Стрелка в заголовке столбца, по которому отсортирована таблица"""
+        for col in self.sort_columns:
+            arrow = ""
+            if self.sort and self.sort[0] == col:
+                arrow = " ▼" if self.sort[1] else " ▲"
+            self.tree.heading(col, text=col + arrow)
+
+    def update_rows(self, rows):
+        """Заменяет значения строк с теми же ключами, если они показаны или прочитаны про запас.
+
+        Число и порядок строк не меняются, поэтому окно не перечитывается.
+        """
+        changed = {str(row[0]): row for row in rows}
+        for iid, row in changed.items():
+            if iid in self.rows and self.rows[iid] != row:
+                self.tree.item(iid, values=row, tags=self.row_tags(row))
+                self.rows[iid] = row
+        cache = [changed.get(str(row[0]), row) for row in self.cache]
+        # Новое значение могло сменить место строки в сортировке: от нее уже нельзя читать по ключу
+        if cache != self.cache:
+            self.cache_ordered = False
+        self.cache = cache
+
+    def show(self, offset):
+        """Показывает строки начиная с номера offset"""
+        self.offset = max(0, min(offset, self.total - self.visible_rows))
+        end = min(self.offset + self.visible_rows, self.total)
+
+        if self.offset < self.cache_start or end > self.cache_start + len(self.cache):
+            self.fill(max(0, self.offset - GRID_BUFFER), min(self.total, end + GRID_BUFFER))
+
+        self.render(self.cache[self.offset - self.cache_start:end - self.cache_start])
+
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, end / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def fill(self, start, stop):
+        """Читает в cache строки с номерами start..stop.
+
+        Если они продолжают прочитанное окно вниз или вверх (с разрывом не больше самого окна),
+        читаются только недостающие строки - от крайней прочитанной по ключу сортировки.
+        Иначе окно читается заново по номеру строки.
+        """
+        cache_end = self.cache_start + len(self.cache)
+        if self.seeking and self.cache and self.cache_ordered:
+            if self.cache_start <= start and cache_end < stop and start - cache_end <= stop - start:
+                rows = self.fetch(max(0, start - cache_end), stop - max(start, cache_end), self.sort,
+                                  seek_row=self.cache[-1])
+                self.cache = self.cache[start - self.cache_start:] + rows
+                self.cache_start = start
+                return
+            if start < self.cache_start and stop <= cache_end and self.cache_start - stop <= stop - start:
+                rows = self.fetch(max(0, self.cache_start - stop), min(stop, self.cache_start) - start, self.sort,
+                                  seek_row=self.cache[0], backward=True)
+                self.cache = rows + self.cache[:max(0, stop - self.cache_start)]
+                self.cache_start = start
+                return
+        self.cache_start = start
+        self.cache = self.read(start, stop - start)
+        self.cache_ordered = True
+
+    def read(self, offset, limit):
+        """limit строк с номера offset; OFFSET отсчитывается от ближнего конца таблицы"""
+        from_end = self.total - offset - limit
+        if self.seeking and from_end < offset:
+            return self.fetch(max(0, from_end), limit, self.sort, backward=True)
+        return self.fetch(offset, limit, self.sort)
+
+    def render(self, rows):
+        """Приводит элементы Treeview к строкам rows, затрагивая только отличающиеся.
+
+        Выделение сохраняется, пока строка остается в окне.
+        """
+        iids = [str(row[0]) for row in rows]
+        shown = set(iids)
+        stale = [iid for iid in self.rows if iid not in shown]
+        if stale:
+            self.tree.delete(*stale)
+
+        for index, (iid, row) in enumerate(zip(iids, rows)):
+            values = self.rows.get(iid)
+            if values is None:
+                self.tree.insert("", index, iid=iid, values=row, tags=self.row_tags(row))
+                continue
+            if values != row:
+                self.tree.item(iid, values=row, tags=self.row_tags(row))
+            if self.tree.index(iid) != index:
+                self.tree.move(iid, "", index)
+
+        self.rows = dict(zip(iids, rows))
+
+    def scroll(self, rows):
+        self.show(self.offset + rows)
+        return "break"
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: moveto доля | scroll n units|pages"""
+        if args[0] == "moveto":
+            self.show(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            step = self.visible_rows if args[2] == "pages" else 1
+            self.show(self.offset + int(args[1]) * step)
+
+    def on_mousewheel(self, event):
+        return self.scroll(-GRID_WHEEL_ROWS if event.delta > 0 else GRID_WHEEL_ROWS)
+
+    def on_arrow(self, step):
+        """Стрелка у края окна сдвигает окно на строку и переносит на нее выделение"""
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if focus not in children:
+            return None
+        if 0 <= children.index(focus) + step < len(children):
+            return None  # Обычное перемещение внутри окна
+
+        self.scroll(step)
+        children = self.tree.get_children()
+        if children:
+            target = children[0] if step < 0 else children[-1]
+            self.tree.focus(target)
+            self.tree.selection_set(target)
+        return "break"
+
+    def on_resize(self, event):
+        """Число видимых строк пересчитывается по высоте таблицы и высоте первой строки"""
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else ""
+        if not bbox:
+            return
+        _, top, _, row_height = bbox
+        rows = max(1, (event.height - top) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.show(self.offset)
+
+
+class FilterBar:
+    """Строка фильтров над таблицей вкладки: поиск и выпадающие списки.
+
+    filter_type - MaterialFilter или ProductFilter, его поля после search заполняются значениями
+    списков choices по порядку. choices - [(подпись, функция {значение: наименование})], варианты
+    перечитываются при каждом открытии списка. Ввод и выбор сразу прерывают начатый запрос,
+    а command(фильтры) вызывается после паузы FILTER_DEBOUNCE_MS, поэтому пока пользователь печатает,
+    запросы не выполняются. applied - фильтры, результат которых показан в таблице.
+    """
+
+    def __init__(self, parent, worker, filter_type, choices, command):
+        self.worker = worker
+        self.filter_type = filter_type
+        self.command = command
+        self.applied = filter_type()
+        self.after_id = None
+        # Значения вариантов каждого списка; первый вариант "Все" - без фильтра
+        self.values = []
+        self.boxes = []
+
+        self.frame = ttk.Frame(parent, style="Secondary.TFrame")
+        self.frame.pack(fill=tk.X, padx=5)
+        ttk.Label(self.frame, text="Поиск:", style="TLabel").pack(side=tk.LEFT, padx=5)
+        self.search = tk.StringVar()
+        entry = ttk.Entry(self.frame, textvariable=self.search, width=30, style="TEntry")
+        entry.pack(side=tk.LEFT, padx=5)
+        # Enter применяет фильтр без паузы
+        entry.bind("<Return>", lambda event: self.apply())
+        self.search.trace_add("write", lambda *args: self.changed())
+
+        for label, options in choices:
+            index = len(self.boxes)
+            ttk.Label(self.frame, text=label, style="TLabel").pack(side=tk.LEFT, padx=5)
+            box = ttk.Combobox(self.frame, state="readonly", width=20, style="TCombobox",
+                               postcommand=lambda i=index, o=options: self.load_options(i, o))
+            box.pack(side=tk.LEFT, padx=5)
+            box.bind("<<ComboboxSelected>>", lambda event: self.changed())
+            self.values.append([None])
+            self.boxes.append(box)
+            self.load_options(index, options)
+            box.current(0)
+
+    def load_options(self, index, options):
+        box = self.boxes[index]
+        selected = self.values[index][box.current()] if box.current() >= 0 else None
+        options = options()
+        self.values[index] = [None] + list(options)
+        box.configure(values=["Все"] + list(options.values()))
+        # Выбранный вариант остается выбранным, даже если справочник изменился
+        box.current(self.values[index].index(selected) if selected in self.values[index] else 0)
+
+    def filters(self):
+        """Фильтры по текущему вводу (еще не примененные)"""
+        return self.filter_type(search_query(self.search.get()),
+                                *(values[box.current()] for values, box in zip(self.values, self.boxes)))
+
+    def changed(self):
+        self.worker.cancel()
+        if self.after_id is not None:
+            self.frame.after_cancel(self.after_id)
+        self.after_id = self.frame.after(FILTER_DEBOUNCE_MS, self.apply)
+
+    def apply(self):
+        if self.after_id is not None:
+            self.frame.after_cancel(self.after_id)
+            self.after_id = None
+        self.command(self.filters())
+
+
+class FilterWorker:
+    """Фоновый поток для запросов фильтров таблиц вкладок.
+
+    submit(query, show) ставит запрос в очередь: query() выполняется в потоке на его соединении из пула,
+    show(результат) вызывает окно в deliver(). Каждый submit() и cancel() увеличивает generation:
+    обработчик прогресса SQLite каждые FILTER_PROGRESS_OPS инструкций сравнивает поколение запроса
+    с текущим и прерывает устаревший запрос, а его результат, если он успел прийти, не показывается.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.generation = 0
+        self.pending = None  # поколение запроса, результат которого окно еще не получило
+        self.queries = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, query, show):
+        self.generation += 1
+        self.pending = self.generation
+        self.queries.put((self.generation, query, show))
+
+    def cancel(self):
+        self.generation += 1
+
+    def run(self):
+        while True:
+            generation, query, show = self.queries.get()
+            if generation != self.generation:
+                continue
+            with self.pool.connection() as conn:
+                conn.set_progress_handler(lambda: generation != self.generation, FILTER_PROGRESS_OPS)
+                try:
+                    self.results.put((generation, show, query(), None))
+                except Exception as e:
+                    # Устаревший запрос прерван обработчиком прогресса (sqlite3.OperationalError: interrupted)
+                    if generation == self.generation:
+                        self.results.put((generation, show, None, e))
+                finally:
+                    conn.set_progress_handler(None, 0)
+
+    def deliver(self):
+        """Показывает результат текущего запроса; вызывается из потока окна.
+        Возвращает True, пока результат текущего запроса еще не получен"""
+        while True:
+            try:
+                generation, show, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue
+            self.pending = None
+            if error is not None:
+                messagebox.showerror("Ошибка", f"Ошибка фильтра: {error}")
+            else:
+                show(result)
+        if self.pending != self.generation:
+            self.pending = None
+        return self.pending is not None
+
+
+class MaterialForm(Dialog):
+    def __init__(self, parent, app, material_id):
+        self.app = app
+        self.material_id = material_id
+        self.title_text = "Добавить материал" if material_id is None else "Редактировать материал"
+        super().__init__(parent, title=self.title_text)
+
+    def body(self, master):
+        self.geometry("500x400")
+        self.resizable(False, False)
+
+        # Применение стилей
+        master.configure(background=self.app.primary_bg)
+
+        ttk.Label(master, text="Название:", style="TLabel").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
+        self.name_entry = ttk.Entry(master, width=40, style="TEntry")
+        self.name_entry.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
+
+        # Типы материалов
+        ttk.Label(master, text="Тип материала:", style="TLabel").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        self.material_types = self.get_material_types()
+        self.material_type_combo = ttk.Combobox(master, values=list(self.material_types.names.values()),
+                                                state="readonly", width=37, style="TCombobox")
+        self.material_type_combo.grid(row=1, column=1, padx=10, pady=5, sticky=tk.W)
+
+        # Единицы измерения
+        ttk.Label(master, text="Единица измерения:", style="TLabel").grid(row=2, column=0, padx=10, pady=5, sticky=tk.W)
+        self.units = self.get_units()
+        self.unit_combo = ttk.Combobox(master, values=list(self.units.names.values()),
+                                       state="readonly", width=37, style="TCombobox")
+        self.unit_combo.grid(row=2, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Цена за единицу:", style="TLabel").grid(row=3, column=0, padx=10, pady=5, sticky=tk.W)
+        self.unit_price_entry = ttk.Entry(master, width=15, style="TEntry")
+        self.unit_price_entry.grid(row=3, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Количество на складе:", style="TLabel").grid(row=4, column=0, padx=10, pady=5,
+                                                                             sticky=tk.W)
+        self.stock_entry = ttk.Entry(master, width=15, style="TEntry")
+        self.stock_entry.grid(row=4, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Минимальное количество:", style="TLabel").grid(row=5, column=0, padx=10, pady=5,
+                                                                               sticky=tk.W)
+        self.min_entry = ttk.Entry(master, width=15, style="TEntry")
+        self.min_entry.grid(row=5, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Количество в упаковке:", style="TLabel").grid(row=6, column=0, padx=10, pady=5,
+                                                                              sticky=tk.W)
+        self.package_entry = ttk.Entry(master, width=15, style="TEntry")
+        self.package_entry.grid(row=6, column=1, padx=10, pady=5, sticky=tk.W)
+
+        # Кнопка удаления (только для редактирования)
+        if self.material_id:
+            ttk.Button(master, text="Удалить материал",
+                       command=self.delete_material, style="TButton").grid(row=7, column=1, padx=10, pady=10,
+                                                                           sticky=tk.E)
+
+        # Загрузка данных при редактировании
+        if self.material_id:
+            self.load_data()
+
+        return self.name_entry
+
+    def get_material_types(self):
+        return self.app.repository.lookups.get('material_types')
+
+    def get_units(self):
+        return self.app.repository.lookups.get('units')
+
+    def load_data(self):
+        data = self.app.repository.get_material(self.material_id)
+
+        self.name_entry.insert(0, data.name)
+        self.unit_price_entry.insert(0, str(data.unit_price))
+        self.stock_entry.insert(0, str(data.stock_quantity))
+        self.min_entry.insert(0, str(data.min_quantity))
+        self.package_entry.insert(0, str(data.package_quantity))
+
+        # Устанавливаем значения в выпадающие списки
+        self.material_type_combo.set(self.material_types.names.get(data.material_type_id, ""))
+        self.unit_combo.set(self.units.names.get(data.unit_id, ""))
+
+    def apply(self):
+        # Получаем данные из формы
+        data = {
+            'name': self.name_entry.get(),
+            'material_type_id': None,
+            'unit_id': None,
+            'unit_price': self.unit_price_entry.get(),
+            'stock_quantity': self.stock_entry.get(),
+            'min_quantity': self.min_entry.get(),
+            'package_quantity': self.package_entry.get()
+        }
+
+        # Проверяем обязательные поля
+        if not data['name']:
+            messagebox.showerror("Ошибка", "Название материала обязательно")
+            return
+
+        # Получаем ID выбранного типа материала
+        data['material_type_id'] = self.material_types.ids.get(self.material_type_combo.get())
+
+        if data['material_type_id'] is None:
+            messagebox.showerror("Ошибка", "Выберите тип материала")
+            return
+
+        # Получаем ID выбранной единицы измерения
+        data['unit_id'] = self.units.ids.get(self.unit_combo.get())
+
+        if data['unit_id'] is None:
+            messagebox.showerror("Ошибка", "Выберите единицу измерения")
+            return
+
+        # Сохраняем материал
+        self.app.save_material(data, self.material_id)
+
+    def delete_material(self):
+        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить материал?"):
+            self.app.delete_material(self.material_id)
+            self.destroy()
+
+
+class ProductForm(Dialog):
+    def __init__(self, parent, app, product_id):
+        self.app = app
+        self.product_id = product_id
+        self.title_text = "Добавить продукцию" if product_id is None else "Редактировать продукцию"
+        super().__init__(parent, title=self.title_text)
+
+    def body(self, master):
+        self.geometry("500x300")
+        self.resizable(False, False)
+
+        # Применение стилей
+        master.configure(background=self.app.primary_bg)
+
+        ttk.Label(master, text="Название продукции:", style="TLabel").grid(row=0, column=0, padx=10, pady=5,
+                                                                           sticky=tk.W)
+        self.name_entry = ttk.Entry(master, width=40, style="TEntry")
+        self.name_entry.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
+
+        # Типы продукции
+        ttk.Label(master, text="Тип продукции:", style="TLabel").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        self.product_types = self.get_product_types()
+        self.product_type_combo = ttk.Combobox(master, values=list(self.product_types.names.values()),
+                                               state="readonly", width=37, style="TCombobox")
+        self.product_type_combo.grid(row=1, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Описание:", style="TLabel").grid(row=2, column=0, padx=10, pady=5, sticky=tk.W)
+        self.description_entry = tk.Text(master, width=37, height=5, font=self.app.normal_font)
+        self.description_entry.grid(row=2, column=1, padx=10, pady=5, sticky=tk.W)
+
+        # Кнопка удаления (только для редактирования)
+        if self.product_id:
+            ttk.Button(master, text="Удалить продукцию",
+                       command=self.delete_product, style="TButton").grid(row=3, column=1, padx=10, pady=10,
+                                                                          sticky=tk.E)
+
+        # Загрузка данных при редактировании
+        if self.product_id:
+            self.load_data()
+
+        return self.name_entry
+
+    def get_product_types(self):
+        return self.app.repository.lookups.get('product_types')
+
+    def load_data(self):
+        data = self.app.repository.get_product(self.product_id)
+
+        self.name_entry.insert(0, data.name)
+        self.description_entry.insert("1.0", data.description)
+
+        # Устанавливаем значение в выпадающий список
+        self.product_type_combo.set(self.product_types.names.get(data.product_type_id, ""))
+
+    def apply(self):
+        # Получаем данные из формы
+        data = {
+            'name': self.name_entry.get(),
+            'product_type_id': None,
+            'description': self.description_entry.get("1.0", tk.END).strip()
+        }
+
+        # Проверяем обязательные поля
+        if not data['name']:
+            messagebox.showerror("Ошибка", "Название продукции обязательно")
+            return
+
+        # Получаем ID выбранного типа продукции
+        data['product_type_id'] = self.product_types.ids.get(self.product_type_combo.get())
+
+        if data['product_type_id'] is None:
+            messagebox.showerror("Ошибка", "Выберите тип продукции")
+            return
+
+        # Сохраняем продукцию
+        self.app.save_product(data, self.product_id)
+
+    def delete_product(self):
+        if messagebox.askyesno("Подтверждение", "Вы уверены, что хотите удалить продукцию?"):
+            self.app.delete_product(self.product_id)
+            self.destroy()
+
+
+class ProductMaterialsForm(tk.Toplevel):
+    def __init__(self, parent, app, product_id, product_name):
+        super().__init__(parent)
+        self.app = app
+        self.product_id = product_id
+        self.product_name = product_name
+        self.title(f"Материалы для продукции: {product_name}")
+        self.geometry("800x500")
+        self.resizable(False, False)
+
+        # Применение стилей
+        self.configure(background=self.app.primary_bg)
+
+        self.create_widgets()
+        self.load_materials()
+
+    def create_widgets(self):
+        # Основной фрейм
+        main_frame = ttk.Frame(self, style="TFrame")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # Панель инструментов
+        toolbar = ttk.Frame(main_frame, style="Secondary.TFrame")
+        toolbar.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Button(toolbar, text="Добавить материал", command=self.add_material, style="TButton").pack(side=tk.LEFT,
+                                                                                                       padx=5)
+        ttk.Button(toolbar, text="Обновить", command=self.load_materials, style="TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Потери для выбранных", command=self.set_loss_percentage,
+                   style="TButton").pack(side=tk.LEFT, padx=5)
+
+        # Стоимость материалов продукции: сумма строк таблицы и итог с коэффициентом типа
+        self.cost_label = ttk.Label(main_frame, style="TLabel")
+        self.cost_label.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
+
+        # Таблица материалов продукта
+        columns = ("Материал", "Требуемое кол-во", "Потери (%)", "Цена", "Стоимость", "Действия")
+        self.actions_column = f"#{columns.index('Действия') + 1}"
+        self.materials_tree = ttk.Treeview(main_frame, columns=columns, show="headings")
+
+        for col in columns:
+            self.materials_tree.heading(col, text=col)
+
+        self.materials_tree.column("Материал", width=220)
+        self.materials_tree.column("Требуемое кол-во", width=120, anchor=tk.E)
+        self.materials_tree.column("Потери (%)", width=80, anchor=tk.E)
+        self.materials_tree.column("Цена", width=80, anchor=tk.E)
+        self.materials_tree.column("Стоимость", width=90, anchor=tk.E)
+        self.materials_tree.column("Действия", width=150, anchor=tk.CENTER)
+
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.materials_tree.yview)
+        self.materials_tree.configure(yscroll=scrollbar.set)
+
+        self.materials_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def load_materials(self):
+        # Очищаем таблицу
+        for item in self.materials_tree.get_children():
+            self.materials_tree.delete(item)
+
+        # Загружаем материалы для продукта
+        for row in self.app.repository.product_materials(self.product_id):
+            material_id, material_name, req_qty, loss, unit_price, cost = row
+            self.materials_tree.insert("", tk.END, values=(
+                material_name,
+                req_qty,
+                loss,
+                unit_price,
+                cost,
+                "✏️ Редактировать ❌ Удалить"
+            ), tags=(material_id,))
+
+        # Итог берется из product_cost, без суммирования строк
+        cost = self.app.repository.product_cost(self.product_id)
+        if cost:
+            self.cost_label.config(text=f"Стоимость материалов: {cost.material_cost:.2f}   "
+                                        f"Коэффициент типа: {cost.coefficient}   "
+                                        f"Стоимость продукции: {cost.cost:.2f}")
+
+        # Привязываем обработчик двойного клика
+        self.materials_tree.bind("<Double-1>", self.on_material_double_click)
+
+    def on_material_double_click(self, event):
+        region = self.materials_tree.identify("region", event.x, event.y)
+        if region == "cell":
+            column = self.materials_tree.identify_column(event.x)
+            if column == self.actions_column:
+                item = self.materials_tree.identify_row(event.y)
+                material_id = self.materials_tree.item(item, "tags")[0]
+                material_name = self.materials_tree.item(item, "values")[0]
+
+                # Определяем позицию клика в колонке
+                x, y = event.x, event.y
+                bbox = self.materials_tree.bbox(item, column)
+
+                # Если клик по иконке редактирования
+                if bbox and x < bbox[0] + bbox[2] / 2:
+                    self.edit_material(material_id, material_name)
+                # Если клик по иконке удаления
+                elif bbox:
+                    self.delete_material(material_id, material_name)
+
+    def add_material(self):
+        if not self.app.repository.available_materials(self.product_id, limit=1):
+            messagebox.showinfo("Нет материалов", "Все материалы уже добавлены в эту продукцию")
+            return
+        MaterialPicker(self, self.app, self.product_id)
+
+    def edit_material(self, material_id, material_name, is_new=False):
+        # Получаем текущие значения (если редактирование)
+        req_qty = 0.0
+        loss = 0.0
+
+        if not is_new:
+            result = self.app.repository.get_product_material(self.product_id, material_id)
+            if result:
+                req_qty, loss = result
+
+        # Диалог редактирования
+        edit_dialog = tk.Toplevel(self)
+        edit_dialog.title(f"Редактирование: {material_name}")
+        edit_dialog.geometry("300x200")
+        edit_dialog.resizable(False, False)
+        edit_dialog.transient(self)
+        edit_dialog.grab_set()
+
+        ttk.Label(edit_dialog, text="Требуемое количество:", style="TLabel").grid(row=0, column=0, padx=10, pady=5,
+                                                                                  sticky=tk.W)
+        req_entry = ttk.Entry(edit_dialog, style="TEntry")
+        req_entry.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
+        req_entry.insert(0, str(req_qty))
+
+        ttk.Label(edit_dialog, text="Потери (%):", style="TLabel").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        loss_entry = ttk.Entry(edit_dialog, style="TEntry")
+        loss_entry.grid(row=1, column=1, padx=10, pady=5, sticky=tk.W)
+        loss_entry.insert(0, str(loss))
+
+        def save():
+            if self.app.save_product_material(
+                    self.product_id,
+                    material_id,
+                    req_entry.get(),
+                    loss_entry.get()
+            ):
+                edit_dialog.destroy()
+                self.load_materials()
+
+        ttk.Button(edit_dialog, text="Сохранить", command=save, style="TButton").grid(row=2, column=0, columnspan=2,
+                                                                                      pady=10)
+
+    def delete_material(self, material_id, material_name):
+        if messagebox.askyesno(
+                "Подтверждение",
+                f"Вы уверены, что хотите удалить материал '{material_name}' из продукции?"
+        ):
+            self.app.delete_product_material(self.product_id, material_id)
+            self.load_materials()
+
+    def set_loss_percentage(self):
+        """Одинаковые потери для выбранных строк, а если ничего не выбрано - для всего состава"""
+        material_ids = [self.materials_tree.item(item, "tags")[0] for item in self.materials_tree.selection()]
+        what = f"выбранных материалов ({len(material_ids)})" if material_ids else "всех материалов продукции"
+        loss = simpledialog.askfloat("Потери", f"Потери (%) для {what}:", minvalue=0, parent=self)
+        if loss is None:
+            return
+        self.app.set_loss_percentage(self.product_id, loss, material_ids or None)
+        self.load_materials()
+
+
+class MaterialsBulkForm(Dialog):
+    """Цена или остаток выбранных материалов или всех материалов в таблице (с учетом фильтров)"""
+
+    def __init__(self, parent, app, material_ids):
+        self.app = app
+        self.material_ids = material_ids
+        super().__init__(parent, title="Изменить цену или остаток")
+
+    def body(self, master):
+        self.resizable(False, False)
+        master.configure(background=self.app.primary_bg)
+
+        ttk.Label(master, text="Что изменить:", style="TLabel").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
+        self.column_combo = ttk.Combobox(master, values=list(BULK_COLUMNS), state="readonly", width=20,
+                                         style="TCombobox")
+        self.column_combo.current(0)
+        self.column_combo.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Способ:", style="TLabel").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        self.mode_combo = ttk.Combobox(master, values=list(BULK_MODES), state="readonly", width=20,
+                                       style="TCombobox")
+        self.mode_combo.current(0)
+        self.mode_combo.grid(row=1, column=1, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(master, text="Значение:", style="TLabel").grid(row=2, column=0, padx=10, pady=5, sticky=tk.W)
+        self.value_entry = ttk.Entry(master, width=15, style="TEntry")
+        self.value_entry.grid(row=2, column=1, padx=10, pady=5, sticky=tk.W)
+
+        self.scope = tk.StringVar(value="selected" if self.material_ids else "all")
+        selected = ttk.Radiobutton(master, text=f"Выбранные материалы: {len(self.material_ids)}",
+                                   variable=self.scope, value="selected")
+        selected.grid(row=3, column=0, columnspan=2, padx=10, pady=(10, 0), sticky=tk.W)
+        if not self.material_ids:
+            selected.state(["disabled"])
+        ttk.Radiobutton(master, text=f"Все материалы в таблице: {self.app.materials_grid.total}",
+                        variable=self.scope, value="all").grid(row=4, column=0, columnspan=2, padx=10, pady=5,
+                                                               sticky=tk.W)
+        return self.value_entry
+
+    def apply(self):
+        material_ids = self.material_ids if self.scope.get() == "selected" else None
+        self.app.adjust_materials(BULK_COLUMNS[self.column_combo.get()], BULK_MODES[self.mode_combo.get()],
+                                  self.value_entry.get(), material_ids)
+
+
+class CopyBomForm(Dialog):
+    """Копирование состава продукции в выбранную продукцию или во всю продукцию в таблице"""
+
+    def __init__(self, parent, app, source_id, source_name, product_ids):
+        self.app = app
+        self.source_id = source_id
+        self.source_name = source_name
+        self.product_ids = product_ids
+        super().__init__(parent, title="Копировать состав")
+
+    def body(self, master):
+        self.resizable(False, False)
+        master.configure(background=self.app.primary_bg)
+
+        ttk.Label(master, text=f"Состав продукции «{self.source_name}» копируется в:",
+                  style="TLabel").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
+        self.scope = tk.StringVar(value="selected" if self.product_ids else "all")
+        selected = ttk.Radiobutton(master, text=f"Остальную выбранную продукцию: {len(self.product_ids)}",
+                                   variable=self.scope, value="selected")
+        selected.grid(row=1, column=0, padx=10, pady=(5, 0), sticky=tk.W)
+        if not self.product_ids:
+            selected.state(["disabled"])
+        ttk.Radiobutton(master, text=f"Всю продукцию в таблице ({self.app.products_grid.total} шт.), кроме исходной",
+                        variable=self.scope, value="all").grid(row=2, column=0, padx=10, pady=5, sticky=tk.W)
+
+        # Без замены материалы целевой продукции, которых нет в копируемом составе, остаются
+        self.replace = tk.BooleanVar(value=False)
+        ttk.Checkbutton(master, text="Заменить состав: удалить материалы, которых нет в копируемом",
+                        variable=self.replace).grid(row=3, column=0, padx=10, pady=(10, 5), sticky=tk.W)
+
+    def apply(self):
+        product_ids = self.product_ids if self.scope.get() == "selected" else None
+        self.app.save_bom_copy(self.source_id, product_ids, self.replace.get())
+
+
+class MaterialPicker(tk.Toplevel):
+    """Выбор материалов для состава продукции: поиск по началу наименования и выбор нескольких.
+
+    Список показывает только материалы, которых еще нет в продукции, и читается страницами
+    по PICKER_PAGE_SIZE: следующая страница дочитывается, когда список прокручен до конца.
+    Выбранные материалы добавляются одной транзакцией с общими количеством и потерями.
+    """
+
+    def __init__(self, form, app, product_id):
+        super().__init__(form)
+        self.form = form
+        self.app = app
+        self.product_id = product_id
+        self.title("Добавить материалы")
+        self.geometry("450x450")
+        self.transient(form)
+        self.configure(background=self.app.primary_bg)
+        # Идентификаторы строк списка и признак, что прочитаны все материалы
+        self.material_ids = []
+        self.complete = False
+        self.page_pending = False
+        self.after_id = None
+
+        search_frame = ttk.Frame(self, style="TFrame")
+        search_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+        ttk.Label(search_frame, text="Начало наименования:", style="TLabel").pack(side=tk.LEFT)
+        self.search = tk.StringVar()
+        entry = ttk.Entry(search_frame, textvariable=self.search, style="TEntry")
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.search.trace_add("write", lambda *args: self.schedule_search())
+
+        values_frame = ttk.Frame(self, style="TFrame")
+        values_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(5, 10))
+        ttk.Label(values_frame, text="Количество:", style="TLabel").pack(side=tk.LEFT)
+        self.quantity_entry = ttk.Entry(values_frame, width=8, style="TEntry")
+        self.quantity_entry.pack(side=tk.LEFT, padx=5)
+        self.quantity_entry.insert(0, "1.0")
+        ttk.Label(values_frame, text="Потери (%):", style="TLabel").pack(side=tk.LEFT)
+        self.loss_entry = ttk.Entry(values_frame, width=8, style="TEntry")
+        self.loss_entry.pack(side=tk.LEFT, padx=5)
+        self.loss_entry.insert(0, "0.0")
+        ttk.Button(values_frame, text="Добавить", command=self.add_selected, style="TButton").pack(side=tk.RIGHT)
+
+        self.selected_label = ttk.Label(self, style="TLabel")
+        self.selected_label.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+
+        list_frame = ttk.Frame(self, style="TFrame")
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.listbox = tk.Listbox(list_frame, selectmode=tk.EXTENDED, font=self.app.normal_font,
+                                  exportselection=False)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=lambda first, last: self.on_scroll(scrollbar, first, last))
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<<ListboxSelect>>", lambda event: self.show_selected())
+        self.listbox.bind("<Double-1>", lambda event: self.add_selected())
+
+        self.load_page(reset=True)
+        entry.focus_set()
+
+    def schedule_search(self):
+        """Список перечитывается после паузы во вводе, как фильтры таблиц вкладок"""
+        if self.after_id is not None:
+            self.after_cancel(self.after_id)
+        self.after_id = self.after(FILTER_DEBOUNCE_MS, lambda: self.load_page(reset=True))
+
+    def load_page(self, reset=False):
+        self.after_id = None
+        self.page_pending = False
+        if reset:
+            self.listbox.delete(0, tk.END)
+            self.material_ids = []
+            self.complete = False
+            self.show_selected()
+        rows = self.app.repository.available_materials(self.product_id, self.search.get().strip(),
+                                                       len(self.material_ids), PICKER_PAGE_SIZE)
+        self.complete = len(rows) < PICKER_PAGE_SIZE
+        for material_id, name in rows:
+            self.material_ids.append(material_id)
+            self.listbox.insert(tk.END, name)
+
+    def on_scroll(self, scrollbar, first, last):
+        scrollbar.set(first, last)
+        # Конец списка виден: дочитывается следующая страница
+        if float(last) >= 1.0 and not self.complete and self.material_ids and not self.page_pending:
+            self.page_pending = True
+            self.after_idle(self.load_page)
+
+    def show_selected(self):
+        count = len(self.listbox.curselection())
+        self.selected_label.config(text=f"Выбрано материалов: {count}" if count else "")
+
+    def add_selected(self):
+        material_ids = [self.material_ids[index] for index in self.listbox.curselection()]
+        if not material_ids:
+            messagebox.showwarning("Выбор материала", "Выберите один или несколько материалов", parent=self)
+            return
+        if self.app.add_product_materials(self.product_id, material_ids,
+                                          self.quantity_entry.get(), self.loss_entry.get()):
+            self.destroy()
+            self.form.load_materials()
+
+
+class ProductsView(tk.Toplevel):
+    def __init__(self, parent, app, material_id):
+        super().__init__(parent)
+        self.app = app
+        self.material_id = material_id
+        self.title("Продукция, использующая материал")
+        self.geometry("800x400")
+
+        # Применение стилей
+        self.configure(background=self.app.primary_bg)
+
+        # Получаем название материала и сводную потребность
+        material_name, required, required_with_losses = self.app.repository.material_demand(material_id)
+
+        title_frame = ttk.Frame(self, style="Secondary.TFrame")
+        title_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        ttk.Label(title_frame,
+                  text=f"Продукция, использующая материал: {material_name}",
+                  style="Title.TLabel").pack(pady=5)
+        ttk.Label(title_frame,
+                  text=f"Всего требуется: {required} (с учетом потерь и коэффициентов: {required_with_losses})",
+                  style="TLabel").pack(pady=(0, 5))
+
+        # Таблица продукции читается окнами из обратного индекса (Repository.usage()), поэтому
+        # материал в составе десятков тысяч изделий открывается так же быстро, как редкий.
+        # Скрытый столбец ID - ключ продукции, по нему создаются элементы таблицы
+        columns = ("ID", "Продукт", "Требуемое количество")
+        self.products_grid = PagedGrid(self, columns, self.fetch_products, self.count_products,
+                                       displaycolumns=columns[1:])
+        self.tree = self.products_grid.tree
+
+        self.tree.column("Продукт", width=400)
+        self.tree.column("Требуемое количество", width=200, anchor=tk.E)
+
+        # Загрузка данных
+        self.load_products()
+
+    def fetch_products(self, offset, limit, sort):
+        rows = self.app.repository.products_using_material(self.material_id, offset, limit)
+        return [(product_id, name, f"{quantity} {unit}") for product_id, name, quantity, unit in rows]
+
+    def count_products(self):
+        return self.app.repository.count_products_using_material(self.material_id)
+
+    def load_products(self):
+        self.products_grid.reload()
+
+
+def material_tags(row):
+    """Теги строки таблицы материалов по флагам нехватки (последний столбец fetch_materials)"""
+    alert = row[-1]
+    if alert & ALERT_BELOW_DEMAND:
+        return ("below_demand",)
+    if alert & ALERT_BELOW_MINIMUM:
+        return ("below_minimum",)
+    return ()
+
+
+def load_logo():
+    """Логотип для заголовка окна (tk.PhotoImage) или None, если файла логотипа нет"""
+    if not os.path.exists(LOGO_CACHE):
+        if not os.path.exists(LOGO_SOURCE):
+            return None
+        from PIL import Image
+
+        with Image.open(LOGO_SOURCE) as img:
+            img.resize((LOGO_SIZE, LOGO_SIZE), Image.LANCZOS).save(LOGO_CACHE)
+    return tk.PhotoImage(file=LOGO_CACHE)
+
+
+def main():
+    root = tk.Tk()
+    app = MaterialApp(root)
+    root.mainloop()
+    app.repository.close()
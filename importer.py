@@ -0,0 +1,561 @@
+# Пакетный импорт данных из Excel и CSV
+#
+# Внешние ключи разрешаются слиянием (merge) таблицы с картами id, отклоненные строки
+# собираются вместе и попадают в лог одной сводкой, запись идет через executemany
+# пачками по batch_size строк в одной транзакции.
+#
+# Источником может быть весь лист (DataFrame) или итератор частей листа из iter_sheet:
+# тогда каждая часть записывается сразу после чтения и память не зависит от размера файла.
+#
+# Несколько этапов (полный импорт) объединяются в одну транзакцию через Importer.transaction().
+#
+# Режим замены (по умолчанию) очищает таблицу и записывает ее заново. Режим обновления
+# (upsert=True) сопоставляет строки по естественному ключу (наименование, пара продукция-материал)
+# через INSERT ... ON CONFLICT DO UPDATE: неизмененные строки не перезаписываются, id сохраняются,
+# а строки, которых нет в файле, удаляются.
+import itertools
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from repository import NATURAL_KEY_INDEXES, LOOKUP_TABLES, LOOKUP_QUERIES, create_natural_key_index
+
+# Размер пачки для executemany. От 1000 строк и выше скорость записи почти не меняется
+# (см. benchmarks/bench_import.py), а пачка ограничивает память под кортежи строк
+BATCH_SIZE = 10_000
+
+# Размер части файла при потоковом чтении
+CHUNK_SIZE = 50_000
+
+# Запрос карты id справочника -> таблица справочника в LookupCache
+LOOKUP_TABLE_BY_QUERY = {query: table for table, query in LOOKUP_QUERIES.items()}
+
+# Настройки соединения на время импорта, после импорта возвращаются прежние значения.
+# synchronous меняется только вне транзакции, поэтому ставится до BEGIN.
+BULK_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'cache_size': -200_000,  # в КиБ, около 200 МБ
+    # Ключи строк файла в режиме обновления (temp.import_keys) растут с размером файла: во временном
+    # файле, а не в памяти (профиль соединения держит временные таблицы в памяти), память импорта
+    # ограничена кэшем страниц временной базы
+    'temp_store': 'FILE',
+}
+
+# Колонки файлов импорта: заголовок в Excel -> имя поля
+MATERIAL_TYPE_COLUMNS = {
+    'Тип материала': 'name',
+}
+PRODUCT_TYPE_COLUMNS = {
+    'Тип продукции': 'name',
+    'Коэффициент типа продукции': 'coefficient',
+}
+MATERIAL_COLUMNS = {
+    'Наименование материала': 'name',
+    'Тип материала': 'material_type',
+    'Цена единицы материала': 'unit_price',
+    'Количество на складе': 'stock_quantity',
+    'Минимальное количество': 'min_quantity',
+    'Количество в упаковке': 'package_quantity',
+    'Единица измерения': 'unit',
+}
+PRODUCT_COLUMNS = {
+    'Тип продукции': 'product_type',
+    'Наименование продукции': 'name',
+}
+PRODUCT_MATERIAL_COLUMNS = {
+    'Наименование материала': 'material',
+    'Продукция': 'product',
+    'Необходимое количество материала': 'required_quantity',
+}
+
+# Сколько примеров отклоненных строк показывать в сводке
+REJECTED_EXAMPLES = 5
+# Сколько отклоненных строк хранить в ImportResult.rejected, остальные только считаются
+REJECTED_KEEP = 10_000
+
+DUPLICATE_LINK = "Повторная связь продукции и материала"
+
+# Этапы импорта: ключ -> (что импортируется, заголовок диалога выбора файла, метод Importer, сообщение об успехе)
+IMPORT_STAGES = {
+    'material_types': ("типов материалов", "Выберите файл импорта типов материалов",
+                       'import_material_types', "Типы материалов успешно импортированы"),
+    'product_types': ("типов продукции", "Выберите файл импорта типов продукции",
+                      'import_product_types', "Типы продукции успешно импортированы"),
+    'materials': ("материалов", "Выберите файл импорта материалов",
+                  'import_materials', "Материалы успешно импортированы"),
+    'products': ("продукции", "Выберите файл импорта продукции",
+                 'import_products', "Продукция успешно импортирована"),
+    'product_materials': ("связей материалов и продукции", "Выберите файл импорта связей",
+                          'import_product_materials', "Связи материалов и продукции успешно импортированы"),
+}
+# Порядок этапов полного импорта
+FULL_IMPORT_ORDER = ['material_types', 'product_types', 'materials', 'products', 'product_materials']
+
+
+def read_sheet(file_path):
+    """Первый лист Excel или CSV-файл целиком"""
+    if file_path.lower().endswith('.csv'):
+        return pd.read_csv(file_path)
+    return pd.read_excel(file_path)
+
+
+def sheet_size(file_path):
+    """Примерное число строк данных в файле без чтения его целиком, None если неизвестно.
+
+    Для Excel берется размер листа из книги, для CSV считаются переводы строк.
+    """
+    if file_path.lower().endswith('.csv'):
+        lines = 0
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                lines += block.count(b'\n')
+        return max(lines - 1, 0)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+        return max_row - 1 if max_row else None
+    finally:
+        workbook.close()
+
+
+def iter_sheet(file_path, chunk_size=CHUNK_SIZE):
+    """Первый лист Excel или CSV-файл частями по chunk_size строк.
+
+    Excel читается через openpyxl в режиме read_only, строки не загружаются в память целиком.
+    Индекс частей сквозной, как у read_sheet, чтобы номера строк в сводках совпадали.
+    """
+    if file_path.lower().endswith('.csv'):
+        yield from pd.read_csv(file_path, chunksize=chunk_size)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        start = 0
+        while True:
+            block = list(itertools.islice(rows, chunk_size))
+            if not block:
+                break
+            chunk = pd.DataFrame(block, columns=header, index=pd.RangeIndex(start, start + len(block)))
+            start += len(block)
+            # Пустые строки в конце листа read_excel тоже пропускает
+            yield chunk.dropna(how='all')
+    finally:
+        workbook.close()
+
+
+class ImportResult:
+    """Итог импорта одной таблицы"""
+
+    def __init__(self, table):
+        self.table = table
+        self.processed = 0
+        # Строк, записанных в БД (в режиме обновления - добавленных и измененных)
+        self.written = 0
+        self.inserted = 0
+        # Только для режима обновления
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        # Причина -> количество отклоненных строк
+        self.rejected_counts = {}
+        # Первые REJECTED_KEEP отклоненных строк: поля, номер строки в файле (source_row) и причина (reason)
+        self.rejected = pd.DataFrame()
+
+    @property
+    def rejected_total(self):
+        return sum(self.rejected_counts.values())
+
+    def reject(self, rows, reason):
+        if not len(rows):
+            return
+        self.rejected_counts[reason] = self.rejected_counts.get(reason, 0) + len(rows)
+        room = REJECTED_KEEP - len(self.rejected)
+        if room > 0:
+            rows = rows.head(room).assign(reason=reason)
+            self.rejected = rows if self.rejected.empty else pd.concat([self.rejected, rows])
+
+    def reject_count(self, reason, count):
+        """Учитывает отклоненные строки, которые известны только количеством (конфликт в БД)"""
+        if count:
+            self.rejected_counts[reason] = self.rejected_counts.get(reason, 0) + count
+
+
+class ImportCancelled(Exception):
+    """Импорт отменен пользователем, транзакция откатана"""
+
+
+class Importer:
+    def __init__(self, conn, log=print, batch_size=BATCH_SIZE, progress=None, cancel_event=None, upsert=False,
+                 lookups=None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.log = log
+        self.batch_size = batch_size
+        # Режим обновления по естественному ключу вместо очистки и записи заново
+        self.upsert = upsert
+        # progress(обработано строк, всего строк или None) вызывается после каждой пачки
+        self.progress = progress
+        # threading.Event: если установлен, импорт прерывается перед следующей пачкой
+        self.cancel_event = cancel_event
+        # Карты наименование -> id, прочитанные за время текущего импорта
+        self._id_maps = {}
+        # Общий кэш справочников окна (repository.LookupCache): карты справочников берутся из него,
+        # пока импорт не изменил таблицу, а после транзакции, изменившей справочник, кэш сбрасывается
+        self.lookups = lookups
+        self._changed_lookups = set()
+        self._in_transaction = False
+
+    @contextmanager
+    def transaction(self):
+        """Общая транзакция для нескольких этапов импорта.
+
+        Каждый этап внутри выполняется в своей точке сохранения (SAVEPOINT), но фиксируется
+        только все вместе: при ошибке или отмене откатываются все этапы и в БД остаются
+        прежние данные. На время транзакции действуют BULK_LOAD_PRAGMAS и отложенная
+        проверка внешних ключей.
+        """
+        previous = {}
+        for pragma, value in BULK_LOAD_PRAGMAS.items():
+            self.cursor.execute(f"PRAGMA {pragma}")
+            previous[pragma] = self.cursor.fetchone()[0]
+            self.cursor.execute(f"PRAGMA {pragma} = {value}")
+
+        try:
+            self.cursor.execute("BEGIN")
+            # Ссылки проверяются при COMMIT, после этого настройка сбрасывается сама
+            self.cursor.execute("PRAGMA defer_foreign_keys = ON")
+            self._in_transaction = True
+            try:
+                yield self
+                try:
+                    self.conn.commit()
+                except sqlite3.IntegrityError as e:
+                    # Внешние ключи включены профилем соединения и проверяются здесь
+                    raise ValueError("после импорта остаются ссылки на удаленные записи "
+                                     "(например, материалы с удаленным типом); импортируйте "
+                                     "связанные файлы вместе, полным импортом") from e
+            except BaseException:
+                self.conn.rollback()
+                raise
+        finally:
+            self._in_transaction = False
+            if self._changed_lookups and self.lookups is not None:
+                self.lookups.invalidate()
+            self._changed_lookups = set()
+            for pragma, value in previous.items():
+                self.cursor.execute(f"PRAGMA {pragma} = {value}")
+
+    def import_material_types(self, source, total=None):
+        """Импорт типов материалов"""
+        result = ImportResult('material_types')
+        self._changed_lookups.add('material_types')
+        self._load(result, source, self._material_type_rows, ['name'],
+                   "INSERT INTO material_types (name) VALUES (?)",
+                   """INSERT INTO material_types (name) VALUES (?)
+                      ON CONFLICT (name) DO NOTHING""",
+                   ['name'], total)
+        return result
+
+    def import_product_types(self, source, total=None):
+        """Импорт типов продукции"""
+        result = ImportResult('product_types')
+        self._changed_lookups.add('product_types')
+        self._load(result, source, self._product_type_rows, ['name', 'coefficient'],
+                   "INSERT INTO product_types (name, coefficient) VALUES (?, ?)",
+                   """INSERT INTO product_types (name, coefficient) VALUES (?, ?)
+                      ON CONFLICT (name) DO UPDATE
+                          SET coefficient = excluded.coefficient
+                          WHERE coefficient IS NOT excluded.coefficient""",
+                   ['name'], total)
+        return result
+
+    def import_materials(self, source, total=None):
+        """Импорт материалов. Неизвестные единицы измерения создаются, неизвестный тип - ошибка"""
+        result = ImportResult('materials')
+        self._load(result, source, self._material_rows,
+                   ['name', 'material_type_id', 'unit_id', 'unit_price',
+                    'stock_quantity', 'min_quantity', 'package_quantity'],
+                   """INSERT INTO materials (name, material_type_id, unit_id, unit_price,
+                                             stock_quantity, min_quantity, package_quantity)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                   """INSERT INTO materials (name, material_type_id, unit_id, unit_price,
+                                             stock_quantity, min_quantity, package_quantity)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)
+                      ON CONFLICT (name) DO UPDATE
+                          SET material_type_id = excluded.material_type_id,
+                              unit_id          = excluded.unit_id,
+                              unit_price       = excluded.unit_price,
+                              stock_quantity   = excluded.stock_quantity,
+                              min_quantity     = excluded.min_quantity,
+                              package_quantity = excluded.package_quantity
+                          WHERE (material_type_id, unit_id, unit_price,
+                                 stock_quantity, min_quantity, package_quantity)
+                                    IS NOT (excluded.material_type_id, excluded.unit_id, excluded.unit_price,
+                                            excluded.stock_quantity, excluded.min_quantity,
+                                            excluded.package_quantity)""",
+                   ['name'], total)
+        return result
+
+    def import_products(self, source, total=None):
+        """Импорт продукции. Неизвестный тип продукции - ошибка"""
+        result = ImportResult('products')
+        # Описания в файле нет: новая продукция получает пустое, у существующей оно сохраняется
+        self._load(result, source, self._product_rows, ['name', 'product_type_id'],
+                   "INSERT INTO products (name, description, product_type_id) VALUES (?, '', ?)",
+                   """INSERT INTO products (name, description, product_type_id) VALUES (?, '', ?)
+                      ON CONFLICT (name) DO UPDATE
+                          SET product_type_id = excluded.product_type_id
+                          WHERE product_type_id IS NOT excluded.product_type_id""",
+                   ['name'], total)
+        return result
+
+    def import_product_materials(self, source, total=None):
+        """Импорт связей. Строки с неизвестными материалом или продукцией и повторные связи пропускаются"""
+        result = ImportResult('product_materials')
+        # Повторы внутри части отсекает _product_material_rows, между частями - ON CONFLICT.
+        # Потерь в файле нет: новые связи получают 0, у существующих потери сохраняются
+        self._load(result, source, self._product_material_rows,
+                   ['product_id', 'material_id', 'required_quantity'],
+                   """INSERT INTO product_materials (product_id, material_id,
+                                                     required_quantity, loss_percentage)
+                      VALUES (?, ?, ?, 0)
+                      ON CONFLICT (product_id, material_id) DO NOTHING""",
+                   """INSERT INTO product_materials (product_id, material_id,
+                                                     required_quantity, loss_percentage)
+                      VALUES (?, ?, ?, 0)
+                      ON CONFLICT (product_id, material_id) DO UPDATE
+                          SET required_quantity = excluded.required_quantity
+                          WHERE required_quantity IS NOT excluded.required_quantity""",
+                   ['product_id', 'material_id'], total,
+                   conflict_reason=DUPLICATE_LINK)
+        return result
+
+    def _material_type_rows(self, chunk, result):
+        return self._prepare(chunk, MATERIAL_TYPE_COLUMNS, result)
+
+    def _product_type_rows(self, chunk, result):
+        return self._prepare(chunk, PRODUCT_TYPE_COLUMNS, result)
+
+    def _material_rows(self, chunk, result):
+        frame = self._prepare(chunk, MATERIAL_COLUMNS, result)
+        frame = self._resolve(frame, result, 'material_type', LOOKUP_QUERIES['material_types'],
+                              "Тип материала не найден", fatal=True)
+        self._create_missing_units(frame['unit'])
+        return self._resolve(frame, result, 'unit', LOOKUP_QUERIES['units'],
+                             "Единица измерения не найдена")
+
+    def _product_rows(self, chunk, result):
+        frame = self._prepare(chunk, PRODUCT_COLUMNS, result)
+        return self._resolve(frame, result, 'product_type', LOOKUP_QUERIES['product_types'],
+                             "Тип продукции не найден", fatal=True)
+
+    def _product_material_rows(self, chunk, result):
+        frame = self._prepare(chunk, PRODUCT_MATERIAL_COLUMNS, result)
+        frame = self._resolve(frame, result, 'material', "SELECT material_id, name FROM materials",
+                              "Материал не найден")
+        frame = self._resolve(frame, result, 'product', "SELECT product_id, name FROM products",
+                              "Продукция не найдена")
+
+        duplicated = frame.duplicated(['product_id', 'material_id'])
+        result.reject(frame[duplicated], DUPLICATE_LINK)
+        return frame[~duplicated]
+
+    def _prepare(self, df, columns, result):
+        """Оставляет колонки columns под именами полей и отклоняет строки с пустыми полями"""
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise ValueError(f"В файле нет колонок: {', '.join(missing)}")
+
+        frame = df[list(columns)].rename(columns=columns)
+        # Номер строки в Excel: индекс с нуля плюс строка заголовка
+        frame['source_row'] = df.index + 2
+
+        incomplete = frame.isna().any(axis=1)
+        result.reject(frame[incomplete], "Не заполнены обязательные поля")
+        return frame[~incomplete]
+
+    def _id_map(self, sql):
+        if sql not in self._id_maps:
+            id_map = self._lookup_map(sql)
+            if id_map is None:
+                id_map = pd.read_sql_query(sql, self.conn)
+            # Как и словарь {name: id}, при повторе наименования берется последняя запись
+            self._id_maps[sql] = id_map.drop_duplicates(id_map.columns[1], keep='last')
+        return self._id_maps[sql]
+
+    def _lookup_map(self, sql):
+        """Карта справочника из общего кэша или None, если кэша нет или импорт уже менял таблицу"""
+        table = LOOKUP_TABLE_BY_QUERY.get(sql)
+        if self.lookups is None or table is None or table in self._changed_lookups:
+            return None
+        id_column, name_column = LOOKUP_TABLES[table]
+        ids = self.lookups.get(table).ids
+        return pd.DataFrame({id_column: list(ids.values()), name_column: list(ids.keys())})
+
+    def _resolve(self, frame, result, field, sql, reason, fatal=False):
+        """Добавляет к frame колонку id для наименований из field через merge с картой из БД.
+
+        Колонка id получает имя первого столбца запроса (например, material_type_id).
+        При fatal=True ненайденное наименование прерывает импорт, иначе строка отклоняется.
+        """
+        id_map = self._id_map(sql)
+        id_column, name_column = id_map.columns
+
+        merged = frame.merge(id_map.rename(columns={name_column: field}), how='left', on=field)
+        merged.index = frame.index
+
+        unresolved = merged[id_column].isna()
+        if fatal and unresolved.any():
+            names = merged.loc[unresolved, field].unique()[:REJECTED_EXAMPLES]
+            raise ValueError(f"{reason}: {', '.join(map(str, names))}")
+        result.reject(frame[unresolved], reason)
+
+        resolved = merged[~unresolved].copy()
+        resolved[id_column] = resolved[id_column].astype('int64')
+        return resolved
+
+    def _create_missing_units(self, units):
+        """Добавляет единицы измерения, которых еще нет в БД (наименование = сокращение)"""
+        sql = LOOKUP_QUERIES['units']
+        missing = pd.Index(units.unique()).difference(pd.Index(self._id_map(sql)['abbreviation'])).tolist()
+        if missing:
+            self.cursor.executemany("INSERT INTO units (name, abbreviation) VALUES (?, ?)",
+                                    [(abbr, abbr) for abbr in missing])
+            self._changed_lookups.add('units')
+            self._id_maps.pop(sql)
+            self.log(f"Добавлены новые единицы измерения: {', '.join(map(str, missing))}")
+
+    def _load(self, result, source, transform, fields, insert_sql, upsert_sql, key, total=None,
+              conflict_reason=None):
+        """Записывает источник по частям в точке сохранения этапа.
+
+        transform(часть, result) превращает часть листа в строки с полями fields.
+        В режиме замены таблица очищается и строки пишутся через insert_sql (конфликты по UNIQUE
+        считаются отклоненными строками с причиной conflict_reason). В режиме обновления строки
+        пишутся через upsert_sql, а строки таблицы, ключа key которых нет в файле, удаляются.
+        total - ожидаемое число строк источника для progress, для DataFrame берется его длина.
+        Вне transaction() этап выполняется в собственной транзакции.
+        """
+        if not self._in_transaction:
+            with self.transaction():
+                return self._load(result, source, transform, fields, insert_sql, upsert_sql, key, total,
+                                  conflict_reason)
+
+        streaming = not isinstance(source, pd.DataFrame)
+        chunks = source if streaming else [source]
+        if not streaming:
+            total = len(source)
+        self._id_maps = {}
+        table = result.table
+        key_index = [fields.index(field) for field in key]
+        key_columns = ', '.join(key)
+        attempted = 0
+
+        savepoint = f"import_{table}"
+        self.cursor.execute(f"SAVEPOINT {savepoint}")
+        try:
+            if self.upsert:
+                self._ensure_natural_key(table)
+                self.cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                count_before = self.cursor.fetchone()[0]
+                # Ключи строк файла, по ним в конце удаляются отсутствующие в файле строки
+                self.cursor.execute("DROP TABLE IF EXISTS temp.import_keys")
+                # Типы колонок берутся из таблицы, иначе поиск по ключу не сможет использовать индекс
+                self.cursor.execute(f"CREATE TEMP TABLE import_keys AS SELECT {key_columns} FROM {table} WHERE 0")
+                self.cursor.execute(f"CREATE UNIQUE INDEX temp.import_keys_key ON import_keys ({key_columns})")
+            else:
+                self.cursor.execute(f"DELETE FROM {table}")
+
+            for chunk in chunks:
+                self._check_cancelled()
+                frame = transform(chunk, result)
+                written = 0
+                for batch in self._batches(frame, fields):
+                    self._check_cancelled()
+                    self.cursor.executemany(upsert_sql if self.upsert else insert_sql, batch)
+                    result.written += self.cursor.rowcount
+                    if self.upsert:
+                        self.cursor.executemany(
+                            f"INSERT OR IGNORE INTO temp.import_keys VALUES ({', '.join('?' * len(key))})",
+                            [tuple(row[i] for i in key_index) for row in batch]
+                        )
+                    elif conflict_reason:
+                        result.reject_count(conflict_reason, len(batch) - self.cursor.rowcount)
+                    attempted += len(batch)
+                    written += len(batch)
+                    if self.progress:
+                        self.progress(result.processed + len(chunk) * written // len(frame), total)
+                result.processed += len(chunk)
+                if self.progress:
+                    self.progress(result.processed, total)
+                if streaming:
+                    self.log(f"Обработано строк: {result.processed}, записано: {result.written}")
+
+            if self.upsert:
+                self.cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                result.inserted = self.cursor.fetchone()[0] - count_before
+                result.updated = result.written - result.inserted
+                result.unchanged = attempted - result.written
+                # NOT EXISTS, а не NOT IN: составной NOT IN по колонкам без NOT NULL проверяет всю таблицу
+                matches = ' AND '.join(f"k.{field} = {table}.{field}" for field in key)
+                self.cursor.execute(f"""DELETE FROM {table}
+                                        WHERE NOT EXISTS (SELECT 1 FROM temp.import_keys k WHERE {matches})""")
+                result.deleted = self.cursor.rowcount
+                self.cursor.execute("DROP TABLE temp.import_keys")
+            else:
+                result.inserted = result.written
+            self.cursor.execute(f"RELEASE {savepoint}")
+        except Exception:
+            self.cursor.execute(f"ROLLBACK TO {savepoint}")
+            self.cursor.execute(f"RELEASE {savepoint}")
+            raise
+        finally:
+            self._id_maps = {}
+
+        if self.upsert:
+            self.log(f"Добавлено: {result.inserted}, обновлено: {result.updated}, "
+                     f"без изменений: {result.unchanged}, удалено: {result.deleted}")
+        else:
+            self.log(f"Записано строк: {result.inserted}")
+        self.report_rejected(result)
+
+    def _ensure_natural_key(self, table):
+        """Режиму обновления нужен уникальный индекс по наименованию (у связей он есть в схеме)"""
+        if table in NATURAL_KEY_INDEXES and not create_natural_key_index(self.cursor, table):
+            raise ValueError(f"Режим обновления недоступен: в таблице {table} есть повторяющиеся наименования")
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ImportCancelled("Импорт отменен пользователем")
+
+    def _batches(self, frame, fields):
+        """Строки frame списками кортежей по batch_size штук, значения - обычные типы Python"""
+        for start in range(0, len(frame), self.batch_size):
+            chunk = frame.iloc[start:start + self.batch_size]
+            yield list(zip(*(chunk[field].tolist() for field in fields)))
+
+    def report_rejected(self, result):
+        """Одна сводка по отклоненным строкам: причина, количество и номера первых строк"""
+        if not result.rejected_counts:
+            return
+        self.log(f"Отклонено строк: {result.rejected_total}")
+        for reason, count in result.rejected_counts.items():
+            line = f"  {reason}: {count}"
+            if not result.rejected.empty:
+                rows = result.rejected.loc[result.rejected['reason'] == reason, 'source_row']
+                if len(rows):
+                    examples = ', '.join(map(str, rows.head(REJECTED_EXAMPLES).tolist()))
+                    more = ', ...' if count > REJECTED_EXAMPLES else ''
+                    line += f" (строки {examples}{more})"
+            self.log(line)
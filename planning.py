@@ -0,0 +1,98 @@
+# Планирование закупок (MRP) по плану производства
+#
+# План - {product_id: количество}. Валовая потребность материала - сумма по связям
+# количество * required_quantity * (1 + loss_percentage / 100) * коэффициент типа продукции.
+# Чистая потребность - то, чего не хватит, чтобы после выпуска на складе осталось min_quantity:
+# max(валовая + min_quantity - stock_quantity, 0). Закупка - чистая потребность, округленная вверх
+# до целого числа упаковок package_quantity.
+#
+# Расчет идет над матрицей состава продукции (bom.BomMatrix, кэш Repository.bom()): каждый план -
+# одно умножение матрицы на вектор и один запрос остатков материалов.
+import numpy as np
+import pandas as pd
+
+# Допуск округления: 2.0000000001 упаковки - это 2 упаковки, а не 3
+ROUNDING_TOLERANCE = 1e-9
+
+# Колонки результата requirements()
+PLAN_COLUMNS = {
+    'name': "Материал",
+    'unit': "Ед.изм",
+    'gross': "Потребность",
+    'stock_quantity': "На складе",
+    'min_quantity': "Минимальное количество",
+    'net': "Не хватает",
+    'package_quantity': "В упаковке",
+    'purchase': "Закупить",
+    'purchase_cost': "Стоимость закупки",
+}
+
+
+class MrpEngine:
+    """Расчет потребности и закупок по плану производства.
+
+    load() читает остатки материалов и берет матрицу состава из Repository. Каждый расчет вызывает
+    его заново: остатки, упаковки и цены читаются одним запросом, а матрицу Repository поправляет сам
+    при изменении связей. Поэтому расчет не устаревает, даже если объект хранится между правками.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def load(self):
+        self.bom = self.repository.bom()
+        self.materials = pd.DataFrame(
+            self.repository.material_stock(),
+            columns=['material_id', 'name', 'unit', 'stock_quantity', 'min_quantity', 'package_quantity',
+                     'unit_price']
+        ).set_index('material_id')
+
+    def _by_column(self, values):
+        """Колонка materials в порядке столбцов матрицы (материалов без строки в materials - 0)"""
+        return values.reindex(self.bom.material_ids, fill_value=0).to_numpy(dtype=np.float64)
+
+    def gross_requirements(self, plan):
+        """Валовая потребность по плану {product_id: количество}: Series, индекс - material_id.
+
+        Продукция без связей или отсутствующая в базе ничего не добавляет.
+        """
+        self.load()
+        return self._gross(plan)
+
+    def _gross(self, plan):
+        if any(quantity < 0 for quantity in plan.values()):
+            raise ValueError("Количество продукции в плане не может быть отрицательным")
+        gross = pd.Series(self.bom.demand(plan), index=self.bom.material_ids)
+        return gross.reindex(self.materials.index, fill_value=0.0)
+
+    def blocked_products(self, plan):
+        """product_id продукции плана, для которой не хватит остатка хотя бы одного материала"""
+        self.load()
+        return self.bom.blocked_products(plan, self._by_column(self.materials['stock_quantity']))
+
+    def product_costs(self):
+        """Стоимость материалов единицы продукции: Series, индекс - product_id"""
+        self.load()
+        return pd.Series(self.bom.product_costs(self._by_column(self.materials['unit_price'])),
+                         index=self.bom.product_ids)
+
+    def requirements(self, plan, all_materials=False):
+        """Потребность и закупки по плану: DataFrame с колонками PLAN_COLUMNS, индекс - material_id.
+
+        По умолчанию только материалы с потребностью или закупкой; all_materials - все материалы.
+        """
+        self.load()
+        gross = self._gross(plan)
+        result = self.materials.copy()
+        result['gross'] = gross
+        result['net'] = (result['gross'] + result['min_quantity'] - result['stock_quantity']).clip(lower=0)
+
+        packages = result['package_quantity']
+        whole = np.ceil(result['net'] / packages.where(packages > 0, 1) - ROUNDING_TOLERANCE) * packages
+        # Без упаковки (package_quantity <= 0) закупается ровно недостающее количество
+        result['purchase'] = np.where(result['net'] > 0, np.where(packages > 0, whole, result['net']), 0.0)
+        result['purchase_cost'] = result['purchase'] * result['unit_price']
+
+        if not all_materials:
+            result = result[(result['gross'] > 0) | (result['purchase'] > 0)]
+        return result[list(PLAN_COLUMNS)]
@@ -0,0 +1,1815 @@
+# Доступ к данным: пул соединений и методы с SQL для окна приложения, импорта и отчетов
+#
+# Классы окна не выполняют SQL сами и не делят один курсор: они вызывают методы Repository.
+# Каждый метод берет соединение из ConnectionPool на время вызова, поэтому вложенный запрос
+# или фоновый поток не сбрасывает результат чужого курсора. Соединения открываются с кэшем
+# подготовленных выражений (cached_statements), а SQL методов - постоянные строки
+# (сортировки - конечный набор вариантов), поэтому повторный вызов не компилирует запрос заново.
+import json
+import queue
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from database import DB_PATH, connect, ru_key, ru_key_sql, ru_prefix_range
+
+# Соединений в пуле: окно, фоновый импорт и отчеты работают одновременно
+POOL_SIZE = 4
+
+# Подготовленных выражений в кэше каждого соединения
+STATEMENT_CACHE_SIZE = 256
+
+# Карточки для форм редактирования
+Material = namedtuple('Material', 'name material_type_id unit_id unit_price stock_quantity min_quantity '
+                                  'package_quantity')
+Product = namedtuple('Product', 'name product_type_id description')
+MaterialDemand = namedtuple('MaterialDemand', 'name required_quantity required_with_losses')
+ProductCost = namedtuple('ProductCost', 'material_cost coefficient cost')
+
+# Справочники в памяти (LookupCache): {id: наименование} и {наименование: id}
+Lookup = namedtuple('Lookup', 'names ids')
+
+# Фильтры таблиц вкладок: search - запрос search_query(), *_id - значение справочника,
+# shortage - флаги нехватки (ALERT_*), материал подходит, если у него есть любой из них. None и 0 - без фильтра
+MaterialFilter = namedtuple('MaterialFilter', 'search material_type_id unit_id shortage',
+                            defaults=(None, None, None, 0))
+ProductFilter = namedtuple('ProductFilter', 'search product_type_id', defaults=(None, None))
+
+# Нехватка материала в таблице материалов (флаги, material_alerts)
+ALERT_BELOW_MINIMUM = 1  # остаток ниже минимального количества
+ALERT_BELOW_DEMAND = 2  # остаток ниже потребности с потерями по всем связям
+# Флаги нехватки строки material_alerts a и соединение, которое начинается со списка нехватки
+MATERIAL_ALERT = f"(a.below_minimum * {ALERT_BELOW_MINIMUM} + a.below_demand * {ALERT_BELOW_DEMAND})"
+MATERIAL_ALERTS_FIRST = "material_alerts a CROSS JOIN materials m ON m.material_id = a.material_id"
+
+# Справочники LookupCache: таблица -> (колонка id, колонка наименования). При повторе наименования
+# в ids остается последняя запись, как в картах id импорта
+LOOKUP_TABLES = {
+    'material_types': ('material_type_id', 'name'),
+    'units': ('unit_id', 'abbreviation'),
+    'product_types': ('product_type_id', 'name'),
+}
+LOOKUP_QUERIES = {table: f"SELECT {id_column}, {name_column} FROM {table}"
+                  for table, (id_column, name_column) in LOOKUP_TABLES.items()}
+
+# Уникальные индексы естественных ключей для режима обновления: таблица -> (индекс, колонка, простой индекс)
+NATURAL_KEY_INDEXES = {
+    'material_types': ('ux_material_types_name', 'name', 'idx_material_types_name'),
+    'product_types': ('ux_product_types_name', 'name', 'idx_product_types_name'),
+    'materials': ('ux_materials_name', 'name', 'idx_materials_name'),
+    'products': ('ux_products_name', 'name', 'idx_products_name'),
+}
+
+
+def create_natural_key_index(cursor, table):
+    """Создает уникальный индекс наименования таблицы вместо простого.
+
+    Возвращает False, если в таблице есть повторяющиеся наименования и индекс создать нельзя.
+    """
+    index, column, plain_index = NATURAL_KEY_INDEXES[table]
+    try:
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table} ({column})")
+    except sqlite3.IntegrityError:
+        return False
+    cursor.execute(f"DROP INDEX IF EXISTS {plain_index}")
+    return True
+
+
+def create_natural_key_indexes(cursor):
+    """Шаг миграции схемы: уникальные наименования там, где данные это позволяют"""
+    for table in NATURAL_KEY_INDEXES:
+        create_natural_key_index(cursor, table)
+
+
+# Ключи сортировки текстовых столбцов: (таблица, первичный ключ, колонка, колонка ключа ru_key).
+# Ключ записывают триггеры, у пустого значения (NULL) ключ - пустая строка, индекс по ключу - обычный (BINARY)
+NAME_KEYS = [
+    ('materials', 'material_id', 'name', 'name_key'),
+    ('products', 'product_id', 'name', 'name_key'),
+    ('products', 'product_id', 'description', 'description_key'),
+    ('material_types', 'material_type_id', 'name', 'name_key'),
+    ('product_types', 'product_type_id', 'name', 'name_key'),
+    ('units', 'unit_id', 'abbreviation', 'abbreviation_key'),
+]
+# Индексы по сопоставлению RU из прежнего шага 3: с ними базу не могли менять и проверять
+# клиенты SQLite, в которых нет этой функции Python
+RU_COLLATION_INDEXES = ['idx_materials_name_ru', 'idx_products_name_ru', 'idx_material_types_name_ru',
+                        'idx_product_types_name_ru', 'idx_units_abbreviation_ru']
+
+
+def create_name_keys(cursor):
+    """Шаг миграции схемы: колонки ключей NAME_KEYS, их триггеры и индексы вместо индексов COLLATE RU"""
+    for index in RU_COLLATION_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+    for table, id_column, column, key_column in NAME_KEYS:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {key_column} TEXT")
+        for step in ru_key_sql(f"COALESCE({column}, '')", key_column):
+            cursor.execute(f"UPDATE {table} SET {key_column} = {step}")
+        trigger_steps = "".join(f"""
+                               UPDATE {table} SET {key_column} = {step}
+                               WHERE {id_column} = NEW.{id_column};"""
+                                for step in ru_key_sql(f"COALESCE(NEW.{column}, '')", key_column))
+        for event in ("INSERT", f"UPDATE OF {column}"):
+            name = f"{table}_{key_column}_{event.split()[0].lower()}"
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS {name}
+                               AFTER {event} ON {table}
+                           BEGIN{trigger_steps}
+                           END""")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{key_column} ON {table} ({key_column})")
+
+
+# Массовое изменение материалов (adjust_materials): колонки и режимы -> новое значение колонки {column},
+# параметр - значение из формы. Результат округляется до сотых и не бывает меньше нуля
+MATERIAL_ADJUST_COLUMNS = ('unit_price', 'stock_quantity')
+MATERIAL_ADJUSTMENTS = {
+    'set': "?",
+    'add': "{column} + ?",
+    'percent': "{column} * (1 + ? / 100.0)",
+}
+
+# Сортировка таблиц вкладок в SQLite: заголовок столбца -> [(выражение ORDER BY, номер столбца выборки)].
+# Текст сортируется по колонкам ключей NAME_KEYS (без регистра, Ё как Е), числа - как числа. Последнее выражение -
+# первичный ключ: порядок строгий, поэтому окна не пропускают и не повторяют строки. Номер столбца -
+# где в строке окна лежит значение выражения: от строки окна чтение продолжается по ключу (seek())
+MATERIAL_SORT = {
+    "ID": [("m.material_id", 0)],
+    "Название": [("m.name_key", 1), ("m.material_id", 0)],
+    "Тип": [("mt.name_key", 2), ("m.material_id", 0)],
+    "Ед.изм": [("u.abbreviation_key", 3), ("m.material_id", 0)],
+    "Цена": [("m.unit_price", 4), ("m.material_id", 0)],
+    "На складе": [("m.stock_quantity", 5), ("m.material_id", 0)],
+    "Мин.кол-во": [("m.min_quantity", 6), ("m.material_id", 0)],
+    "Упаковка": [("m.package_quantity", 7), ("m.material_id", 0)],
+    "Требуется": [("ROUND(COALESCE(d.required_quantity, 0.0), 6)", 8), ("m.material_id", 0)],
+}
+PRODUCT_SORT = {
+    "ID": [("p.product_id", 0)],
+    "Название": [("p.name_key", 1), ("p.product_id", 0)],
+    "Тип": [("pt.name_key", 2), ("p.product_id", 0)],
+    "Коэффициент": [("pt.coefficient", 3), ("p.product_id", 0)],
+    "Стоимость": [("ROUND(COALESCE(c.material_cost, 0.0) * pt.coefficient, 2)", 4), ("p.product_id", 0)],
+    "Описание": [("p.description_key", 5), ("p.product_id", 0)],
+}
+LINK_SORT = {
+    "Продукция": [("p.name_key", 1), ("m.name_key", 2), ("pm.product_material_id", 0)],
+    "Материал": [("m.name_key", 2), ("p.name_key", 1), ("pm.product_material_id", 0)],
+    "Требуемое кол-во": [("pm.required_quantity", 3), ("pm.product_material_id", 0)],
+    "Потери (%)": [("pm.loss_percentage", 4), ("pm.product_material_id", 0)],
+}
+
+# Шаги миграции схемы: (версия, операторы). Номер выполненного шага хранится в PRAGMA user_version,
+# поэтому на существующей базе выполняются только новые шаги
+SCHEMA_MIGRATIONS = [
+    (1, [
+        # Поиск связей по материалу (ProductsView, триггеры потребности)
+        "CREATE INDEX IF NOT EXISTS idx_product_materials_material ON product_materials (material_id)",
+        # Поиск по наименованиям при импорте
+        "CREATE INDEX IF NOT EXISTS idx_materials_name ON materials (name)",
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)",
+        "CREATE INDEX IF NOT EXISTS idx_material_types_name ON material_types (name)",
+        "CREATE INDEX IF NOT EXISTS idx_product_types_name ON product_types (name)",
+        "CREATE INDEX IF NOT EXISTS idx_units_abbreviation ON units (abbreviation)",
+        # Внешние ключи справочников
+        "CREATE INDEX IF NOT EXISTS idx_materials_material_type ON materials (material_type_id)",
+        "CREATE INDEX IF NOT EXISTS idx_materials_unit ON materials (unit_id)",
+        "CREATE INDEX IF NOT EXISTS idx_products_product_type ON products (product_type_id)",
+        "ANALYZE",
+    ]),
+    # Уникальные наименования для режима обновления при импорте (вызываемый шаг получает курсор)
+    (2, [create_natural_key_indexes]),
+    # Сортировка таблиц вкладок по числовым столбцам материалов. Прежде этот шаг создавал и индексы
+    # наименований COLLATE RU, их заменяет шаг 4
+    (3, [
+        "CREATE INDEX IF NOT EXISTS idx_materials_unit_price ON materials (unit_price)",
+        "CREATE INDEX IF NOT EXISTS idx_materials_stock_quantity ON materials (stock_quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_materials_min_quantity ON materials (min_quantity)",
+        "CREATE INDEX IF NOT EXISTS idx_materials_package_quantity ON materials (package_quantity)",
+    ]),
+    # Сортировка текста по ключам ru_key вместо сопоставления RU
+    (4, [create_name_keys]),
+]
+
+
+def order_by(columns, sort, backward=False):
+    """ORDER BY для sort = (заголовок столбца, по убыванию) по словарю columns (MATERIAL_SORT и т.п.).
+    backward - обратный порядок, для чтения окна от конца таблицы или вверх от строки"""
+    column, reverse = sort
+    direction = "DESC" if reverse != backward else "ASC"
+    return "ORDER BY " + ", ".join(f"{expression} {direction}" for expression, _ in columns[column])
+
+
+def seek(columns, sort, row, backward=False):
+    """Условие WHERE и параметры: строки после строки окна row в порядке sort (перед ней при backward).
+
+    Ключ сортировки сравнивается значением строки (row value), поэтому чтение начинается сразу
+    с нужного места индекса, а не пропуском строк с начала, как OFFSET. Первое выражение ключа
+    сравнивается еще и отдельно: по нему SQLite ищет в индексе начало окна. Текст строки окна
+    переводится в ключ ru_key - с ним сравниваются колонки ключей.
+    """
+    column, reverse = sort
+    keys = columns[column]
+    operator = "<" if reverse != backward else ">"
+    values = [ru_key(row[position]) if isinstance(row[position], str) else row[position] for _, position in keys]
+    if len(keys) == 1:
+        return f"{keys[0][0]} {operator} ?", values
+    expressions = ", ".join(expression for expression, _ in keys)
+    return (f"{keys[0][0]} {operator}= ? AND ({expressions}) {operator} ({', '.join('?' * len(keys))})",
+            values[:1] + values)
+
+
+def window_rows(cursor, backward):
+    """Строки окна в порядке сортировки: окно, прочитанное в обратном порядке, разворачивается"""
+    rows = cursor.fetchall()
+    if backward:
+        rows.reverse()
+    return rows
+
+
+# Полнотекстовый поиск (create_search_index): токенизатор FTS5 не различает регистр кириллицы,
+# а "ё" и "е" уравниваются заменой в индексе и в запросе
+SEARCH_TOKENIZER = 'unicode61 remove_diacritics 2'
+
+
+def fold(expression):
+    """SQL-выражение: текст expression с "е" вместо "ё" для записи в индекс поиска"""
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def search_query(text, columns=None):
+    """Запрос FTS5 MATCH для строки поиска: каждое слово - префикс, все слова обязательны.
+
+    columns ограничивает поиск столбцами индекса. Пустая строка - None (без поиска).
+    """
+    words = re.findall(r"\w+", text.replace('ё', 'е').replace('Ё', 'Е'))
+    if not words:
+        return None
+    query = " ".join(f'"{word}"*' for word in words)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+# Условия поиска в окнах таблиц (параметр - запрос search_query()). Выборка начинается с найденных
+# rowid, поэтому при поиске окна таблиц соединяются от основной таблицы, а не от справочника.
+# Связи ищутся по продукции или материалу: OR двух подзапросов SQLite выполняет проходом по всем
+# связям, а объединение - двумя поисками по индексам внешних ключей
+MATERIAL_SEARCH = "m.material_id IN (SELECT rowid FROM materials_fts WHERE materials_fts MATCH ?)"
+PRODUCT_SEARCH = "p.product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)"
+LINK_SEARCH = """pm.product_material_id IN (
+    SELECT product_material_id
+    FROM product_materials
+    WHERE product_id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)
+    UNION ALL
+    SELECT product_material_id
+    FROM product_materials
+    WHERE material_id IN (SELECT rowid FROM materials_fts WHERE materials_fts MATCH ?))"""
+
+
+# Выгрузка таблиц в формате файлов импорта: этап импорта -> запрос.
+# Псевдонимы колонок - заголовки файлов импорта (importer.*_COLUMNS), поэтому выгруженный файл
+# загружается обратно без правок
+EXPORT_QUERIES = {
+    'material_types': """
+        SELECT name AS "Тип материала"
+        FROM material_types
+        ORDER BY material_type_id""",
+    'product_types': """
+        SELECT name AS "Тип продукции", coefficient AS "Коэффициент типа продукции"
+        FROM product_types
+        ORDER BY product_type_id""",
+    'materials': """
+        SELECT m.name AS "Наименование материала",
+               mt.name AS "Тип материала",
+               m.unit_price AS "Цена единицы материала",
+               m.stock_quantity AS "Количество на складе",
+               m.min_quantity AS "Минимальное количество",
+               m.package_quantity AS "Количество в упаковке",
+               u.abbreviation AS "Единица измерения"
+        FROM materials m
+                 JOIN material_types mt ON m.material_type_id = mt.material_type_id
+                 JOIN units u ON m.unit_id = u.unit_id
+        ORDER BY m.material_id""",
+    'products': """
+        SELECT pt.name AS "Тип продукции", p.name AS "Наименование продукции"
+        FROM products p
+                 JOIN product_types pt ON p.product_type_id = pt.product_type_id
+        ORDER BY p.product_id""",
+    'product_materials': """
+        SELECT m.name AS "Наименование материала",
+               p.name AS "Продукция",
+               pm.required_quantity AS "Необходимое количество материала"
+        FROM product_materials pm
+                 JOIN products p ON pm.product_id = p.product_id
+                 JOIN materials m ON pm.material_id = m.material_id
+        ORDER BY pm.product_material_id""",
+}
+
+# Отчет о потребности: все материалы по наименованию, нехватка - потребность с потерями сверх остатка
+DEMAND_REPORT_QUERY = """
+    SELECT m.name AS "Материал",
+           mt.name AS "Тип материала",
+           u.abbreviation AS "Ед.изм",
+           m.stock_quantity AS "На складе",
+           m.min_quantity AS "Минимальное количество",
+           ROUND(COALESCE(d.required_quantity, 0.0), 6) AS "Требуется",
+           ROUND(COALESCE(d.required_with_losses, 0.0), 6) AS "Требуется с потерями",
+           ROUND(MAX(COALESCE(d.required_with_losses, 0.0) - m.stock_quantity, 0.0), 6) AS "Не хватает"
+    FROM materials m
+             JOIN material_types mt ON m.material_type_id = mt.material_type_id
+             JOIN units u ON m.unit_id = u.unit_id
+             LEFT JOIN material_demand d ON d.material_id = m.material_id
+    WHERE ? = 0 OR COALESCE(d.required_with_losses, 0.0) > m.stock_quantity
+    ORDER BY m.name_key, m.material_id"""
+
+
+class ConnectionPool:
+    """Небольшой пул соединений с одной базой.
+
+    connection() выдает соединение на время блока with. Пока блок не завершен, соединение
+    закреплено за потоком: вложенный вызов в том же потоке получает то же соединение и видит
+    незафиксированные изменения внешнего. Если свободных соединений нет и создано уже size,
+    вызов ждет освобождения. profile - PRAGMA новых соединений (None - database.CONNECTION_PROFILE),
+    kwargs - для sqlite3.connect (например, factory).
+    """
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, profile=None, **kwargs):
+        self.path = path
+        self.size = size
+        self.profile = profile
+        self.kwargs = kwargs
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Соединение, изменения которого фиксируются в конце внешнего блока transaction()"""
+        with self.connection() as conn:
+            depth = getattr(self._local, 'depth', 0)
+            self._local.depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                if depth == 0:
+                    conn.rollback()
+                raise
+            else:
+                if depth == 0:
+                    conn.commit()
+            finally:
+                self._local.depth = depth
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._connections) < self.size:
+                # Соединение переходит между потоками, но в каждый момент принадлежит одному
+                conn = connect(self.path, self.profile, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE, **self.kwargs)
+                self._connections.append(conn)
+                return conn
+        return self._idle.get()
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
+
+
+class LookupCache:
+    """Справочники (LOOKUP_QUERIES) в памяти для форм, фильтров и импорта.
+
+    Справочник читается при первом обращении и хранится вместе с поколением, при котором прочитан.
+    invalidate() увеличивает поколение: следующее обращение к каждому справочнику читает его заново.
+    Его вызывает код, который меняет справочники (импорт - после завершения своей транзакции).
+    Возвращаемые словари общие и не должны изменяться.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.generation = 0
+        self._lookups = {}  # таблица -> (поколение, Lookup)
+
+    def get(self, table):
+        # Поколение запоминается до чтения: если справочник изменится во время чтения, копия устареет
+        generation = self.generation
+        cached = self._lookups.get(table)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        with self.pool.connection() as conn:
+            rows = conn.execute(LOOKUP_QUERIES[table]).fetchall()
+        lookup = Lookup(dict(rows), {name: key for key, name in rows})
+        self._lookups[table] = (generation, lookup)
+        return lookup
+
+    def invalidate(self):
+        self.generation += 1
+
+
+class Repository:
+    """Запросы приложения. Методы чтения возвращают кортежи строк для таблиц окна
+    или карточки (namedtuple), методы изменения фиксируют транзакцию сами."""
+
+    def __init__(self, pool=None):
+        self.pool = pool or ConnectionPool()
+        # Матрица состава продукции (bom.BomMatrix) и обратный индекс по материалам (bom.MaterialUsage):
+        # строятся при первом обращении к bom() и usage(), методы изменения связей поправляют их на месте
+        self._bom = None
+        self._usage = None
+        # Справочники для форм, фильтров и импорта
+        self.lookups = LookupCache(self.pool)
+
+    @contextmanager
+    def cursor(self):
+        with self.pool.connection() as conn:
+            yield conn.cursor()
+
+    @contextmanager
+    def transaction(self):
+        with self.pool.transaction() as conn:
+            yield conn.cursor()
+
+    def close(self):
+        self.pool.close()
+
+    # Схема
+
+    def create_schema(self):
+        """Создает недостающие таблицы, сводные таблицы триггеров и выполняет миграции схемы"""
+        with self.transaction() as cursor:
+            # Создаем тестовые таблицы только если они не существуют
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS material_types
+                           (
+                               material_type_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               name TEXT NOT NULL
+                           )""")
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS units
+                           (
+                               unit_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               name TEXT NOT NULL,
+                               abbreviation TEXT NOT NULL
+                           )""")
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS materials
+                           (
+                               material_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               name TEXT NOT NULL,
+                               material_type_id INTEGER NOT NULL,
+                               unit_id INTEGER NOT NULL,
+                               unit_price REAL NOT NULL CHECK (unit_price >= 0),
+                               stock_quantity REAL NOT NULL,
+                               min_quantity REAL NOT NULL CHECK (min_quantity >= 0),
+                               package_quantity INTEGER NOT NULL,
+                               FOREIGN KEY (material_type_id) REFERENCES material_types (material_type_id),
+                               FOREIGN KEY (unit_id) REFERENCES units (unit_id)
+                           )""")
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS product_types
+                           (
+                               product_type_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               name TEXT NOT NULL,
+                               coefficient REAL NOT NULL
+                           )""")
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS products
+                           (
+                               product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               name TEXT NOT NULL,
+                               description TEXT,
+                               product_type_id INTEGER NOT NULL,
+                               FOREIGN KEY (product_type_id) REFERENCES product_types (product_type_id)
+                           )""")
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS product_materials
+                           (
+                               product_material_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               product_id INTEGER NOT NULL,
+                               material_id INTEGER NOT NULL,
+                               required_quantity REAL NOT NULL,
+                               loss_percentage REAL NOT NULL,
+                               FOREIGN KEY (product_id) REFERENCES products (product_id) ON DELETE CASCADE,
+                               FOREIGN KEY (material_id) REFERENCES materials (material_id) ON DELETE CASCADE,
+                               UNIQUE (product_id, material_id)
+                           )""")
+
+            self.create_material_demand()
+            self.create_product_cost()
+            self.create_material_alerts()
+            self.create_search_index()
+            self.migrate_schema()
+
+    def migrate_schema(self):
+        """Выполняет шаги SCHEMA_MIGRATIONS, которых еще не было в этой базе"""
+        with self.transaction() as cursor:
+            cursor.execute("PRAGMA user_version")
+            version = cursor.fetchone()[0]
+
+            for target_version, statements in SCHEMA_MIGRATIONS:
+                if target_version <= version:
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(cursor)
+                    else:
+                        cursor.execute(statement)
+                # PRAGMA не принимает параметры, версия - целое число из SCHEMA_MIGRATIONS
+                cursor.execute(f"PRAGMA user_version = {int(target_version)}")
+                version = target_version
+
+    def create_material_demand(self):
+        """Сводная таблица потребности по материалам, которую поддерживают триггеры.
+
+        required_quantity - сумма required_quantity по связям материала,
+        required_with_losses - та же сумма с учетом loss_percentage и коэффициента типа продукции.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'material_demand'")
+            exists = cursor.fetchone() is not None
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS material_demand
+                           (
+                               material_id INTEGER PRIMARY KEY,
+                               required_quantity REAL NOT NULL DEFAULT 0,
+                               required_with_losses REAL NOT NULL DEFAULT 0,
+                               link_count INTEGER NOT NULL DEFAULT 0
+                           )""")
+
+            # Новая связь: прибавляем ее вклад
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_link_insert
+                               AFTER INSERT ON product_materials
+                           BEGIN
+                               INSERT INTO material_demand (material_id, required_quantity,
+                                                            required_with_losses, link_count)
+                               VALUES (NEW.material_id,
+                                       NEW.required_quantity,
+                                       NEW.required_quantity * (1 + NEW.loss_percentage / 100.0) *
+                                       COALESCE((SELECT pt.coefficient
+                                                 FROM products p
+                                                          JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                                                 WHERE p.product_id = NEW.product_id), 1.0),
+                                       1)
+                               ON CONFLICT (material_id) DO UPDATE
+                                   SET required_quantity    = required_quantity + excluded.required_quantity,
+                                       required_with_losses = required_with_losses + excluded.required_with_losses,
+                                       link_count           = link_count + 1;
+                           END""")
+
+            # Удаленная связь: вычитаем ее вклад, последняя связь обнуляет накопленную погрешность
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_link_delete
+                               AFTER DELETE ON product_materials
+                           BEGIN
+                               UPDATE material_demand
+                               SET required_quantity    = CASE WHEN link_count <= 1 THEN 0
+                                                               ELSE required_quantity - OLD.required_quantity END,
+                                   required_with_losses = CASE WHEN link_count <= 1 THEN 0
+                                                               ELSE required_with_losses -
+                                                                    OLD.required_quantity *
+                                                                    (1 + OLD.loss_percentage / 100.0) *
+                                                                    COALESCE((SELECT pt.coefficient
+                                                                              FROM products p
+                                                                                       JOIN product_types pt
+                                                                                            ON p.product_type_id = pt.product_type_id
+                                                                              WHERE p.product_id = OLD.product_id), 1.0)
+                                                          END,
+                                   link_count           = link_count - 1
+                               WHERE material_id = OLD.material_id;
+                           END""")
+
+            # Измененная связь: вычитаем старый вклад и прибавляем новый
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_link_update
+                               AFTER UPDATE OF product_id, material_id, required_quantity, loss_percentage
+                               ON product_materials
+                           BEGIN
+                               UPDATE material_demand
+                               SET required_quantity    = CASE WHEN link_count <= 1 THEN 0
+                                                               ELSE required_quantity - OLD.required_quantity END,
+                                   required_with_losses = CASE WHEN link_count <= 1 THEN 0
+                                                               ELSE required_with_losses -
+                                                                    OLD.required_quantity *
+                                                                    (1 + OLD.loss_percentage / 100.0) *
+                                                                    COALESCE((SELECT pt.coefficient
+                                                                              FROM products p
+                                                                                       JOIN product_types pt
+                                                                                            ON p.product_type_id = pt.product_type_id
+                                                                              WHERE p.product_id = OLD.product_id), 1.0)
+                                                          END,
+                                   link_count           = link_count - 1
+                               WHERE material_id = OLD.material_id;
+
+                               INSERT INTO material_demand (material_id, required_quantity,
+                                                            required_with_losses, link_count)
+                               VALUES (NEW.material_id,
+                                       NEW.required_quantity,
+                                       NEW.required_quantity * (1 + NEW.loss_percentage / 100.0) *
+                                       COALESCE((SELECT pt.coefficient
+                                                 FROM products p
+                                                          JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                                                 WHERE p.product_id = NEW.product_id), 1.0),
+                                       1)
+                               ON CONFLICT (material_id) DO UPDATE
+                                   SET required_quantity    = required_quantity + excluded.required_quantity,
+                                       required_with_losses = required_with_losses + excluded.required_with_losses,
+                                       link_count           = link_count + 1;
+                           END""")
+
+            # Связи продукции удаляются до самой продукции, пока ее коэффициент еще доступен триггеру связей
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_product_delete
+                               BEFORE DELETE ON products
+                           BEGIN
+                               DELETE FROM product_materials WHERE product_id = OLD.product_id;
+                           END""")
+
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_material_delete
+                               BEFORE DELETE ON materials
+                           BEGIN
+                               DELETE FROM product_materials WHERE material_id = OLD.material_id;
+                               DELETE FROM material_demand WHERE material_id = OLD.material_id;
+                           END""")
+
+            # Смена типа продукции или коэффициента типа: пересчитываем только затронутые материалы
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_product_type_change
+                               AFTER UPDATE OF product_type_id ON products
+                           BEGIN
+                               UPDATE material_demand
+                               SET required_with_losses =
+                                       (SELECT COALESCE(SUM(pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                                            COALESCE(pt.coefficient, 1.0)), 0)
+                                        FROM product_materials pm
+                                                 LEFT JOIN products p ON pm.product_id = p.product_id
+                                                 LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                                        WHERE pm.material_id = material_demand.material_id)
+                               WHERE material_id IN (SELECT material_id
+                                                     FROM product_materials
+                                                     WHERE product_id = NEW.product_id);
+                           END""")
+
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_demand_coefficient_change
+                               AFTER UPDATE OF coefficient ON product_types
+                           BEGIN
+                               UPDATE material_demand
+                               SET required_with_losses =
+                                       (SELECT COALESCE(SUM(pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                                            COALESCE(pt.coefficient, 1.0)), 0)
+                                        FROM product_materials pm
+                                                 LEFT JOIN products p ON pm.product_id = p.product_id
+                                                 LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                                        WHERE pm.material_id = material_demand.material_id)
+                               WHERE material_id IN (SELECT pm.material_id
+                                                     FROM product_materials pm
+                                                              JOIN products p ON pm.product_id = p.product_id
+                                                     WHERE p.product_type_id = NEW.product_type_id);
+                           END""")
+
+            # Для существующих баз заполняем таблицу по текущим связям
+            if not exists:
+                self.rebuild_material_demand()
+
+    def compute_material_demand(self):
+        """Полный пересчет потребности по связям: {material_id: (required, with_losses, link_count)}"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT pm.material_id,
+                                  SUM(pm.required_quantity),
+                                  SUM(pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                      COALESCE(pt.coefficient, 1.0)),
+                                  COUNT(*)
+                           FROM product_materials pm
+                                    LEFT JOIN products p ON pm.product_id = p.product_id
+                                    LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                           GROUP BY pm.material_id
+                           """)
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def rebuild_material_demand(self):
+        """Заполняет material_demand заново полным пересчетом"""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM material_demand")
+            cursor.executemany(
+                """INSERT INTO material_demand (material_id, required_quantity, required_with_losses, link_count)
+                   VALUES (?, ?, ?, ?)""",
+                [(material_id,) + values for material_id, values in self.compute_material_demand().items()]
+            )
+
+    def check_material_demand(self, tolerance=1e-6):
+        """Сравнивает material_demand с полным пересчетом.
+
+        Возвращает список расхождений (material_id, сохранено, пересчитано), пустой если все сходится.
+        """
+        expected = self.compute_material_demand()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT material_id, required_quantity, required_with_losses, link_count
+                           FROM material_demand
+                           """)
+            stored = {row[0]: row[1:] for row in cursor.fetchall()}
+
+            mismatches = []
+            for material_id in expected.keys() | stored.keys():
+                actual = stored.get(material_id, (0.0, 0.0, 0))
+                wanted = expected.get(material_id, (0.0, 0.0, 0))
+                if (abs(actual[0] - wanted[0]) > tolerance or abs(actual[1] - wanted[1]) > tolerance
+                        or actual[2] != wanted[2]):
+                    mismatches.append((material_id, actual, wanted))
+            return mismatches
+
+    def create_product_cost(self):
+        """Стоимость материалов продукции, которую поддерживают триггеры.
+
+        material_cost - сумма required_quantity * (1 + loss_percentage / 100) * unit_price по связям
+        продукции, без коэффициента типа: его умножение выполняется при чтении, поэтому смена типа
+        или коэффициента таблицу не меняет.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_cost'")
+            exists = cursor.fetchone() is not None
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS product_cost
+                           (
+                               product_id INTEGER PRIMARY KEY,
+                               material_cost REAL NOT NULL DEFAULT 0,
+                               link_count INTEGER NOT NULL DEFAULT 0
+                           )""")
+
+            # Новая связь: прибавляем ее стоимость
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS product_cost_link_insert
+                               AFTER INSERT ON product_materials
+                           BEGIN
+                               INSERT INTO product_cost (product_id, material_cost, link_count)
+                               VALUES (NEW.product_id,
+                                       NEW.required_quantity * (1 + NEW.loss_percentage / 100.0) *
+                                       COALESCE((SELECT unit_price FROM materials
+                                                 WHERE material_id = NEW.material_id), 0.0),
+                                       1)
+                               ON CONFLICT (product_id) DO UPDATE
+                                   SET material_cost = material_cost + excluded.material_cost,
+                                       link_count    = link_count + 1;
+                           END""")
+
+            # Удаленная связь: вычитаем ее стоимость, последняя связь обнуляет накопленную погрешность.
+            # При удалении материала связи удаляются до него (material_demand_material_delete),
+            # поэтому цена еще доступна
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS product_cost_link_delete
+                               AFTER DELETE ON product_materials
+                           BEGIN
+                               UPDATE product_cost
+                               SET material_cost = CASE WHEN link_count <= 1 THEN 0
+                                                        ELSE material_cost -
+                                                             OLD.required_quantity * (1 + OLD.loss_percentage / 100.0) *
+                                                             COALESCE((SELECT unit_price FROM materials
+                                                                       WHERE material_id = OLD.material_id), 0.0)
+                                                   END,
+                                   link_count    = link_count - 1
+                               WHERE product_id = OLD.product_id;
+                           END""")
+
+            # Измененная связь: вычитаем старую стоимость и прибавляем новую
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS product_cost_link_update
+                               AFTER UPDATE OF product_id, material_id, required_quantity, loss_percentage
+                               ON product_materials
+                           BEGIN
+                               UPDATE product_cost
+                               SET material_cost = CASE WHEN link_count <= 1 THEN 0
+                                                        ELSE material_cost -
+                                                             OLD.required_quantity * (1 + OLD.loss_percentage / 100.0) *
+                                                             COALESCE((SELECT unit_price FROM materials
+                                                                       WHERE material_id = OLD.material_id), 0.0)
+                                                   END,
+                                   link_count    = link_count - 1
+                               WHERE product_id = OLD.product_id;
+
+                               INSERT INTO product_cost (product_id, material_cost, link_count)
+                               VALUES (NEW.product_id,
+                                       NEW.required_quantity * (1 + NEW.loss_percentage / 100.0) *
+                                       COALESCE((SELECT unit_price FROM materials
+                                                 WHERE material_id = NEW.material_id), 0.0),
+                                       1)
+                               ON CONFLICT (product_id) DO UPDATE
+                                   SET material_cost = material_cost + excluded.material_cost,
+                                       link_count    = link_count + 1;
+                           END""")
+
+            # Новая цена материала: каждой продукции с этим материалом прибавляем разницу цены,
+            # умноженную на расход по ее связи. Остальная продукция не читается (индекс связей по material_id)
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS product_cost_price_change
+                               AFTER UPDATE OF unit_price ON materials
+                               WHEN NEW.unit_price IS NOT OLD.unit_price
+                           BEGIN
+                               UPDATE product_cost
+                               SET material_cost = material_cost + (NEW.unit_price - OLD.unit_price) *
+                                                   (SELECT pm.required_quantity * (1 + pm.loss_percentage / 100.0)
+                                                    FROM product_materials pm
+                                                    WHERE pm.product_id = product_cost.product_id
+                                                      AND pm.material_id = NEW.material_id)
+                               WHERE product_id IN (SELECT product_id
+                                                    FROM product_materials
+                                                    WHERE material_id = NEW.material_id);
+                           END""")
+
+            # Связи удаляются до продукции (material_demand_product_delete), остается пустая строка
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS product_cost_product_delete
+                               AFTER DELETE ON products
+                           BEGIN
+                               DELETE FROM product_cost WHERE product_id = OLD.product_id;
+                           END""")
+
+            # Для существующих баз заполняем таблицу по текущим связям
+            if not exists:
+                self.rebuild_product_cost()
+
+    def compute_product_cost(self):
+        """Полный пересчет стоимости материалов по связям: {product_id: (стоимость, link_count)}"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT pm.product_id,
+                                  SUM(pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                      COALESCE(m.unit_price, 0.0)),
+                                  COUNT(*)
+                           FROM product_materials pm
+                                    LEFT JOIN materials m ON pm.material_id = m.material_id
+                           GROUP BY pm.product_id
+                           """)
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def rebuild_product_cost(self):
+        """Заполняет product_cost заново полным пересчетом"""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM product_cost")
+            cursor.executemany(
+                "INSERT INTO product_cost (product_id, material_cost, link_count) VALUES (?, ?, ?)",
+                [(product_id,) + values for product_id, values in self.compute_product_cost().items()]
+            )
+
+    def check_product_cost(self, tolerance=1e-6):
+        """Сравнивает product_cost с полным пересчетом.
+
+        Возвращает список расхождений (product_id, сохранено, пересчитано), пустой если все сходится.
+        Погрешность относительная: стоимость растет вместе с ценами.
+        """
+        expected = self.compute_product_cost()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT product_id, material_cost, link_count FROM product_cost")
+            stored = {row[0]: row[1:] for row in cursor.fetchall()}
+
+            mismatches = []
+            for product_id in expected.keys() | stored.keys():
+                actual = stored.get(product_id, (0.0, 0))
+                wanted = expected.get(product_id, (0.0, 0))
+                if (abs(actual[0] - wanted[0]) > tolerance * max(1.0, abs(wanted[0]))
+                        or actual[1] != wanted[1]):
+                    mismatches.append((product_id, actual, wanted))
+            return mismatches
+
+    def create_material_alerts(self):
+        """Материалы с нехваткой, которые поддерживают триггеры.
+
+        В таблице только материалы, у которых остаток ниже минимального (below_minimum) или ниже
+        потребности с потерями из material_demand (below_demand). Триггеры пересчитывают одну строку
+        материала, остаток, минимум или потребность которого изменились.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'material_alerts'")
+            exists = cursor.fetchone() is not None
+
+            cursor.execute("""
+                           CREATE TABLE IF NOT EXISTS material_alerts
+                           (
+                               material_id INTEGER PRIMARY KEY,
+                               below_minimum INTEGER NOT NULL,
+                               below_demand INTEGER NOT NULL
+                           )""")
+
+            # Пересчет одного материала: строка удаляется и добавляется заново, если нехватка осталась
+            evaluate = """
+                               DELETE FROM material_alerts WHERE material_id = {material_id};
+                               INSERT INTO material_alerts (material_id, below_minimum, below_demand)
+                               SELECT m.material_id,
+                                      m.stock_quantity < m.min_quantity,
+                                      m.stock_quantity < COALESCE(d.required_with_losses, 0.0)
+                               FROM materials m
+                                        LEFT JOIN material_demand d ON d.material_id = m.material_id
+                               WHERE m.material_id = {material_id}
+                                 AND (m.stock_quantity < m.min_quantity
+                                   OR m.stock_quantity < COALESCE(d.required_with_losses, 0.0));"""
+            triggers = [
+                ("material_alerts_material_insert", "AFTER INSERT ON materials", "NEW"),
+                ("material_alerts_material_update", "AFTER UPDATE OF stock_quantity, min_quantity ON materials",
+                 "NEW"),
+                # Потребность меняют триггеры связей и типов продукции (material_demand_*)
+                ("material_alerts_demand_insert", "AFTER INSERT ON material_demand", "NEW"),
+                ("material_alerts_demand_update", "AFTER UPDATE OF required_with_losses ON material_demand", "NEW"),
+                ("material_alerts_demand_delete", "AFTER DELETE ON material_demand", "OLD"),
+            ]
+            for name, event, row in triggers:
+                cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS {name}
+                               {event}
+                           BEGIN{evaluate.format(material_id=row + ".material_id")}
+                           END""")
+
+            cursor.execute("""
+                           CREATE TRIGGER IF NOT EXISTS material_alerts_material_delete
+                               AFTER DELETE ON materials
+                           BEGIN
+                               DELETE FROM material_alerts WHERE material_id = OLD.material_id;
+                           END""")
+
+            # Для существующих баз заполняем таблицу по текущим остаткам
+            if not exists:
+                self.rebuild_material_alerts()
+
+    def compute_material_alerts(self):
+        """Полный пересчет нехватки: {material_id: (ниже минимума, ниже потребности)}"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT m.material_id,
+                                  m.stock_quantity < m.min_quantity,
+                                  m.stock_quantity < COALESCE(d.required_with_losses, 0.0)
+                           FROM materials m
+                                    LEFT JOIN material_demand d ON d.material_id = m.material_id
+                           WHERE m.stock_quantity < m.min_quantity
+                              OR m.stock_quantity < COALESCE(d.required_with_losses, 0.0)
+                           """)
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def rebuild_material_alerts(self):
+        """Заполняет material_alerts заново полным пересчетом"""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM material_alerts")
+            cursor.executemany(
+                "INSERT INTO material_alerts (material_id, below_minimum, below_demand) VALUES (?, ?, ?)",
+                [(material_id,) + values for material_id, values in self.compute_material_alerts().items()]
+            )
+
+    def check_material_alerts(self):
+        """Сравнивает material_alerts с полным пересчетом.
+
+        Возвращает список расхождений (material_id, сохранено, пересчитано), пустой если все сходится.
+        """
+        expected = self.compute_material_alerts()
+        with self.cursor() as cursor:
+            cursor.execute("SELECT material_id, below_minimum, below_demand FROM material_alerts")
+            stored = {row[0]: row[1:] for row in cursor.fetchall()}
+        return [(material_id, stored.get(material_id), expected.get(material_id))
+                for material_id in expected.keys() | stored.keys()
+                if stored.get(material_id) != expected.get(material_id)]
+
+    def create_search_index(self):
+        """Полнотекстовый поиск (FTS5) по наименованиям материалов, продукции и описанию продукции.
+
+        Таблицы materials_fts и products_fts хранят только индекс (content=''): rowid - первичный ключ
+        записи. Токенизатор unicode61 не различает регистр кириллицы, а "ё" заменяется на "е" при
+        записи в индекс и в search_query(), как в сопоставлении RU. Индекс поддерживают триггеры.
+        """
+        with self.transaction() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'materials_fts'")
+            exists = cursor.fetchone() is not None
+
+            # prefix - отдельные индексы префиксов из 2 и 3 символов для поиска по началу слова
+            cursor.execute(f"""
+                           CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts
+                               USING fts5(name, content='', tokenize='{SEARCH_TOKENIZER}', prefix='2 3')""")
+            cursor.execute(f"""
+                           CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+                               USING fts5(name, description, content='', tokenize='{SEARCH_TOKENIZER}', prefix='2 3')""")
+
+            # Из индекса без содержимого запись удаляется командой 'delete' с теми же значениями,
+            # которые были записаны
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS materials_fts_insert
+                               AFTER INSERT ON materials
+                           BEGIN
+                               INSERT INTO materials_fts (rowid, name) VALUES (NEW.material_id, {fold('NEW.name')});
+                           END""")
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS materials_fts_delete
+                               AFTER DELETE ON materials
+                           BEGIN
+                               INSERT INTO materials_fts (materials_fts, rowid, name)
+                               VALUES ('delete', OLD.material_id, {fold('OLD.name')});
+                           END""")
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS materials_fts_update
+                               AFTER UPDATE OF name ON materials
+                           BEGIN
+                               INSERT INTO materials_fts (materials_fts, rowid, name)
+                               VALUES ('delete', OLD.material_id, {fold('OLD.name')});
+                               INSERT INTO materials_fts (rowid, name) VALUES (NEW.material_id, {fold('NEW.name')});
+                           END""")
+
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS products_fts_insert
+                               AFTER INSERT ON products
+                           BEGIN
+                               INSERT INTO products_fts (rowid, name, description)
+                               VALUES (NEW.product_id, {fold('NEW.name')}, {fold('NEW.description')});
+                           END""")
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS products_fts_delete
+                               AFTER DELETE ON products
+                           BEGIN
+                               INSERT INTO products_fts (products_fts, rowid, name, description)
+                               VALUES ('delete', OLD.product_id, {fold('OLD.name')}, {fold('OLD.description')});
+                           END""")
+            cursor.execute(f"""
+                           CREATE TRIGGER IF NOT EXISTS products_fts_update
+                               AFTER UPDATE OF name, description ON products
+                           BEGIN
+                               INSERT INTO products_fts (products_fts, rowid, name, description)
+                               VALUES ('delete', OLD.product_id, {fold('OLD.name')}, {fold('OLD.description')});
+                               INSERT INTO products_fts (rowid, name, description)
+                               VALUES (NEW.product_id, {fold('NEW.name')}, {fold('NEW.description')});
+                           END""")
+
+            # Для существующих баз заполняем индекс по текущим записям
+            if not exists:
+                self.rebuild_search_index()
+
+    def rebuild_search_index(self):
+        """Заполняет materials_fts и products_fts заново по материалам и продукции"""
+        with self.transaction() as cursor:
+            cursor.execute("INSERT INTO materials_fts (materials_fts) VALUES ('delete-all')")
+            cursor.execute(f"INSERT INTO materials_fts (rowid, name) SELECT material_id, {fold('name')} FROM materials")
+            cursor.execute("INSERT INTO products_fts (products_fts) VALUES ('delete-all')")
+            cursor.execute(f"""
+                           INSERT INTO products_fts (rowid, name, description)
+                           SELECT product_id, {fold('name')}, {fold('description')}
+                           FROM products""")
+
+    def insert_test_data(self):
+        with self.transaction() as cursor:
+            # Проверяем, есть ли уже данные
+            cursor.execute("SELECT COUNT(*) FROM material_types")
+            if cursor.fetchone()[0] > 0:
+                return
+
+            # Заполняем тестовыми данными
+            material_types = [('Дерево',), ('Металл',), ('Ткань',), ('Пластик',), ('Стекло',)]
+            cursor.executemany("INSERT INTO material_types (name) VALUES (?)", material_types)
+
+            units = [
+                ('килограмм', 'кг'),
+                ('метр', 'м'),
+                ('штука', 'шт'),
+                ('литр', 'л'),
+                ('квадратный метр', 'м²')
+            ]
+            cursor.executemany("INSERT INTO units (name, abbreviation) VALUES (?, ?)", units)
+
+            product_types = [
+                ('Стол', 1.2),
+                ('Стул', 0.8),
+                ('Шкаф', 1.5),
+                ('Полка', 0.5),
+                ('Диван', 1.8)
+            ]
+            cursor.executemany("INSERT INTO product_types (name, coefficient) VALUES (?, ?)", product_types)
+
+            materials = [
+                ('Дубовая доска', 1, 2, 1500.50, 100.5, 20.0, 10),
+                ('Стальной уголок', 2, 1, 200.75, 500.25, 100.0, 20),
+                ('Хлопковая ткань', 3, 2, 300.00, 200.0, 50.0, 5),
+                ('Пластик ABS', 4, 1, 450.25, 300.75, 75.0, 15),
+                ('Стекло закаленное', 5, 2, 800.00, 50.0, 10.0, 5)
+            ]
+            cursor.executemany(
+                """INSERT INTO materials (name, material_type_id, unit_id,
+                                          unit_price, stock_quantity, min_quantity, package_quantity)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                materials
+            )
+
+            products = [
+                ('Офисный стол', 'Большой стол для офиса', 1),
+                ('Офисный стул', 'Удобный стул для офиса', 2),
+                ('Книжный шкаф', 'Шкаф для книг', 3),
+                ('Настенная полка', 'Полка для книг и декора', 4),
+                ('Угловой диван', 'Комфортный диван для офиса', 5)
+            ]
+            cursor.executemany(
+                "INSERT INTO products (name, description, product_type_id) VALUES (?, ?, ?)",
+                products
+            )
+
+            product_materials = [
+                (1, 1, 2.5, 5.0), (1, 2, 1.0, 3.0),
+                (2, 1, 1.0, 5.0), (2, 3, 0.5, 2.0),
+                (3, 1, 5.0, 8.0), (3, 2, 2.0, 5.0),
+                (4, 1, 1.5, 5.0), (4, 4, 0.8, 3.0),
+                (5, 3, 3.0, 10.0), (5, 4, 2.5, 5.0)
+            ]
+            cursor.executemany(
+                """INSERT INTO product_materials (product_id, material_id,
+                                                  required_quantity, loss_percentage)
+                   VALUES (?, ?, ?, ?)""",
+                product_materials
+            )
+        self.lookups.invalidate()
+
+    # Таблицы окна
+
+    def required_quantity(self, material_id):
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT required_quantity
+                           FROM material_demand
+                           WHERE material_id = ?
+                           """, (material_id,))
+            result = cursor.fetchone()
+            return result[0] if result else 0.0
+
+    def required_quantities(self):
+        """Требуемое количество по всем материалам из сводной таблицы material_demand"""
+        with self.cursor() as cursor:
+            cursor.execute("SELECT material_id, required_quantity FROM material_demand")
+            return {material_id: total for material_id, total in cursor.fetchall()}
+
+    def fetch_materials(self, offset=0, limit=-1, sort=("ID", False), material_ids=None, filters=MaterialFilter(),
+                        seek_row=None, backward=False):
+        """Строки таблицы материалов вместе с колонкой "Требуется" одним запросом.
+
+        offset и limit задают окно строк для PagedGrid, по умолчанию возвращаются все строки.
+        sort - (заголовок столбца из MATERIAL_SORT, по убыванию).
+        seek_row - строка прочитанного окна: чтение продолжается после нее (перед ней при backward),
+        offset отсчитывается от нее. backward без seek_row отсчитывает offset от конца таблицы.
+        Строки всегда возвращаются в порядке sort.
+        material_ids ограничивает выборку указанными материалами (точечное обновление таблицы),
+        filters (MaterialFilter) - строкой поиска, справочниками и нехваткой.
+        Последняя колонка - нехватка из material_alerts: 0 - нет, ALERT_BELOW_MINIMUM и/или ALERT_BELOW_DEMAND.
+        """
+        conditions, params = self._material_conditions(filters)
+        if material_ids is not None:
+            # Один параметр JSON при любом числе id: текст запроса не меняется и остается в кэше запросов
+            conditions.append("m.material_id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([int(material_id) for material_id in material_ids]))
+        if seek_row is not None:
+            condition, values = seek(MATERIAL_SORT, sort, seek_row, backward)
+            conditions.append(condition)
+            params += values
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        # При сортировке по справочнику CROSS JOIN начинает соединение с него (по индексу наименования),
+        # а материалы каждого значения читаются по индексу внешнего ключа уже в порядке material_id
+        alerts = "LEFT JOIN material_alerts a ON a.material_id = m.material_id"
+        if filters.shortage:
+            # Материалов с нехваткой немного: соединение начинается с material_alerts,
+            # окно сортируется среди них, а не ищется проходом по индексу всех материалов
+            joins = f"""{MATERIAL_ALERTS_FIRST}
+                       JOIN material_types mt ON m.material_type_id = mt.material_type_id
+                       JOIN units u ON m.unit_id = u.unit_id"""
+            alerts = ""
+        elif sort[0] == "Тип" and not filters.search:
+            joins = """material_types mt
+                       CROSS JOIN materials m ON m.material_type_id = mt.material_type_id
+                       JOIN units u ON m.unit_id = u.unit_id"""
+        elif sort[0] == "Ед.изм" and not filters.search:
+            joins = """units u
+                       CROSS JOIN materials m ON m.unit_id = u.unit_id
+                       JOIN material_types mt ON m.material_type_id = mt.material_type_id"""
+        else:
+            joins = """materials m
+                       JOIN material_types mt ON m.material_type_id = mt.material_type_id
+                       JOIN units u ON m.unit_id = u.unit_id"""
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                           SELECT m.material_id,
+                                  m.name,
+                                  mt.name,
+                                  u.abbreviation,
+                                  m.unit_price,
+                                  m.stock_quantity,
+                                  m.min_quantity,
+                                  m.package_quantity,
+                                  ROUND(COALESCE(d.required_quantity, 0.0), 6),
+                                  COALESCE({MATERIAL_ALERT}, 0)
+                           FROM {joins}
+                                    LEFT JOIN material_demand d ON d.material_id = m.material_id
+                                    {alerts}
+                           {where}
+                           {order_by(MATERIAL_SORT, sort, backward)}
+                           LIMIT ? OFFSET ?
+                           """, params + [limit, offset])
+            return window_rows(cursor, backward)
+
+    def count_materials(self, filters=MaterialFilter()):
+        conditions, params = self._material_conditions(filters)
+        tables = MATERIAL_ALERTS_FIRST if filters.shortage else "materials m"
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {tables} {where}", params)
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _material_conditions(filters):
+        """Условия WHERE и параметры для MaterialFilter; нехватка требует material_alerts a в соединении"""
+        conditions, params = [], []
+        if filters.search:
+            conditions.append(MATERIAL_SEARCH)
+            params.append(filters.search)
+        if filters.material_type_id is not None:
+            conditions.append("m.material_type_id = ?")
+            params.append(filters.material_type_id)
+        if filters.unit_id is not None:
+            conditions.append("m.unit_id = ?")
+            params.append(filters.unit_id)
+        if filters.shortage:
+            conditions.append(f"{MATERIAL_ALERT} & ? != 0")
+            params.append(filters.shortage)
+        return conditions, params
+
+    def fetch_products(self, offset=0, limit=-1, sort=("ID", False), filters=ProductFilter(), seek_row=None,
+                       backward=False):
+        """Окно таблицы продукции; filters (ProductFilter) - строка поиска и тип продукции,
+        seek_row и backward - как в fetch_materials"""
+        conditions, params = self._product_conditions(filters)
+        if seek_row is not None:
+            condition, values = seek(PRODUCT_SORT, sort, seek_row, backward)
+            conditions.append(condition)
+            params += values
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        # Сортировка по типу продукции: соединение начинается с product_types, как в fetch_materials
+        if sort[0] in ("Тип", "Коэффициент") and not filters.search:
+            joins = "product_types pt CROSS JOIN products p ON p.product_type_id = pt.product_type_id"
+        else:
+            joins = "products p JOIN product_types pt ON p.product_type_id = pt.product_type_id"
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                           SELECT p.product_id, p.name, pt.name, pt.coefficient,
+                                  ROUND(COALESCE(c.material_cost, 0.0) * pt.coefficient, 2),
+                                  COALESCE(p.description, '')
+                           FROM {joins}
+                                    LEFT JOIN product_cost c ON c.product_id = p.product_id
+                           {where}
+                           {order_by(PRODUCT_SORT, sort, backward)}
+                           LIMIT ? OFFSET ?
+                           """, params + [limit, offset])
+            return window_rows(cursor, backward)
+
+    def count_products(self, filters=ProductFilter()):
+        conditions, params = self._product_conditions(filters)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        with self.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM products p {where}", params)
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _product_conditions(filters):
+        conditions, params = [], []
+        if filters.search:
+            conditions.append(PRODUCT_SEARCH)
+            params.append(filters.search)
+        if filters.product_type_id is not None:
+            conditions.append("p.product_type_id = ?")
+            params.append(filters.product_type_id)
+        return conditions, params
+
+    def fetch_links(self, offset=0, limit=-1, sort=("Продукция", False), search=None, seek_row=None, backward=False):
+        """Окно таблицы связей; search - запрос search_query() по наименованию продукции или материала,
+        seek_row и backward - как в fetch_materials"""
+        conditions, params = ([LINK_SEARCH], [search, search]) if search else ([], [])
+        if seek_row is not None:
+            condition, values = seek(LINK_SORT, sort, seek_row, backward)
+            conditions.append(condition)
+            params += values
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        # При сортировке по наименованию CROSS JOIN фиксирует порядок соединения: сначала таблица,
+        # которая читается по индексу наименования, затем ее связи по индексу внешнего ключа.
+        # Окно читается без сортировки всех связей, сортируются только связи одной записи
+        if sort[0] == "Продукция" and not search:
+            joins = """products p
+                       CROSS JOIN product_materials pm ON pm.product_id = p.product_id
+                       JOIN materials m ON pm.material_id = m.material_id"""
+        elif sort[0] == "Материал" and not search:
+            joins = """materials m
+                       CROSS JOIN product_materials pm ON pm.material_id = m.material_id
+                       JOIN products p ON pm.product_id = p.product_id"""
+        else:
+            joins = """product_materials pm
+                       JOIN products p ON pm.product_id = p.product_id
+                       JOIN materials m ON pm.material_id = m.material_id"""
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                           SELECT pm.product_material_id,
+                                  p.name AS product_name,
+                                  m.name AS material_name,
+                                  pm.required_quantity,
+                                  pm.loss_percentage
+                           FROM {joins}
+                           {where}
+                           {order_by(LINK_SORT, sort, backward)}
+                           LIMIT ? OFFSET ?
+                           """, params + [limit, offset])
+            return window_rows(cursor, backward)
+
+    def count_links(self, search=None):
+        with self.cursor() as cursor:
+            if search:
+                cursor.execute(f"SELECT COUNT(*) FROM product_materials pm WHERE {LINK_SEARCH}", (search, search))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM product_materials")
+            return cursor.fetchone()[0]
+
+    # Справочники и карточки
+
+    def material_types(self):
+        """{material_type_id: наименование} из LookupCache"""
+        return self.lookups.get('material_types').names
+
+    def units(self):
+        """{unit_id: сокращение} из LookupCache"""
+        return self.lookups.get('units').names
+
+    def product_types(self):
+        """{product_type_id: наименование} из LookupCache"""
+        return self.lookups.get('product_types').names
+
+    def get_material(self, material_id):
+        """Карточка Material или None"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT m.name,
+                                  m.material_type_id,
+                                  m.unit_id,
+                                  m.unit_price,
+                                  m.stock_quantity,
+                                  m.min_quantity,
+                                  m.package_quantity
+                           FROM materials m
+                           WHERE m.material_id = ?
+                           """, (material_id,))
+            row = cursor.fetchone()
+        return Material(*row) if row else None
+
+    def get_product(self, product_id):
+        """Карточка Product или None"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT p.name, p.product_type_id, p.description
+                           FROM products p
+                           WHERE p.product_id = ?
+                           """, (product_id,))
+            row = cursor.fetchone()
+        return Product(*row) if row else None
+
+    # Изменения. Нарушение уникальности наименования - sqlite3.IntegrityError, транзакция откатывается
+
+    def save_material(self, material, material_id=None):
+        """Сохраняет карточку Material, возвращает id материала"""
+        with self.transaction() as cursor:
+            if material_id:  # Редактирование
+                cursor.execute("""
+                               UPDATE materials
+                               SET name             = ?,
+                                   material_type_id = ?,
+                                   unit_id          = ?,
+                                   unit_price       = ?,
+                                   stock_quantity   = ?,
+                                   min_quantity     = ?,
+                                   package_quantity = ?
+                               WHERE material_id = ?
+                               """, tuple(material) + (material_id,))
+                return material_id
+
+            cursor.execute("""
+                           INSERT INTO materials (name, material_type_id, unit_id,
+                                                  unit_price, stock_quantity, min_quantity, package_quantity)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)
+                           """, tuple(material))
+            return cursor.lastrowid
+
+    def delete_material(self, material_id):
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM materials WHERE material_id = ?", (material_id,))
+        if self._bom is not None:
+            self._bom.drop_material(material_id)
+        if self._usage is not None:
+            self._usage.drop_material(material_id)
+
+    def save_product(self, product, product_id=None):
+        """Сохраняет карточку Product, возвращает id продукции"""
+        with self.transaction() as cursor:
+            if not product_id:  # Добавление
+                cursor.execute("""
+                               INSERT INTO products (name, product_type_id, description)
+                               VALUES (?, ?, ?)
+                               """, tuple(product))
+                return cursor.lastrowid
+
+            cursor.execute("""
+                           UPDATE products
+                           SET name            = ?,
+                               product_type_id = ?,
+                               description     = ?
+                           WHERE product_id = ?
+                           """, tuple(product) + (product_id,))
+        # Тип продукции мог смениться, а с ним и коэффициент в расходе материалов
+        self._patch_bom(product_id)
+        return product_id
+
+    def delete_product(self, product_id):
+        # Состав нужен обратному индексу, после удаления связей его уже нет
+        material_ids = self.linked_material_ids(product_id) if self._usage is not None else ()
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM products WHERE product_id = ?", (product_id,))
+        self._patch_bom(product_id)
+        if self._usage is not None:
+            self._usage.drop_product(int(product_id), material_ids)
+
+    # Состав продукции
+
+    def product_materials(self, product_id):
+        """Материалы продукции: [(material_id, наименование, количество, потери %, цена, стоимость)].
+
+        Стоимость - количество с потерями по цене материала, без коэффициента типа продукции.
+        """
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT pm.material_id,
+                                  m.name,
+                                  pm.required_quantity,
+                                  pm.loss_percentage,
+                                  m.unit_price,
+                                  ROUND(pm.required_quantity * (1 + pm.loss_percentage / 100.0) * m.unit_price, 2)
+                           FROM product_materials pm
+                                    JOIN materials m ON pm.material_id = m.material_id
+                           WHERE pm.product_id = ?
+                           """, (product_id,))
+            return cursor.fetchall()
+
+    def product_cost(self, product_id):
+        """Стоимость материалов продукции из product_cost (ProductCost) или None, если продукции нет"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT ROUND(COALESCE(c.material_cost, 0.0), 2),
+                                  pt.coefficient,
+                                  ROUND(COALESCE(c.material_cost, 0.0) * pt.coefficient, 2)
+                           FROM products p
+                                    JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                                    LEFT JOIN product_cost c ON c.product_id = p.product_id
+                           WHERE p.product_id = ?
+                           """, (product_id,))
+            row = cursor.fetchone()
+        return ProductCost(*row) if row else None
+
+    def available_materials(self, product_id, prefix="", offset=0, limit=-1):
+        """Материалы, которых нет в составе продукции: [(material_id, наименование)] по наименованию.
+
+        prefix - начало наименования без учета регистра и Ё, выборка читает только его диапазон
+        индекса по name_key. Связи продукции исключаются по индексу (product_id, material_id).
+        """
+        lower, upper = ru_prefix_range(prefix)
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT m.material_id, m.name
+                           FROM materials m
+                           WHERE m.name_key >= ?
+                             AND m.name_key < ?
+                             AND NOT EXISTS (SELECT 1
+                                             FROM product_materials pm
+                                             WHERE pm.product_id = ?
+                                               AND pm.material_id = m.material_id)
+                           ORDER BY m.name_key, m.material_id
+                           LIMIT ? OFFSET ?
+                           """, (lower, upper, product_id, limit, offset))
+            return cursor.fetchall()
+
+    def linked_material_ids(self, product_id):
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT material_id
+                           FROM product_materials
+                           WHERE product_id = ?
+                           """, (product_id,))
+            return {row[0] for row in cursor.fetchall()}
+
+    def get_product_material(self, product_id, material_id):
+        """(количество, потери %) связи или None"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT required_quantity, loss_percentage
+                           FROM product_materials
+                           WHERE product_id = ?
+                             AND material_id = ?
+                           """, (product_id, material_id))
+            return cursor.fetchone()
+
+    def save_product_material(self, product_id, material_id, required_quantity, loss_percentage):
+        """Создает связь или меняет количество и потери существующей"""
+        with self.transaction() as cursor:
+            cursor.execute("""
+                           INSERT INTO product_materials (product_id, material_id, required_quantity,
+                                                          loss_percentage)
+                           VALUES (?, ?, ?, ?)
+                           ON CONFLICT (product_id, material_id) DO UPDATE
+                               SET required_quantity = excluded.required_quantity,
+                                   loss_percentage   = excluded.loss_percentage
+                           """, (product_id, material_id, required_quantity, loss_percentage))
+        self._patch_bom(product_id)
+        if self._usage is not None:
+            self._usage.set_link(material_id, int(product_id), required_quantity)
+
+    def add_product_materials(self, product_id, material_ids, required_quantity, loss_percentage):
+        """Добавляет в состав продукции несколько материалов одной транзакцией, с одинаковыми
+        количеством и потерями. Если связь с одним из них уже есть, не добавляется ни один"""
+        with self.transaction() as cursor:
+            cursor.executemany("""
+                               INSERT INTO product_materials (product_id, material_id, required_quantity,
+                                                              loss_percentage)
+                               VALUES (?, ?, ?, ?)
+                               """, [(product_id, material_id, required_quantity, loss_percentage)
+                                     for material_id in material_ids])
+        self._patch_bom(product_id)
+        if self._usage is not None:
+            for material_id in material_ids:
+                self._usage.set_link(material_id, int(product_id), required_quantity)
+
+    def delete_product_material(self, product_id, material_id):
+        with self.transaction() as cursor:
+            cursor.execute("""
+                           DELETE
+                           FROM product_materials
+                           WHERE product_id = ?
+                             AND material_id = ?
+                           """, (product_id, material_id))
+        self._patch_bom(product_id)
+        if self._usage is not None:
+            self._usage.drop_link(material_id, int(product_id))
+
+    # Массовые изменения: один запрос в одной транзакции, стоимость, потребность и нехватку
+    # пересчитывают те же триггеры, что и при правке одной записи
+
+    def adjust_materials(self, column, mode, value, material_ids=None, filters=MaterialFilter()):
+        """Меняет цену или остаток (column из MATERIAL_ADJUST_COLUMNS) способом mode (MATERIAL_ADJUSTMENTS)
+        у материалов material_ids, а без них - у всех материалов по фильтру filters.
+        Возвращает число измененных материалов"""
+        if column not in MATERIAL_ADJUST_COLUMNS:
+            raise ValueError(f"Колонка {column} не меняется массово")
+        expression = MATERIAL_ADJUSTMENTS[mode].format(column=column)
+        scope, params = self._material_scope(material_ids, filters)
+        with self.transaction() as cursor:
+            cursor.execute(f"""
+                           UPDATE materials
+                           SET {column} = ROUND(MAX({expression}, 0), 2)
+                           WHERE material_id IN ({scope})
+                           """, [value] + params)
+            return cursor.rowcount
+
+    def set_loss_percentage(self, product_id, loss_percentage, material_ids=None):
+        """Одинаковые потери для связей продукции с материалами material_ids (без них - со всеми).
+        Возвращает число измененных связей"""
+        materials = "AND material_id IN (SELECT value FROM json_each(?))" if material_ids is not None else ""
+        params = [loss_percentage, product_id, loss_percentage]
+        if material_ids is not None:
+            params.append(json.dumps([int(material_id) for material_id in material_ids]))
+        with self.transaction() as cursor:
+            # Связи, где потери уже такие, не меняются и не запускают триггеры
+            cursor.execute(f"""
+                           UPDATE product_materials
+                           SET loss_percentage = ?
+                           WHERE product_id = ?
+                             AND loss_percentage IS NOT ?
+                             {materials}
+                           """, params)
+            changed = cursor.rowcount
+        self._patch_bom(product_id)
+        return changed
+
+    def copy_bom(self, source_product_id, product_ids=None, filters=ProductFilter(), replace=False):
+        """Копирует состав продукции source_product_id в продукцию product_ids, а без нее - во всю
+        продукцию по фильтру filters, одним INSERT ... SELECT. Материалы источника получают его
+        количество и потери; прочие материалы целевой продукции удаляются, только если replace.
+        Возвращает число добавленных и измененных связей"""
+        scope, params = self._product_scope(product_ids, filters)
+        with self.transaction() as cursor:
+            if replace:
+                cursor.execute(f"""
+                               DELETE
+                               FROM product_materials
+                               WHERE product_id IN ({scope})
+                                 AND product_id != ?
+                               """, params + [source_product_id])
+            cursor.execute(f"""
+                           INSERT INTO product_materials (product_id, material_id, required_quantity,
+                                                          loss_percentage)
+                           SELECT t.product_id, pm.material_id, pm.required_quantity, pm.loss_percentage
+                           FROM ({scope}) t
+                                    CROSS JOIN product_materials pm
+                           WHERE pm.product_id = ?
+                             AND t.product_id != ?
+                           ON CONFLICT (product_id, material_id) DO UPDATE
+                               SET required_quantity = excluded.required_quantity,
+                                   loss_percentage   = excluded.loss_percentage
+                               WHERE required_quantity IS NOT excluded.required_quantity
+                                  OR loss_percentage IS NOT excluded.loss_percentage
+                           """, params + [source_product_id, source_product_id])
+            copied = cursor.rowcount
+        # Поправка матрицы и индекса по каждой целевой продукции дороже, чем их сборка заново
+        self.invalidate_bom()
+        return copied
+
+    def _material_scope(self, material_ids, filters):
+        """Подзапрос material_id и его параметры: материалы material_ids или все по фильтру"""
+        if material_ids is not None:
+            return ("SELECT value AS material_id FROM json_each(?)",
+                    [json.dumps([int(material_id) for material_id in material_ids])])
+        conditions, params = self._material_conditions(filters)
+        tables = MATERIAL_ALERTS_FIRST if filters.shortage else "materials m"
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return f"SELECT m.material_id FROM {tables} {where}", params
+
+    def _product_scope(self, product_ids, filters):
+        """Подзапрос product_id и его параметры: продукция product_ids или вся по фильтру"""
+        if product_ids is not None:
+            return ("SELECT value AS product_id FROM json_each(?)",
+                    [json.dumps([int(product_id) for product_id in product_ids])])
+        conditions, params = self._product_conditions(filters)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return f"SELECT p.product_id FROM products p {where}", params
+
+    # Продукция, использующая материал
+
+    def material_demand(self, material_id):
+        """Наименование материала и сводная потребность (MaterialDemand) или None"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT m.name,
+                                  ROUND(COALESCE(d.required_quantity, 0.0), 6),
+                                  ROUND(COALESCE(d.required_with_losses, 0.0), 6)
+                           FROM materials m
+                                    LEFT JOIN material_demand d ON d.material_id = m.material_id
+                           WHERE m.material_id = ?
+                           """, (material_id,))
+            row = cursor.fetchone()
+        return MaterialDemand(*row) if row else None
+
+    def products_using_material(self, material_id, offset=0, limit=-1):
+        """Окно продукции с материалом из обратного индекса usage(), по возрастанию product_id:
+        [(product_id, наименование продукции, количество, единица измерения)]"""
+        product_ids, quantities = self.usage().products(material_id)
+        end = len(product_ids) if limit < 0 else offset + limit
+        product_ids, quantities = product_ids[offset:end].tolist(), quantities[offset:end].tolist()
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT u.abbreviation
+                           FROM materials m
+                                    JOIN units u ON m.unit_id = u.unit_id
+                           WHERE m.material_id = ?
+                           """, (material_id,))
+            row = cursor.fetchone()
+            # Наименования окна - одним запросом по первичному ключу; список id передается
+            # одним параметром, поэтому текст запроса не зависит от размера окна
+            cursor.execute("""
+                           SELECT p.product_id, p.name
+                           FROM json_each(?) j
+                                    JOIN products p ON p.product_id = j.value
+                           """, (json.dumps(product_ids),))
+            names = dict(cursor.fetchall())
+        unit = row[0] if row else ""
+        return [(product_id, names.get(product_id, ""), quantity, unit)
+                for product_id, quantity in zip(product_ids, quantities)]
+
+    def count_products_using_material(self, material_id):
+        """Число продукции с материалом (связи, которые удалит удаление материала), без запроса к базе"""
+        return self.usage().count(material_id)
+
+    # Выгрузка и отчеты
+
+    @contextmanager
+    def export(self, table):
+        """(заголовки, курсор строк) таблицы table из EXPORT_QUERIES; строки читаются по мере записи"""
+        with self.cursor() as cursor:
+            cursor.execute(EXPORT_QUERIES[table])
+            yield [column[0] for column in cursor.description], cursor
+
+    @contextmanager
+    def demand_report(self, shortage_only=False):
+        """(заголовки, курсор строк) отчета о потребности; shortage_only - только материалы с нехваткой"""
+        with self.cursor() as cursor:
+            cursor.execute(DEMAND_REPORT_QUERY, (int(shortage_only),))
+            yield [column[0] for column in cursor.description], cursor
+
+    # Планирование
+
+    def bom_links(self, product_id=None):
+        """Связи для расчета по плану: [(product_id, material_id, расход на единицу продукции)].
+
+        Расход учитывает потери и коэффициент типа продукции, как required_with_losses в material_demand.
+        product_id ограничивает выборку связями одной продукции.
+        """
+        where = "" if product_id is None else "WHERE pm.product_id = ?"
+        with self.cursor() as cursor:
+            cursor.execute(f"""
+                           SELECT pm.product_id,
+                                  pm.material_id,
+                                  pm.required_quantity * (1 + pm.loss_percentage / 100.0) *
+                                  COALESCE(pt.coefficient, 1.0)
+                           FROM product_materials pm
+                                    LEFT JOIN products p ON pm.product_id = p.product_id
+                                    LEFT JOIN product_types pt ON p.product_type_id = pt.product_type_id
+                           {where}
+                           """, () if product_id is None else (product_id,))
+            return cursor.fetchall()
+
+    def bom(self):
+        """Матрица состава продукции (bom.BomMatrix), общая для всех вызовов до invalidate_bom()"""
+        if self._bom is None:
+            from bom import BomMatrix
+            self._bom = BomMatrix.from_links(self.bom_links())
+        return self._bom
+
+    def usage_links(self):
+        """Связи для обратного индекса: [(material_id, product_id, количество)]"""
+        with self.cursor() as cursor:
+            cursor.execute("SELECT material_id, product_id, required_quantity FROM product_materials")
+            return cursor.fetchall()
+
+    def usage(self):
+        """Обратный индекс по материалам (bom.MaterialUsage), общий для всех вызовов до invalidate_bom()"""
+        if self._usage is None:
+            from bom import MaterialUsage
+            self._usage = MaterialUsage.from_links(self.usage_links())
+        return self._usage
+
+    def invalidate_bom(self):
+        """Сбрасывает матрицу и обратный индекс после массовых изменений (импорт, копирование состава)"""
+        self._bom = None
+        self._usage = None
+
+    def _patch_bom(self, product_id):
+        """Перечитывает в матрицу строку одной продукции (индекс связей по product_id).
+        GUI передает id строки таблицы, матрице нужен целый product_id"""
+        if self._bom is not None:
+            self._bom.set_product(int(product_id), [(material_id, usage)
+                                                    for _, material_id, usage in self.bom_links(product_id)])
+
+    def material_stock(self):
+        """[(material_id, наименование, единица измерения, остаток, минимум, в упаковке, цена единицы)]"""
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT m.material_id,
+                                  m.name,
+                                  u.abbreviation,
+                                  m.stock_quantity,
+                                  m.min_quantity,
+                                  m.package_quantity,
+                                  m.unit_price
+                           FROM materials m
+                                    JOIN units u ON m.unit_id = u.unit_id
+                           ORDER BY m.material_id
+                           """)
+            return cursor.fetchall()
+
+    def product_ids(self, names):
+        """{наименование: product_id} для наименований names, которые есть в базе.
+
+        Все наименования ищутся одним запросом по индексу наименования; key из json_each - номер
+        в names, поэтому ключи результата - сами элементы names (в плане из Excel бывают числа)"""
+        names = list(names)
+        with self.cursor() as cursor:
+            cursor.execute("""
+                           SELECT n.key, p.product_id
+                           FROM json_each(?) n
+                                    JOIN products p ON p.name = n.value
+                           """, (json.dumps([str(name) for name in names]),))
+            return {names[key]: product_id for key, product_id in cursor.fetchall()}